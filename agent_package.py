@@ -0,0 +1,408 @@
+"""
+Offline builder and reader for Dialogflow CX agent packages (the JSON package
+layout of an agent export), so an agent config can be deployed with a single
+restore operation instead of one create request per intent and entity type.
+
+Package layout written and read here:
+
+    agent.json
+    entityTypes/<name>/<name>.json
+    entityTypes/<name>/entities/<language>.json
+    intents/<name>/<name>.json
+    intents/<name>/trainingPhrases/<language>.json
+
+Restoring a package replaces the whole agent, so packages are normally built on
+top of an export of the live agent (`base_package`): everything in the export
+(flows, pages, webhooks, other intents...) is copied over, and only the intents
+and entity types defined in the YAML are replaced.
+"""
+import json
+import logging
+import re
+import shutil
+import uuid
+import zipfile
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INTENTS_DIR = "intents"
+ENTITY_TYPES_DIR = "entityTypes"
+AGENT_FILE = "agent.json"
+
+# Namespace for deterministic resource ids, so the same config always gives the same package.
+_PACKAGE_NAMESPACE = uuid.UUID("6f1c7a52-3d55-4b43-9a0e-2f6b1d8e9c41")
+_UNSAFE_PATH_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def _safe_dir_name(display_name: str) -> str:
+    """Turns a display name into a single archive path segment."""
+    return _UNSAFE_PATH_CHARS.sub("_", display_name).strip() or "_"
+
+
+def _resource_id(kind: str, display_name: str) -> str:
+    return str(uuid.uuid5(_PACKAGE_NAMESPACE, f"{kind}:{display_name}"))
+
+
+def _write_json(archive: zipfile.ZipFile, path: str, data: dict):
+    """
+    Writes one JSON document as an archive entry. Documents are serialized one at a time,
+    so memory holds a single intent or entity type, not the package. No indentation:
+    only the compact form uses the C encoder.
+    """
+    archive.writestr(path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def _read_json(archive: zipfile.ZipFile, path: str) -> dict:
+    with archive.open(path) as f:
+        return json.load(f)
+
+
+def _top_level_dirs(names: list, root: str) -> dict:
+    """Maps each '<root>/<dir>/' directory of the archive to its member names."""
+    dirs = {}
+    prefix = f"{root}/"
+    for name in names:
+        if name.startswith(prefix) and "/" in name[len(prefix):]:
+            dirs.setdefault(name[len(prefix):].split("/", 1)[0], []).append(name)
+    return dirs
+
+
+def _unique_dir_name(base: str, used_dirs: set) -> str:
+    """Returns `base`, or `base_<n>` if it is taken, and marks the name as used."""
+    dir_name = base
+    suffix = 1
+    while dir_name in used_dirs:
+        suffix += 1
+        dir_name = f"{base}_{suffix}"
+    used_dirs.add(dir_name)
+    return dir_name
+
+
+class AgentPackageBuilder:
+    def __init__(self, agent_manager, language_code: str = "en"):
+        """
+        Renders agent config YAML into an agent package. No API calls are made: parameters
+        reference entity types by display name, as in agent exports.
+
+        Args:
+            agent_manager (DialogflowAgentManager): Manager whose formatting helpers are used,
+                so the package holds exactly what create_intent/create_entity_type would send.
+            language_code (str): Language of the training phrases and entities.
+        """
+        self.agent_manager = agent_manager
+        self.language_code = language_code
+        self.intents_written = 0
+        self.entity_types_written = 0
+
+    def entity_type_files(self, entity: dict) -> dict:
+        """
+        Renders one YAML entity type.
+
+        Args:
+            entity (dict): One entry of the YAML 'entities' list.
+
+        Returns:
+            dict: {archive path: JSON document}, or None if the entity is malformed.
+        """
+        payload = self.agent_manager.build_entity_payload(entity)
+        if payload is None:
+            return None
+        display_name = payload["display_name"]
+        return {
+            "": {
+                "name": _resource_id(ENTITY_TYPES_DIR, display_name),
+                "displayName": display_name,
+                "kind": payload["kind"],
+                "autoExpansionMode": payload["auto_expansion_mode"],
+            },
+            f"entities/{self.language_code}.json": {
+                "entities": [{"value": e["value"], "synonyms": list(e["synonyms"]), "languageCode": self.language_code}
+                             for e in payload["entities"]]
+            },
+        }
+
+    def intent_files(self, intent_data: dict) -> dict:
+        """
+        Renders one YAML intent.
+
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+
+        Returns:
+            dict: {archive path: JSON document}, or None if the intent is malformed.
+        """
+        manager = self.agent_manager
+        display_name = intent_data.get("display_name")
+        if not display_name:
+            logging.warning(f"Skipping intent due to missing display_name: {intent_data}")
+            return None
+        training_phrases = []
+        for tp in manager.format_training_phrases(intent_data):
+            parts = []
+            for part in tp["parts"]:
+                rendered = {"text": part["text"]}
+                if part.get("parameter_id"):
+                    rendered["parameterId"] = part["parameter_id"]
+                parts.append(rendered)
+            training_phrases.append({"parts": parts, "repeatCount": tp["repeat_count"], "languageCode": self.language_code})
+        parameters = [{"id": param_id,
+                       "entityType": entity_type if entity_type.startswith("@") else f"@{entity_type}",
+                       "isList": bool(is_list)}
+                      for param_id, entity_type, is_list in manager.iter_valid_parameters(intent_data)]
+        intent = {
+            "name": _resource_id(INTENTS_DIR, display_name),
+            "displayName": display_name,
+            "priority": intent_data.get('priority', 500000),
+            "isFallback": intent_data.get('is_fallback', False),
+            "description": intent_data.get('description', f"Intent for {display_name}"),
+            "numTrainingPhrases": len(training_phrases),
+        }
+        if parameters:
+            intent["parameters"] = parameters
+        return {"": intent, f"trainingPhrases/{self.language_code}.json": {"trainingPhrases": training_phrases}}
+
+    @staticmethod
+    def _write_resource(archive: zipfile.ZipFile, root: str, files: dict, used_dirs: set) -> str:
+        display_name = files[""]["displayName"]
+        dir_name = _unique_dir_name(_safe_dir_name(display_name), used_dirs)
+        for relative_path, document in files.items():
+            path = f"{root}/{dir_name}/{relative_path or f'{dir_name}.json'}"
+            _write_json(archive, path, document)
+        return display_name
+
+    def build(self, path: str, entities, intents, base_package: str = None, agent_settings: dict = None) -> dict:
+        """
+        Writes the package. Entity types and intents are rendered and streamed into the
+        archive one at a time, so `intents` may be any iterable (e.g. a generator).
+
+        Args:
+            path (str): Destination .zip file.
+            entities (iterable): YAML entity definitions.
+            intents (iterable): YAML intent definitions.
+            base_package (str): Optional agent export (JSON package .zip) to build on. Its entries
+                are copied, except the intents and entity types whose display names are defined here.
+            agent_settings (dict): agent.json contents used when there is no base package.
+
+        Returns:
+            dict: Counts of written and copied resources.
+        """
+        intent_names, entity_type_names = set(), set()
+        copied = {INTENTS_DIR: 0, ENTITY_TYPES_DIR: 0}
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            used_dirs = {INTENTS_DIR: set(), ENTITY_TYPES_DIR: set()}
+            for entity in entities or []:
+                files = self.entity_type_files(entity)
+                if files:
+                    entity_type_names.add(self._write_resource(archive, ENTITY_TYPES_DIR, files, used_dirs[ENTITY_TYPES_DIR]))
+                    self.entity_types_written += 1
+            for intent_data in intents or []:
+                files = self.intent_files(intent_data)
+                if files:
+                    intent_names.add(self._write_resource(archive, INTENTS_DIR, files, used_dirs[INTENTS_DIR]))
+                    self.intents_written += 1
+
+            if base_package:
+                copied = self._copy_base(archive, base_package, {INTENTS_DIR: intent_names, ENTITY_TYPES_DIR: entity_type_names},
+                                         used_dirs)
+            else:
+                _write_json(archive, AGENT_FILE, agent_settings or {"defaultLanguageCode": self.language_code})
+
+        logging.info(f"📦 Agent package written to '{path}': {self.entity_types_written} entity types, "
+                     f"{self.intents_written} intents" +
+                     (f" (+{copied[ENTITY_TYPES_DIR]} entity types, {copied[INTENTS_DIR]} intents kept from "
+                      f"'{base_package}')" if base_package else ""))
+        return {"entity_types": self.entity_types_written, "intents": self.intents_written,
+                "kept_entity_types": copied[ENTITY_TYPES_DIR], "kept_intents": copied[INTENTS_DIR]}
+
+    @staticmethod
+    def _copy_base(archive: zipfile.ZipFile, base_package: str, replaced: dict, used_dirs: dict) -> dict:
+        """
+        Copies the base export's entries, skipping intents/entity types replaced by the YAML.
+        A kept resource whose directory name is already used by a written one is copied under
+        a new directory name: the restore replaces the whole agent, so dropping it would
+        delete it from the agent.
+        """
+        copied = {INTENTS_DIR: 0, ENTITY_TYPES_DIR: 0}
+        with zipfile.ZipFile(base_package) as base:
+            names = base.namelist()
+            skipped = set()
+            renamed = {}
+            for root in (INTENTS_DIR, ENTITY_TYPES_DIR):
+                base_dirs = _top_level_dirs(names, root)
+                kept = {}
+                for dir_name, members in base_dirs.items():
+                    resource_file = f"{root}/{dir_name}/{dir_name}.json"
+                    display_name = _read_json(base, resource_file).get("displayName") if resource_file in members else None
+                    if display_name in replaced[root]:
+                        skipped.update(members)
+                    else:
+                        kept[dir_name] = display_name
+                        copied[root] += 1
+                taken = used_dirs[root] | kept.keys()
+                for dir_name, display_name in kept.items():
+                    if dir_name not in used_dirs[root]:
+                        continue
+                    new_dir_name = _unique_dir_name(dir_name, taken)
+                    logging.warning(f"⚠️ '{display_name or dir_name}' from '{base_package}' is stored as '{root}/{new_dir_name}': "
+                                    f"'{root}/{dir_name}' is used by a resource from the agent config.")
+                    old_prefix = f"{root}/{dir_name}/"
+                    for member in base_dirs[dir_name]:
+                        relative_path = member[len(old_prefix):]
+                        if relative_path == f"{dir_name}.json":
+                            relative_path = f"{new_dir_name}.json"
+                        renamed[member] = f"{root}/{new_dir_name}/{relative_path}"
+            for info in base.infolist():
+                if info.is_dir() or info.filename in skipped:
+                    continue
+                with base.open(info) as source, archive.open(renamed.get(info.filename, info.filename), "w") as target:
+                    shutil.copyfileobj(source, target)
+        return copied
+
+
+def read_agent_package(path: str, language_code: str = "en") -> dict:
+    """
+    Reads the intents and entity types of an agent package back into the YAML model.
+
+    Args:
+        path (str): Agent package .zip file.
+        language_code (str): Language whose training phrases and entities are read.
+
+    Returns:
+        dict: {'entities': [...], 'intents': [...]} shaped like agent_config_params.yaml.
+    """
+    config = {"entities": [], "intents": []}
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        members = set(names)
+        for dir_name in _top_level_dirs(names, ENTITY_TYPES_DIR):
+            prefix = f"{ENTITY_TYPES_DIR}/{dir_name}/"
+            entity_type = _read_json(archive, f"{prefix}{dir_name}.json")
+            entries_file = f"{prefix}entities/{language_code}.json"
+            entries = _read_json(archive, entries_file).get("entities", []) if entries_file in members else []
+            config["entities"].append({
+                "display_name": entity_type["displayName"],
+                "kind": entity_type.get("kind", "KIND_MAP"),
+                "auto_expansion_mode": entity_type.get("autoExpansionMode", "AUTO_EXPANSION_MODE_DEFAULT"),
+                "entries": [{"value": e["value"], "synonyms": e.get("synonyms", [])} for e in entries],
+            })
+        for dir_name in _top_level_dirs(names, INTENTS_DIR):
+            prefix = f"{INTENTS_DIR}/{dir_name}/"
+            intent = _read_json(archive, f"{prefix}{dir_name}.json")
+            phrases_file = f"{prefix}trainingPhrases/{language_code}.json"
+            training_phrases = []
+            if phrases_file in members:
+                for tp in _read_json(archive, phrases_file).get("trainingPhrases", []):
+                    parts = tp.get("parts", [])
+                    repeat_count = tp.get("repeatCount", 1)
+                    if len(parts) == 1 and not parts[0].get("parameterId") and repeat_count == 1:
+                        training_phrases.append(parts[0]["text"])
+                        continue
+                    text_parts = [{"text": part["text"], **({"parameter_id": part["parameterId"]}
+                                                            if part.get("parameterId") else {})} for part in parts]
+                    training_phrases.append({"text_parts": text_parts, "repeat_count": repeat_count})
+            intent_data = {
+                "display_name": intent["displayName"],
+                "description": intent.get("description", ""),
+                "priority": intent.get("priority", 0),
+                "is_fallback": intent.get("isFallback", False),
+                "training_phrases": training_phrases,
+            }
+            parameters = [{"id": param["id"],
+                           "entity_type_display_name": param["entityType"] if param["entityType"].startswith("@sys.")
+                           else param["entityType"].lstrip("@"),
+                           "is_list": param.get("isList", False)} for param in intent.get("parameters", [])]
+            if parameters:
+                intent_data["parameters"] = parameters
+            config["intents"].append(intent_data)
+    return config
+
+
+def diff_agent_configs(expected: dict, actual: dict, synchronizer) -> list:
+    """
+    Compares the intents and entity types of two agent configs in the sync comparison form.
+    Resources that only exist in `actual` (e.g. kept from a base export) are ignored.
+
+    Args:
+        expected (dict): The agent config the package was built from.
+        actual (dict): The config read back with read_agent_package.
+        synchronizer (AgentSynchronizer): Provides the normalizers.
+
+    Returns:
+        list: One message per missing or differing resource; empty when they match.
+    """
+    differences = []
+    manager = synchronizer.agent_manager
+    actual_entities = {e["display_name"]: e for e in actual.get("entities", [])}
+    for entity in expected.get("entities", []):
+        payload = manager.build_entity_payload(entity)
+        if payload is None:
+            continue
+        display_name = payload["display_name"]
+        if display_name not in actual_entities:
+            differences.append(f"entity_type '{display_name}' is missing")
+            continue
+        desired = synchronizer.normalize_entity_type(payload)
+        found = synchronizer.normalize_entity_type(manager.build_entity_payload(actual_entities[display_name]))
+        changed = [name for name in desired if desired[name] != found.get(name)]
+        if changed:
+            differences.append(f"entity_type '{display_name}' differs ({', '.join(changed)})")
+    actual_intents = {i["display_name"]: i for i in actual.get("intents", [])}
+    for intent_data in expected.get("intents", []):
+        display_name = intent_data.get("display_name")
+        if not display_name:
+            continue
+        if display_name not in actual_intents:
+            differences.append(f"intent '{display_name}' is missing")
+            continue
+        desired = synchronizer.normalize_intent(intent_data)
+        found = synchronizer.normalize_intent(actual_intents[display_name])
+        changed = [name for name in desired if desired[name] != found.get(name)]
+        if changed:
+            differences.append(f"intent '{display_name}' differs ({', '.join(changed)})")
+    return differences
+
+
+def export_agent_package(agent_manager, path: str, timeout: float = 600) -> str:
+    """
+    Exports the live agent as a JSON package and saves it locally (one API operation).
+
+    Args:
+        agent_manager (DialogflowAgentManager): Manager of the agent to export.
+        path (str): Destination .zip file.
+        timeout (float): Seconds to wait for the export operation.
+
+    Returns:
+        str: `path`.
+    """
+    from google.cloud.dialogflowcx_v3beta1 import types
+
+    request = types.ExportAgentRequest(name=agent_manager.agent_path,
+                                       data_format=types.ExportAgentRequest.DataFormat.JSON_PACKAGE)
+    operation = agent_manager.call_api(agent_manager.agents_client.export_agent, "export agent", request=request)
+    response = operation.result(timeout=timeout)
+    with open(path, "wb") as f:
+        f.write(response.agent_content)
+    logging.info(f"📥 Exported agent '{agent_manager.agent_path}' to '{path}'.")
+    return path
+
+
+def restore_agent_package(agent_manager, path: str, timeout: float = 600, fallback: bool = False):
+    """
+    Replaces the agent's contents with a package in a single restore operation.
+
+    Args:
+        agent_manager (DialogflowAgentManager): Manager of the agent to restore.
+        path (str): Agent package .zip file.
+        timeout (float): Seconds to wait for the restore operation.
+        fallback (bool): Fall back to default settings for settings the agent does not support
+            (RestoreOption.FALLBACK) instead of failing.
+    """
+    from google.cloud.dialogflowcx_v3beta1 import types
+
+    with open(path, "rb") as f:
+        content = f.read()
+    option = types.RestoreAgentRequest.RestoreOption.FALLBACK if fallback else types.RestoreAgentRequest.RestoreOption.KEEP
+    request = types.RestoreAgentRequest(name=agent_manager.agent_path, agent_content=content, restore_option=option)
+    operation = agent_manager.call_api(agent_manager.agents_client.restore_agent, "restore agent", request=request)
+    operation.result(timeout=timeout)
+    logging.info(f"✅ Restored agent '{agent_manager.agent_path}' from '{path}' ({len(content)} bytes).")
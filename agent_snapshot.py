@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import namedtuple
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Resources requested per list call (the Dialogflow CX maximum).
+LIST_PAGE_SIZE = 1000
+
+# Lightweight listing records; the full resources are dropped as soon as they are counted.
+IntentRecord = namedtuple("IntentRecord", ["name", "display_name", "phrase_count"])
+EntityTypeRecord = namedtuple("EntityTypeRecord", ["name", "display_name", "entry_count"])
+
+SNAPSHOT_VERSION = 1
+
+
+class AgentSnapshot:
+    def __init__(self, agent_path: str, intents: list, entity_types: list, taken_at: float = None):
+        """
+        The listed state of an agent: one record per intent and entity type.
+
+        Args:
+            agent_path (str): The agent.
+            intents (list): IntentRecord per intent.
+            entity_types (list): EntityTypeRecord per entity type.
+            taken_at (float): Unix time of the listing (default: now).
+        """
+        self.agent_path = agent_path
+        self.intents = sorted(intents, key=lambda record: record.display_name)
+        self.entity_types = sorted(entity_types, key=lambda record: record.display_name)
+        self.taken_at = time.time() if taken_at is None else taken_at
+
+    @classmethod
+    def capture(cls, agent_manager, page_size: int = LIST_PAGE_SIZE) -> "AgentSnapshot":
+        """
+        Lists an agent page by page (see DialogflowAgentManager.iter_intent_records).
+
+        Args:
+            agent_manager (DialogflowAgentManager): Manager of the agent.
+            page_size (int): Resources per list call.
+
+        Returns:
+            AgentSnapshot
+        """
+        return cls(agent_manager.agent_path,
+                   list(agent_manager.iter_intent_records(page_size)),
+                   list(agent_manager.iter_entity_type_records(page_size)))
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        SHA-256 over every record. Changes when a resource is added, removed or renamed, or
+        when the number of training phrases of an intent or entries of an entity type changes.
+        """
+        payload = json.dumps([[list(record) for record in self.intents], [list(record) for record in self.entity_types]],
+                             ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def save(self, path: str):
+        """Writes the snapshot as JSON (atomically, so an interrupted run never leaves half a file)."""
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "agent_path": self.agent_path,
+            "taken_at": round(self.taken_at, 3),
+            "fingerprint": self.fingerprint,
+            "intents": [list(record) for record in self.intents],
+            "entity_types": [list(record) for record in self.entity_types],
+        }
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "AgentSnapshot":
+        """
+        Reads a snapshot written by save.
+
+        Returns:
+            AgentSnapshot: The snapshot, or None if the file does not exist or is unreadable.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data["agent_path"], [IntentRecord(*record) for record in data["intents"]],
+                       [EntityTypeRecord(*record) for record in data["entity_types"]], data["taken_at"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable agent snapshot '{path}': {e}")
+            return None
+
+    def diff(self, previous: "AgentSnapshot") -> dict:
+        """
+        Compares this snapshot with an earlier one of the same agent.
+
+        Args:
+            previous (AgentSnapshot): The earlier snapshot.
+
+        Returns:
+            dict: {'intents' / 'entity_types': {'added': [...], 'removed': [...], 'changed': [...]}},
+                display names; 'changed' means a different resource name or phrase/entry count.
+        """
+        changes = {}
+        for kind, current, earlier in (("intents", self.intents, previous.intents),
+                                       ("entity_types", self.entity_types, previous.entity_types)):
+            current = {record.display_name: record for record in current}
+            earlier = {record.display_name: record for record in earlier}
+            changes[kind] = {
+                "added": sorted(current.keys() - earlier.keys()),
+                "removed": sorted(earlier.keys() - current.keys()),
+                "changed": sorted(name for name in current.keys() & earlier.keys() if current[name] != earlier[name]),
+            }
+        return changes
+
+    def missing(self, config_data: dict) -> dict:
+        """
+        Post-deploy check: which intents and entity types of an agent config are not in the agent.
+
+        Args:
+            config_data (dict): The deployed agent config (intents may be a lazy iterable).
+
+        Returns:
+            dict: {'intents': [...], 'entity_types': [...]} display names missing from the agent.
+        """
+        intent_names = {record.display_name for record in self.intents}
+        entity_type_names = {record.display_name for record in self.entity_types}
+        return {
+            "intents": [intent["display_name"] for intent in config_data.get("intents") or []
+                        if intent.get("display_name") not in intent_names],
+            "entity_types": [entity["display_name"] for entity in config_data.get("entities") or []
+                             if entity.get("display_name") not in entity_type_names],
+        }
+
+
+def record_agent_snapshot(agent_manager, path: str = None, config_data: dict = None) -> AgentSnapshot:
+    """
+    Lists the agent after a deployment, logs its intents, checks that everything in the
+    deployed config is there, and compares it with (then replaces) the snapshot of the
+    previous run.
+
+    Args:
+        agent_manager (DialogflowAgentManager): Manager of the agent.
+        path (str): Snapshot file; None to skip persisting and comparing.
+        config_data (dict): The deployed agent config, to verify against.
+
+    Returns:
+        AgentSnapshot: The new snapshot.
+    """
+    snapshot = agent_manager.list_current_intents()
+    if snapshot is None:
+        return None
+    if config_data is not None:
+        for kind, names in snapshot.missing(config_data).items():
+            if names:
+                logging.warning(f"⚠️ {len(names)} deployed {kind.replace('_', ' ')} not found in the agent: "
+                                + ", ".join(f"'{name}'" for name in names[:20]) + (" ..." if len(names) > 20 else ""))
+    if not path:
+        return snapshot
+    previous = AgentSnapshot.load(path)
+    if previous is not None and previous.agent_path == snapshot.agent_path:
+        if previous.fingerprint == snapshot.fingerprint:
+            logging.info(f"📸 Agent unchanged since the snapshot in '{path}'.")
+        else:
+            changes = snapshot.diff(previous)
+            logging.info(f"📸 Changes since the snapshot in '{path}': " + "; ".join(
+                f"{kind.replace('_', ' ')}: " + ", ".join(f"{len(names)} {change}" for change, names in kind_changes.items())
+                for kind, kind_changes in changes.items()))
+    snapshot.save(path)
+    logging.info(f"📸 Agent snapshot ({len(snapshot.intents)} intents, {len(snapshot.entity_types)} entity types, "
+                 f"fingerprint {snapshot.fingerprint[:12]}) saved to '{path}'.")
+    return snapshot
@@ -0,0 +1,386 @@
+import logging
+from dataclasses import dataclass, field
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CREATE = "create"
+UPDATE = "update"
+DELETE = "delete"
+UNCHANGED = "unchanged"
+
+ENTITY_TYPE = "entity_type"
+INTENT = "intent"
+
+# Built-in intents every CX agent has (Default Welcome Intent / Default Negative Intent); never pruned.
+PROTECTED_INTENT_IDS = {"00000000-0000-0000-0000-000000000000", "00000000-0000-0000-0000-000000000001"}
+
+SYS_ENTITY_MARKER = "/entityTypes/sys."
+
+
+def _enum_name(value) -> str:
+    """Returns the name of a proto enum value, or the value itself if it is already a string."""
+    return getattr(value, "name", value)
+
+
+@dataclass
+class PlanItem:
+    """One planned change to a single agent resource."""
+    action: str
+    resource: str
+    display_name: str
+    fields: list = field(default_factory=list)
+    desired: dict = None
+    live: object = None
+
+
+@dataclass
+class SyncPlan:
+    """The set of changes needed to make the live agent match the YAML configuration."""
+    entity_types: list = field(default_factory=list)
+    intents: list = field(default_factory=list)
+
+    def counts(self) -> dict:
+        """
+        Counts planned actions per resource type.
+
+        Returns:
+            dict: {resource: {action: count}}.
+        """
+        counts = {}
+        for item in self.entity_types + self.intents:
+            resource_counts = counts.setdefault(item.resource, {CREATE: 0, UPDATE: 0, DELETE: 0, UNCHANGED: 0})
+            resource_counts[item.action] += 1
+        return counts
+
+    def has_changes(self) -> bool:
+        return any(item.action != UNCHANGED for item in self.entity_types + self.intents)
+
+    def format(self) -> str:
+        """
+        Renders the plan as a human-readable diff.
+
+        Returns:
+            str: One line per changed resource followed by a summary.
+        """
+        symbols = {CREATE: "+", UPDATE: "~", DELETE: "-"}
+        lines = []
+        for item in self.entity_types + self.intents:
+            if item.action == UNCHANGED:
+                continue
+            fields_text = f" ({', '.join(item.fields)})" if item.fields else ""
+            lines.append(f"{symbols[item.action]} {item.resource} '{item.display_name}'{fields_text}")
+        if not lines:
+            lines.append("No changes. The agent is up to date.")
+        for resource, resource_counts in self.counts().items():
+            lines.append(f"{resource}: " + ", ".join(f"{count} to {action}" if action != UNCHANGED else f"{count} unchanged"
+                                                    for action, count in resource_counts.items()))
+        return "\n".join(lines)
+
+
+class AgentSynchronizer:
+    def __init__(self, agent_manager, prune: bool = False):
+        """
+        Initializes the synchronizer.
+
+        Args:
+            agent_manager (DialogflowAgentManager): Manager whose clients and formatting helpers are used.
+            prune (bool): Whether to delete intents and entity types that are not in the YAML.
+        """
+        self.agent_manager = agent_manager
+        self.prune = prune
+        self.live_intents = None
+        self.live_entity_types = None
+        self._live_entity_types_by_name = {}
+        self._live_intents_by_name = {}
+        self._entity_type_names = {}
+
+    def fetch_snapshot(self):
+        """Lists the agent's intents and entity types once; every later comparison uses this snapshot."""
+        manager = self.agent_manager
+        self.live_entity_types = list(manager.call_api(manager.entities_client.list_entity_types, "list entity types",
+                                                       agent_id=manager.agent_path))
+        self.live_intents = list(manager.call_api(manager.intents_client.list_intents, "list intents", agent_id=manager.agent_path))
+        manager.register_entity_types(self.live_entity_types)
+        self._live_entity_types_by_name = {ent.display_name: ent for ent in self.live_entity_types}
+        self._live_intents_by_name = {intent.display_name: intent for intent in self.live_intents}
+        self._entity_type_names = {ent.name: ent.display_name for ent in self.live_entity_types}
+        logging.info(f"📥 Snapshot of live agent: {len(self.live_intents)} intents, {len(self.live_entity_types)} entity types.")
+
+    # --- Normalization -------------------------------------------------------------------------
+
+    @staticmethod
+    def normalize_entity_type(payload: dict) -> dict:
+        """
+        Normalizes a create_entity_type payload into the common comparison form.
+
+        Args:
+            payload (dict): Output of DialogflowAgentManager.build_entity_payload.
+
+        Returns:
+            dict: Comparable field values keyed by API field name.
+        """
+        return {
+            "kind": payload["kind"],
+            "auto_expansion_mode": payload["auto_expansion_mode"],
+            "entities": tuple(sorted((e["value"], tuple(sorted(e["synonyms"]))) for e in payload["entities"]))
+        }
+
+    @staticmethod
+    def normalize_live_entity_type(entity_type) -> dict:
+        """
+        Normalizes a live EntityType into the common comparison form.
+
+        Args:
+            entity_type: EntityType object returned by list_entity_types.
+
+        Returns:
+            dict: Comparable field values keyed by API field name.
+        """
+        return {
+            "kind": _enum_name(entity_type.kind),
+            "auto_expansion_mode": _enum_name(entity_type.auto_expansion_mode),
+            "entities": tuple(sorted((e.value, tuple(sorted(e.synonyms))) for e in entity_type.entities))
+        }
+
+    @staticmethod
+    def _normalize_training_phrases(training_phrases: list) -> tuple:
+        normalized = []
+        for tp in training_phrases:
+            parts = tuple((part["text"], part.get("parameter_id") or "") for part in tp["parts"])
+            normalized.append((parts, max(1, tp["repeat_count"] or 1)))
+        return tuple(sorted(normalized))
+
+    def normalize_intent(self, intent_data: dict) -> dict:
+        """
+        Normalizes a YAML intent into the common comparison form. Parameters keep
+        entity type display names, so no resolution calls are needed for planning.
+
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+
+        Returns:
+            dict: Comparable field values keyed by API field name.
+        """
+        display_name = intent_data["display_name"]
+        return {
+            "description": intent_data.get('description', f"Intent for {display_name}"),
+            "priority": intent_data.get('priority', 500000),
+            "is_fallback": intent_data.get('is_fallback', False),
+            "training_phrases": self.agent_manager.compile_training_phrases(intent_data).comparison_key,
+            "parameters": tuple(sorted(self.agent_manager.iter_valid_parameters(intent_data)))
+        }
+
+    def normalize_live_intent(self, intent, entity_type_names: dict) -> dict:
+        """
+        Normalizes a live Intent into the common comparison form.
+
+        Args:
+            intent: Intent object returned by list_intents.
+            entity_type_names (dict): Entity type resource name -> display name.
+
+        Returns:
+            dict: Comparable field values keyed by API field name.
+        """
+        training_phrases = [
+            {"parts": [{"text": part.text, "parameter_id": part.parameter_id} for part in tp.parts],
+             "repeat_count": tp.repeat_count}
+            for tp in intent.training_phrases
+        ]
+        parameters = []
+        for param in intent.parameters:
+            entity_type = param.entity_type
+            if SYS_ENTITY_MARKER in entity_type:
+                entity_type = "@" + entity_type.rsplit("/", 1)[-1]
+            else:
+                entity_type = entity_type_names.get(entity_type, entity_type)
+            parameters.append((param.id, entity_type, bool(param.is_list)))
+        return {
+            "description": intent.description,
+            "priority": intent.priority,
+            "is_fallback": bool(intent.is_fallback),
+            "training_phrases": self._normalize_training_phrases(training_phrases),
+            "parameters": tuple(sorted(parameters))
+        }
+
+    # --- Planning ------------------------------------------------------------------------------
+
+    @staticmethod
+    def _diff_fields(desired: dict, live: dict) -> list:
+        return [name for name in desired if desired[name] != live.get(name)]
+
+    def plan_entity_type(self, entity: dict) -> PlanItem:
+        """
+        Plans one YAML entity type against the snapshot.
+
+        Args:
+            entity (dict): One entry of the YAML 'entities' list.
+
+        Returns:
+            PlanItem: The create / update / unchanged item, or None if the entity is malformed.
+        """
+        payload = self.agent_manager.build_entity_payload(entity)
+        if payload is None:
+            return None
+        display_name = payload["display_name"]
+        live = self._live_entity_types_by_name.get(display_name)
+        if live is None:
+            return PlanItem(CREATE, ENTITY_TYPE, display_name, desired=entity)
+        changed = self._diff_fields(self.normalize_entity_type(payload), self.normalize_live_entity_type(live))
+        return PlanItem(UPDATE if changed else UNCHANGED, ENTITY_TYPE, display_name, fields=changed, desired=entity, live=live)
+
+    def plan_intent(self, intent_data: dict) -> PlanItem:
+        """
+        Plans one YAML intent against the snapshot.
+
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+
+        Returns:
+            PlanItem: The create / update / unchanged item, or None if the intent is malformed.
+        """
+        display_name = intent_data.get("display_name")
+        if not display_name:
+            logging.warning(f"Skipping intent due to missing display_name: {intent_data}")
+            return None
+        live = self._live_intents_by_name.get(display_name)
+        if live is None:
+            return PlanItem(CREATE, INTENT, display_name, desired=intent_data)
+        changed = self._diff_fields(self.normalize_intent(intent_data),
+                                    self.normalize_live_intent(live, self._entity_type_names))
+        return PlanItem(UPDATE if changed else UNCHANGED, INTENT, display_name, fields=changed, desired=intent_data, live=live)
+
+    def plan_prunes(self, wanted_entity_types: set, wanted_intents: set) -> tuple:
+        """
+        Plans deletions of live resources that are not in the YAML. Returns nothing unless prune is enabled.
+
+        Args:
+            wanted_entity_types (set): Entity type display names defined in the YAML.
+            wanted_intents (set): Intent display names defined in the YAML.
+
+        Returns:
+            tuple: (entity type delete items, intent delete items).
+        """
+        if not self.prune:
+            return [], []
+        intent_deletes = [PlanItem(DELETE, INTENT, display_name, live=live)
+                          for display_name, live in self._live_intents_by_name.items()
+                          if display_name not in wanted_intents and live.name.rsplit("/", 1)[-1] not in PROTECTED_INTENT_IDS]
+        entity_type_deletes = [PlanItem(DELETE, ENTITY_TYPE, display_name, live=live)
+                               for display_name, live in self._live_entity_types_by_name.items()
+                               if display_name not in wanted_entity_types]
+        return entity_type_deletes, intent_deletes
+
+    def build_plan(self, config_data: dict) -> SyncPlan:
+        """
+        Computes the create / update / delete / unchanged plan for the YAML configuration.
+        Fetches the live snapshot first if it has not been fetched yet.
+
+        Args:
+            config_data (dict): The loaded YAML configuration data.
+
+        Returns:
+            SyncPlan: The planned changes.
+        """
+        if self.live_intents is None:
+            self.fetch_snapshot()
+        plan = SyncPlan()
+        plan.entity_types = [item for item in map(self.plan_entity_type, config_data.get("entities", [])) if item]
+        plan.intents = [item for item in map(self.plan_intent, config_data.get("intents", [])) if item]
+
+        entity_type_deletes, intent_deletes = self.plan_prunes({item.display_name for item in plan.entity_types},
+                                                               {item.display_name for item in plan.intents})
+        plan.entity_types.extend(entity_type_deletes)
+        plan.intents.extend(intent_deletes)
+        return plan
+
+    # --- Execution -----------------------------------------------------------------------------
+
+    def apply_entity_type(self, item: PlanItem) -> str:
+        """
+        Executes one entity type plan item.
+
+        Args:
+            item (PlanItem): The plan item.
+
+        Returns:
+            str: 'created', 'updated', 'deleted', 'unchanged', 'skipped' or 'error'.
+        """
+        manager = self.agent_manager
+        if item.action == UNCHANGED:
+            return "unchanged"
+        if item.action == CREATE:
+            return manager.create_entity(item.desired)
+        try:
+            if item.action == UPDATE:
+                payload = manager.build_entity_payload(item.desired)
+                manager.call_api(
+                    manager.entities_client.update_entity_type, f"update entity '{item.display_name}'",
+                    entity_type_id=item.live.name, obj=item.live,
+                    **{name: payload[name] for name in item.fields}
+                )
+                logging.info(f"🔄 Updated custom entity '{item.display_name}' ({', '.join(item.fields)})")
+                return "updated"
+            manager.call_api(manager.entities_client.delete_entity_type, f"delete entity '{item.display_name}'",
+                             entity_id=item.live.name)
+            logging.info(f"🗑️ Deleted custom entity '{item.display_name}'")
+            return "deleted"
+        except Exception as e:
+            logging.error(f"❌ Error trying to {item.action} entity '{item.display_name}': {e}")
+            return "error"
+
+    def apply_intent(self, item: PlanItem) -> str:
+        """
+        Executes one intent plan item.
+
+        Args:
+            item (PlanItem): The plan item.
+
+        Returns:
+            str: 'created', 'updated', 'deleted', 'unchanged', 'skipped' or 'error'.
+        """
+        manager = self.agent_manager
+        if item.action == UNCHANGED:
+            return "unchanged"
+        if item.action == CREATE:
+            return manager.create_intent(item.desired)
+        try:
+            if item.action == UPDATE:
+                payload = manager.build_intent_payload(item.desired)
+                payload.setdefault("parameters", [])
+                manager.call_api(
+                    manager.intents_client.update_intent, f"update intent '{item.display_name}'",
+                    intent_id=item.live.name, obj=item.live,
+                    **{name: payload[name] for name in item.fields}
+                )
+                logging.info(f"🔄 Updated intent '{item.display_name}' ({', '.join(item.fields)})")
+                return "updated"
+            manager.call_api(manager.intents_client.delete_intent, f"delete intent '{item.display_name}'",
+                             intent_id=item.live.name)
+            logging.info(f"🗑️ Deleted intent '{item.display_name}'")
+            return "deleted"
+        except Exception as e:
+            logging.error(f"❌ Error trying to {item.action} intent '{item.display_name}': {e}")
+            return "error"
+
+    def apply(self, plan: SyncPlan) -> dict:
+        """
+        Executes only the RPCs the plan needs. Entity types are created/updated before
+        intents, and pruned intents are deleted before pruned entity types they may reference.
+
+        Args:
+            plan (SyncPlan): Plan produced by build_plan.
+
+        Returns:
+            dict: Count of results by outcome.
+        """
+        results = {}
+        ordered = [item for item in plan.entity_types if item.action != DELETE] + \
+                  [item for item in plan.intents if item.action != DELETE] + \
+                  [item for item in plan.intents if item.action == DELETE] + \
+                  [item for item in plan.entity_types if item.action == DELETE]
+        for item in ordered:
+            apply_item = self.apply_entity_type if item.resource == ENTITY_TYPE else self.apply_intent
+            outcome = apply_item(item)
+            results[outcome] = results.get(outcome, 0) + 1
+        logging.info("📋 Sync complete: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(results.items())))
+        return results
@@ -0,0 +1,333 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import numpy as np
+from scipy import sparse
+
+from config_shards import load_agent_config_data
+from training_phrases import PhraseCompiler
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Intent pairs whose mean similarity is computed at once.
+MEAN_SIMILARITY_CHUNK = 4096
+
+
+def flatten_phrases(config_data: dict):
+    """
+    Flattens every intent's training phrases (plain strings, text_parts and bracket
+    annotations) into plain text. Intents without a display name are skipped.
+
+    Args:
+        config_data (dict): The loaded agent configuration (intents may be a lazy iterable).
+
+    Returns:
+        tuple: (phrases, owners, intent_names) where owners[i] is the index in
+            intent_names of the intent phrases[i] belongs to.
+    """
+    phrases, owners, intent_names = [], [], []
+    compiler = PhraseCompiler()
+    for intent in config_data.get("intents") or []:
+        name = intent.get("display_name")
+        if not name:
+            logging.warning("Skipping an intent without a display_name.")
+            continue
+        intent_id = len(intent_names)
+        intent_names.append(name)
+        texts = compiler.compile(intent.get("training_phrases"), name).texts
+        phrases.extend(texts)
+        owners.extend([intent_id] * len(texts))
+    return phrases, np.asarray(owners, dtype=np.int32), intent_names
+
+
+def tfidf_char_ngrams(phrases: list, min_n: int = 3, max_n: int = 5) -> sparse.csr_matrix:
+    """
+    Builds an L2-normalized TF-IDF matrix of character n-grams (one row per phrase),
+    so that row dot products are cosine similarities.
+
+    N-grams are taken over the UTF-8 bytes of the lower-cased phrases and encoded as
+    integers with NumPy, so no per-n-gram Python work is done.
+
+    Args:
+        phrases (list): Plain text phrases.
+        min_n (int): Shortest n-gram (at most 7, so codes fit in 64 bits).
+        max_n (int): Longest n-gram.
+
+    Returns:
+        scipy.sparse.csr_matrix: float32 matrix of shape (len(phrases), vocabulary size).
+    """
+    encoded = [f" {' '.join(phrase.lower().split())} ".encode("utf-8") for phrase in phrases]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    text = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    row_of_byte = np.repeat(np.arange(len(phrases)), lengths)
+    offset_in_row = np.arange(len(text)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    row_length = np.repeat(lengths, lengths)
+
+    rows, codes = [], []
+    for n in range(min_n, max_n + 1):
+        if len(text) < n:
+            break
+        code = np.zeros(len(text) - n + 1, dtype=np.uint64)
+        for i in range(n):
+            code = (code << np.uint64(8)) | text[i:len(text) - n + 1 + i]
+        # Keep n-grams that lie within a single phrase; the length marker keeps codes of different n apart.
+        inside = offset_in_row[:len(code)] + n <= row_length[:len(code)]
+        rows.append(row_of_byte[:len(code)][inside])
+        codes.append(code[inside] | (np.uint64(n) << np.uint64(56)))
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.uint64)
+    vocabulary, columns = np.unique(codes, return_inverse=True)
+
+    # Duplicate (row, column) entries are summed into term counts.
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns.ravel())),
+                               shape=(len(phrases), max(len(vocabulary), 1)))
+    matrix.sum_duplicates()
+    # Sublinear term frequency and smoothed inverse document frequency.
+    np.log1p(matrix.data, out=matrix.data)
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = (np.log((1 + len(phrases)) / (1 + document_frequency)) + 1).astype(np.float32)
+    matrix.data *= idf[matrix.indices]
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr)).astype(np.float32)
+    return matrix
+
+
+class AmbiguityReport:
+    def __init__(self, phrases: list, owners: np.ndarray, intent_names: list, threshold: float, top_k: int):
+        """
+        Cross-intent similarity results. Only intent pairs with at least one conflict are
+        kept (as parallel arrays keyed by pair), so memory grows with the number of
+        conflicting pairs rather than with the square of the number of intents.
+
+        Args:
+            phrases (list): Plain text phrases.
+            owners (np.ndarray): Intent index of each phrase.
+            intent_names (list): Intent display names.
+            threshold (float): Cosine similarity at which a cross-intent pair counts as a conflict.
+            top_k (int): Number of most similar pairs kept.
+        """
+        self.phrases = phrases
+        self.owners = owners
+        self.intent_names = intent_names
+        self.threshold = threshold
+        self.top_k = top_k
+        # Intent pair key a * len(intent_names) + b (a < b), sorted, with its conflict count,
+        # maximum and (once finished) mean phrase similarity.
+        self.pair_keys = np.empty(0, dtype=np.int64)
+        self.conflicts = np.empty(0, dtype=np.int64)
+        self.max_similarity = np.empty(0, dtype=np.float32)
+        self.mean_similarity = np.zeros(0, dtype=np.float32)
+        self._pair_rows = np.empty(0, dtype=np.int64)
+        self._pair_cols = np.empty(0, dtype=np.int64)
+        self._pair_scores = np.empty(0, dtype=np.float32)
+
+    def _split_keys(self) -> tuple:
+        """Returns the (a, b) intent indices of every conflicting intent pair."""
+        return np.divmod(self.pair_keys, max(len(self.intent_names), 1))
+
+    def add_block(self, rows: np.ndarray, cols: np.ndarray, scores: np.ndarray):
+        """Folds one block of conflicting cross-intent pairs (phrase indices and similarities) into the report."""
+        first, second = self.owners[rows].astype(np.int64), self.owners[cols].astype(np.int64)
+        keys = np.minimum(first, second) * len(self.intent_names) + np.maximum(first, second)
+        self.pair_keys, inverse = np.unique(np.concatenate([self.pair_keys, keys]), return_inverse=True)
+        inverse = inverse.ravel()
+        conflicts = np.zeros(len(self.pair_keys), dtype=np.int64)
+        np.add.at(conflicts, inverse, np.concatenate([self.conflicts, np.ones(len(keys), dtype=np.int64)]))
+        max_similarity = np.zeros(len(self.pair_keys), dtype=np.float32)
+        np.maximum.at(max_similarity, inverse, np.concatenate([self.max_similarity, scores]))
+        self.conflicts, self.max_similarity = conflicts, max_similarity
+
+        # Keep only the running top_k pairs, so memory does not grow with the number of blocks.
+        self._pair_rows = np.concatenate([self._pair_rows, rows])
+        self._pair_cols = np.concatenate([self._pair_cols, cols])
+        self._pair_scores = np.concatenate([self._pair_scores, scores])
+        if len(self._pair_scores) > self.top_k:
+            keep = np.argpartition(-self._pair_scores, self.top_k)[:self.top_k]
+            self._pair_rows, self._pair_cols, self._pair_scores = \
+                self._pair_rows[keep], self._pair_cols[keep], self._pair_scores[keep]
+
+    def finish(self, centroids: sparse.csr_matrix = None):
+        """
+        Computes the mean similarity of each conflicting intent pair once all blocks are in.
+
+        Args:
+            centroids (scipy.sparse.csr_matrix): Mean TF-IDF vector of each intent (one row per intent);
+                the mean pairwise cosine between two intents is the dot product of their centroids.
+        """
+        self.mean_similarity = np.zeros(len(self.pair_keys), dtype=np.float32)
+        if centroids is None:
+            return
+        first, second = self._split_keys()
+        # In chunks: centroids are much denser than phrase vectors.
+        for start in range(0, len(first), MEAN_SIMILARITY_CHUNK):
+            stop = start + MEAN_SIMILARITY_CHUNK
+            products = centroids[first[start:stop]].multiply(centroids[second[start:stop]])
+            self.mean_similarity[start:stop] = np.asarray(products.sum(axis=1)).ravel()
+
+    def top_pairs(self) -> list:
+        """
+        Returns:
+            list: Dicts (intent_a, phrase_a, intent_b, phrase_b, similarity), most similar first.
+        """
+        order = np.argsort(-self._pair_scores, kind="stable")
+        return [{
+            "intent_a": self.intent_names[self.owners[i]], "phrase_a": self.phrases[i],
+            "intent_b": self.intent_names[self.owners[j]], "phrase_b": self.phrases[j],
+            "similarity": round(float(score), 4),
+        } for i, j, score in zip(self._pair_rows[order], self._pair_cols[order], self._pair_scores[order])]
+
+    def intent_pairs(self) -> list:
+        """
+        Returns:
+            list: Dicts (intent_a, intent_b, conflicts, max_similarity, mean_similarity) for intent
+                pairs with at least one conflict, most conflicting first.
+        """
+        first, second = self._split_keys()
+        pairs = [{
+            "intent_a": self.intent_names[a], "intent_b": self.intent_names[b],
+            "conflicts": int(conflicts), "max_similarity": round(float(max_similarity), 4),
+            "mean_similarity": round(float(mean_similarity), 4),
+        } for a, b, conflicts, max_similarity, mean_similarity
+            in zip(first, second, self.conflicts, self.max_similarity, self.mean_similarity)]
+        pairs.sort(key=lambda pair: (-pair["conflicts"], -pair["max_similarity"]))
+        return pairs
+
+    def heatmap(self):
+        """
+        Yields the intent x intent conflict counts, restricted to intents with at least one
+        conflict: first the header (intent names), then one row per intent.
+        """
+        first, second = self._split_keys()
+        involved = np.unique(np.concatenate([first, second]))
+        position = {intent: i for i, intent in enumerate(involved.tolist())}
+        rows = np.fromiter((position[a] for a in first.tolist()), dtype=np.int64, count=len(first))
+        cols = np.fromiter((position[b] for b in second.tolist()), dtype=np.int64, count=len(second))
+        counts = sparse.coo_matrix((self.conflicts, (rows, cols)), shape=(len(involved), len(involved))).tocsr()
+        counts = (counts + counts.T).tocsr()
+        yield [self.intent_names[intent] for intent in involved]
+        for i in range(len(involved)):
+            yield counts[i].toarray().ravel().tolist()
+
+    def write(self, output_dir: str, formats: tuple = ("csv", "json")):
+        """
+        Writes the report files into output_dir:
+        ambiguity_pairs.csv, ambiguity_heatmap.csv and/or ambiguity_report.json.
+
+        Args:
+            output_dir (str): Destination directory (created if needed).
+            formats (tuple): Any of 'csv' and 'json'.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        pairs = self.top_pairs()
+        if "csv" in formats:
+            with open(os.path.join(output_dir, "ambiguity_pairs.csv"), "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=["intent_a", "phrase_a", "intent_b", "phrase_b", "similarity"])
+                writer.writeheader()
+                writer.writerows(pairs)
+            with open(os.path.join(output_dir, "ambiguity_heatmap.csv"), "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                heatmap = self.heatmap()
+                names = next(heatmap)
+                writer.writerow(["intent"] + names)
+                for name, row in zip(names, heatmap):
+                    writer.writerow([name] + row)
+        if "json" in formats:
+            report = {
+                "phrases": len(self.phrases),
+                "intents": len(self.intent_names),
+                "threshold": self.threshold,
+                "top_pairs": pairs,
+                "intent_pairs": self.intent_pairs(),
+            }
+            with open(os.path.join(output_dir, "ambiguity_report.json"), "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        logging.info(f"Ambiguity report written to '{output_dir}'.")
+
+
+def analyze_ambiguity(config_data: dict, threshold: float = 0.6, top_k: int = 100, block_size: int = 256) -> AmbiguityReport:
+    """
+    Computes cosine similarities between all phrases of different intents, block by
+    block: each block of `block_size` rows is multiplied against the rows after it, so
+    peak memory is about block_size x N similarities instead of a dense N x N matrix.
+    The mean similarity of each conflicting intent pair is computed exactly from
+    per-intent centroids.
+
+    Args:
+        config_data (dict): The loaded agent configuration.
+        threshold (float): Cosine similarity at which a cross-intent pair counts as a conflict.
+        top_k (int): Number of most similar conflicting pairs to keep.
+        block_size (int): Rows per matrix product.
+
+    Returns:
+        AmbiguityReport: The results.
+
+    Raises:
+        ValueError: If threshold is not positive (pairs the sparse product leaves out would
+            count as conflicts too).
+    """
+    if threshold <= 0:
+        raise ValueError("threshold must be greater than 0.")
+    phrases, owners, intent_names = flatten_phrases(config_data)
+    report = AmbiguityReport(phrases, owners, intent_names, threshold, top_k)
+    logging.info(f"Analyzing {len(phrases)} phrases across {len(intent_names)} intents.")
+    if not phrases:
+        report.finish()
+        return report
+
+    matrix = tfidf_char_ngrams(phrases)
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(phrases), block_size):
+        stop = min(start + block_size, len(phrases))
+        # Upper triangle only: block rows against themselves and every later row.
+        block = (matrix[start:stop] @ transposed[:, start:]).toarray()
+        square = stop - start
+        block[:, :square] = np.triu(block[:, :square], k=1)
+        rows, cols = np.nonzero(block >= threshold)
+        scores = block[rows, cols]
+        rows += start
+        cols += start
+        cross_intent = owners[rows] != owners[cols]
+        report.add_block(rows[cross_intent], cols[cross_intent], scores[cross_intent])
+
+    membership = sparse.csr_matrix((np.ones(len(phrases), dtype=np.float32), (owners, np.arange(len(phrases)))),
+                                   shape=(len(intent_names), len(phrases)))
+    sizes = np.maximum(np.asarray(membership.sum(axis=1)).ravel(), 1)
+    report.finish((sparse.diags(1 / sizes).astype(np.float32) @ membership @ matrix).tocsr())
+
+    logging.info(f"Found {int(report.conflicts.sum())} cross-intent phrase pair(s) with similarity >= {threshold} "
+                 f"between {len(report.pair_keys)} intent pair(s).")
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Report training phrases that are similar across intents.")
+    parser.add_argument("agent_config", help="Agent configuration YAML or shard directory to analyze "
+                                             "(e.g. agent_config_params.yaml).")
+    parser.add_argument("--output-dir", default="ambiguity_report", help="Directory for the report files.")
+    parser.add_argument("--format", choices=["csv", "json", "both"], default="both", help="Report file format(s).")
+    parser.add_argument("--threshold", type=float, default=0.6,
+                        help="Cosine similarity (0-1) at which two phrases of different intents conflict.")
+    parser.add_argument("--top", type=int, default=100, help="Number of most similar phrase pairs to report.")
+    parser.add_argument("--block-size", type=int, default=256, help="Phrases per block of the similarity computation.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.threshold <= 0:
+        logging.error("--threshold must be greater than 0.")
+        exit(1)
+    config_data = load_agent_config_data(args.agent_config) or {}
+    report = analyze_ambiguity(config_data, threshold=args.threshold, top_k=args.top, block_size=args.block_size)
+    report.write(args.output_dir, ("csv", "json") if args.format == "both" else (args.format,))
+    for pair in report.top_pairs()[:10]:
+        logging.info(f"   {pair['similarity']:.2f}  '{pair['phrase_a']}' ({pair['intent_a']})  <->  "
+                     f"'{pair['phrase_b']}' ({pair['intent_b']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmarks entity tagging of generated phrases against the number of entity synonyms.
+
+Compares the compiled EntityMatcher with the original per-position regex scan
+that GeminiEnricher._format_phrase_with_entities used, and checks that both
+produce identical 'text_parts' for every phrase.
+
+Usage:
+    python benchmarks/bench_entity_tagging.py --synonyms 100 1000 10000 --phrases 200
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from entity_matcher import EntityMatcher
+
+WORDS = ["order", "status", "please", "my", "the", "check", "account", "balance", "send", "box",
+         "apple", "banana", "red", "green", "large", "small", "today", "delivery", "track", "number"]
+
+
+def legacy_format_phrase_with_entities(phrase: str, entities_for_matching: list) -> dict or str:
+    """Reference copy of the regex-based tagger that EntityMatcher replaced."""
+    parts = []
+    current_index = 0
+
+    while current_index < len(phrase):
+        best_match = None
+        best_match_text = ""
+        best_match_param_id = None
+        best_match_start = -1
+
+        for em in entities_for_matching:
+            entity_text = em["text"]
+            match = re.search(re.escape(entity_text), phrase[current_index:], re.IGNORECASE)
+            if match and match.start() == 0:
+                if len(entity_text) > len(best_match_text):
+                    best_match = match
+                    best_match_text = entity_text
+                    best_match_param_id = em["parameter_id"]
+                    best_match_start = current_index
+
+        if best_match:
+            if best_match_start > 0:
+                parts.append({"text": phrase[current_index:current_index + best_match.start()]})
+            matched_text_in_phrase = phrase[current_index + best_match.start():current_index + best_match.end()]
+            parts.append({"text": matched_text_in_phrase, "parameter_id": best_match_param_id})
+            current_index += best_match.end()
+        else:
+            next_entity_start_index = len(phrase)
+            for em in entities_for_matching:
+                match = re.search(re.escape(em["text"]), phrase[current_index:], re.IGNORECASE)
+                if match:
+                    next_entity_start_index = min(next_entity_start_index, current_index + match.start())
+            if next_entity_start_index > current_index:
+                parts.append({"text": phrase[current_index:next_entity_start_index]})
+                current_index = next_entity_start_index
+            else:
+                parts.append({"text": phrase[current_index:]})
+                current_index = len(phrase)
+
+    if len(parts) == 1 and "parameter_id" not in parts[0]:
+        return parts[0]["text"]
+    else:
+        return {"text_parts": parts}
+
+
+def make_entities(synonym_count: int, rng: random.Random) -> list:
+    """Builds a synonym list shaped like GeminiEnricher._prepare_entities_for_matching output."""
+    entities = []
+    for i in range(synonym_count):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        text = " ".join(words) if i % 4 else f"{words[0]}-{i}"
+        entities.append({"text": text, "parameter_id": f"entity-{i % 50}"})
+    entities.sort(key=lambda x: len(x["text"]), reverse=True)
+    return entities
+
+
+def make_phrases(phrase_count: int, entities: list, rng: random.Random) -> list:
+    phrases = []
+    for _ in range(phrase_count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 12))]
+        words.insert(rng.randint(0, len(words)), rng.choice(entities)["text"].upper())
+        phrases.append(" ".join(words) + "?")
+    return phrases
+
+
+def time_call(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(synonym_counts: list, phrase_count: int, legacy_limit: int, seed: int):
+    rng = random.Random(seed)
+    print(f"{'synonyms':>9} {'build_s':>9} {'matcher_phr/s':>14} {'legacy_phr/s':>13} {'speedup':>8} {'parity':>7}")
+    for synonym_count in synonym_counts:
+        entities = make_entities(synonym_count, rng)
+        phrases = make_phrases(phrase_count, entities, rng)
+
+        matcher, build_seconds = time_call(EntityMatcher, entities)
+        tagged, matcher_seconds = time_call(lambda: [matcher.format_phrase(p) for p in phrases])
+        matcher_rate = len(phrases) / matcher_seconds
+
+        legacy_rate = None
+        parity = "n/a"
+        if synonym_count <= legacy_limit:
+            sample = phrases[:max(1, min(len(phrases), 20000 // max(1, synonym_count)))]
+            legacy, legacy_seconds = time_call(lambda: [legacy_format_phrase_with_entities(p, entities) for p in sample])
+            legacy_rate = len(sample) / legacy_seconds
+            parity = "ok" if legacy == tagged[:len(sample)] else "FAIL"
+
+        legacy_text = f"{legacy_rate:13.1f}" if legacy_rate else f"{'skipped':>13}"
+        speedup_text = f"{matcher_rate / legacy_rate:7.0f}x" if legacy_rate else f"{'-':>8}"
+        print(f"{synonym_count:>9} {build_seconds:9.3f} {matcher_rate:14.1f} {legacy_text} {speedup_text} {parity:>7}")
+        if parity == "FAIL":
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark entity tagging throughput by synonym count.")
+    parser.add_argument("--synonyms", type=int, nargs="+", default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument("--phrases", type=int, default=500)
+    parser.add_argument("--legacy-limit", type=int, default=10000,
+                        help="Largest synonym count to also run the legacy regex tagger on.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.synonyms, args.phrases, args.legacy_limit, args.seed)
@@ -0,0 +1,120 @@
+"""
+Benchmarks training phrase formatting: the compiled, memoized phrase model
+(training_phrases.PhraseCompiler) against the per-call dict building that
+DialogflowAgentManager.format_training_phrases used before.
+
+Phrases are a mix of plain strings, 'text_parts' mappings and bracket-annotated
+strings. Reports phrases per second for:
+
+- legacy:  rebuilding the payload dicts on every call (annotations stay literal text);
+- compile: first compilation (parsing, hashing and building the payload);
+- reuse:   formatting the same intents again, served from the content-hash memo;
+- compare: building the sync comparison form (legacy, then the compiled comparison key
+  the first time and when it is reused, as when an intent is planned and then verified).
+
+Usage:
+    python benchmarks/bench_phrase_formatting.py --phrases 100000 --per-intent 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from training_phrases import PhraseCompiler
+
+WORDS = ["order", "status", "please", "my", "the", "check", "account", "balance", "send", "box",
+         "apple", "banana", "red", "green", "large", "small", "today", "delivery", "track", "number"]
+
+
+def legacy_format_training_phrases(intent_data: dict) -> list:
+    """Reference copy of the formatting that PhraseCompiler replaced."""
+    formatted_training_phrases = []
+    for phrase_item in intent_data.get('training_phrases', []):
+        if isinstance(phrase_item, str):
+            formatted_training_phrases.append({"parts": [{"text": phrase_item}], "repeat_count": 1})
+        elif isinstance(phrase_item, dict) and "text_parts" in phrase_item:
+            parts = phrase_item["text_parts"]
+            if all("text" in part for part in parts):
+                formatted_training_phrases.append({"parts": parts, "repeat_count": phrase_item.get("repeat_count", 1)})
+    return formatted_training_phrases
+
+
+def legacy_comparison_key(training_phrases: list) -> tuple:
+    """Reference copy of AgentSynchronizer._normalize_training_phrases on the legacy payload."""
+    normalized = []
+    for tp in training_phrases:
+        parts = tuple((part["text"], part.get("parameter_id") or "") for part in tp["parts"])
+        normalized.append((parts, max(1, tp["repeat_count"] or 1)))
+    return tuple(sorted(normalized))
+
+
+def make_phrase(rng: random.Random):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(4, 12))]
+    position = rng.randint(0, len(words) - 1)
+    kind = rng.random()
+    if kind < 0.6:
+        return " ".join(words)
+    before, value, after = " ".join(words[:position]), words[position].upper(), " ".join(words[position + 1:])
+    if kind < 0.85:
+        parts = [{"text": f"{before} "}, {"text": value, "parameter_id": "item"}]
+        if after:
+            parts.append({"text": f" {after}"})
+        return {"text_parts": parts, "repeat_count": 1}
+    return f"{before} [{value}]{{@item}} {after}"
+
+
+def make_intents(phrase_count: int, per_intent: int, rng: random.Random) -> list:
+    return [{"display_name": f"intent.{i}",
+             "training_phrases": [make_phrase(rng) for _ in range(min(per_intent, phrase_count - i * per_intent))]}
+            for i in range((phrase_count + per_intent - 1) // per_intent)]
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(phrase_count: int, per_intent: int, seed: int):
+    intents = make_intents(phrase_count, per_intent, random.Random(seed))
+    phrases = sum(len(intent["training_phrases"]) for intent in intents)
+    compiler = PhraseCompiler(max_entries=None)
+
+    def compile_all():
+        for intent in intents:
+            compiler.compile(intent["training_phrases"], intent["display_name"]).payload
+
+    results = {
+        "legacy": timed(lambda: [legacy_format_training_phrases(intent) for intent in intents]),
+        "compile": timed(compile_all),
+        "reuse": timed(compile_all),
+        "compare (legacy)": timed(lambda: [legacy_comparison_key(legacy_format_training_phrases(intent))
+                                           for intent in intents]),
+    }
+    compare = lambda: [compiler.compile(intent["training_phrases"]).comparison_key for intent in intents]
+    results["compare (first)"] = timed(compare)
+    results["compare (reuse)"] = timed(compare)
+
+    # Parity: without annotations, the compiled payload must match the legacy one.
+    for intent in intents:
+        plain = [phrase for phrase in intent["training_phrases"] if not (isinstance(phrase, str) and "{" in phrase)]
+        if PhraseCompiler().compile(plain).payload != legacy_format_training_phrases({"training_phrases": plain}):
+            print(f"Parity FAIL for '{intent['display_name']}'")
+            sys.exit(1)
+
+    print(f"{phrases} phrases in {len(intents)} intents (memo: {compiler.hits} hits, {compiler.misses} misses)")
+    print(f"{'step':>20} {'seconds':>9} {'phrases/s':>12}")
+    for step, seconds in results.items():
+        print(f"{step:>20} {seconds:9.3f} {phrases / seconds:12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark training phrase formatting throughput.")
+    parser.add_argument("--phrases", type=int, default=100000)
+    parser.add_argument("--per-intent", type=int, default=20, help="Training phrases per intent.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.phrases, args.per_intent, args.seed)
@@ -0,0 +1,253 @@
+"""
+In-process stand-ins for the Gemini model and the Dialogflow CX Intents/EntityTypes
+clients, so enrichment and deployment can be benchmarked without network access.
+
+Every fake sleeps for a configurable latency per call, counts its calls per method,
+and is safe to use from several threads.
+"""
+import json
+import random
+import re
+import threading
+import time
+import types
+from collections import Counter, deque
+
+DEFAULT_WELCOME_INTENT_ID = "00000000-0000-0000-0000-000000000000"
+DEFAULT_NEGATIVE_INTENT_ID = "00000000-0000-0000-0000-000000000001"
+
+WORDS = ["order", "status", "please", "my", "the", "check", "account", "balance", "send", "show",
+         "what", "is", "last", "transaction", "history", "details", "can", "you", "get", "me"]
+
+
+class FakeServiceError(Exception):
+    """Raised by the fakes; messages mimic Google API errors (e.g. '429 RESOURCE_EXHAUSTED ...')."""
+
+
+class _CallStats:
+    def __init__(self, latency: float, error_rate: float, seed: int):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.errors = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def record(self, method: str, quota=None):
+        """
+        Counts a call, enforces the quota, sleeps for the configured latency and injects
+        random transient errors. Rejected calls are counted too, as they were sent.
+        """
+        with self._lock:
+            self.calls[method] += 1
+        if quota is not None:
+            quota.check()
+        with self._lock:
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeServiceError("503 UNAVAILABLE: injected transient error")
+
+
+class _Quota:
+    def __init__(self, requests_per_second: float):
+        """Sliding one-second window; calls beyond the quota fail with RESOURCE_EXHAUSTED."""
+        self.requests_per_second = requests_per_second
+        self.rejected = 0
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def check(self):
+        if not self.requests_per_second:
+            return
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 1.0:
+                self._calls.popleft()
+            if len(self._calls) >= self.requests_per_second:
+                self.rejected += 1
+                raise FakeServiceError("429 RESOURCE_EXHAUSTED: Quota exceeded for requests per second.")
+            self._calls.append(now)
+
+
+class FakeGenerativeModel:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, phrases: int = None,
+                 words_per_phrase: int = 8, seed: int = 0):
+        """
+        Fake google.generativeai GenerativeModel. Answers both the per-intent prompt
+        (numbered lines) and the batched JSON prompt of GeminiEnricher.
+
+        Args:
+            latency (float): Seconds per generate_content call.
+            error_rate (float): Probability that a call fails with a retryable 503.
+            phrases (int): Phrases per intent to return; defaults to the number requested.
+            words_per_phrase (int): Output size per phrase.
+            seed (int): Seed for errors and phrase text.
+        """
+        self.model_name = "fake-gemini"
+        self.phrases = phrases
+        self.words_per_phrase = words_per_phrase
+        self.stats = _CallStats(latency, error_rate, seed)
+        self._seed = seed
+
+    def _phrases_for(self, intent_name: str, count: int) -> list:
+        rng = random.Random(f"{self._seed}:{intent_name}")
+        return [" ".join(rng.choice(WORDS) for _ in range(self.words_per_phrase)) + f" {intent_name} {i}"
+                for i in range(self.phrases or count)]
+
+    def generate_content(self, prompt: str, generation_config: dict = None):
+        self.stats.record("generate_content")
+        if "Intents:\n" in prompt:
+            count = int(re.search(r"array of (\d+)", prompt).group(1))
+            intents = json.loads(prompt.split("Intents:\n", 1)[1])
+            text = json.dumps({intent["intent_name"]: self._phrases_for(intent["intent_name"], count)
+                               for intent in intents})
+        else:
+            count = int(re.search(r"Generate (\d+) new", prompt).group(1))
+            intent_name = re.search(r'Intent name: "(.*)"', prompt).group(1)
+            text = "\n".join(f"{i + 1}. {phrase}" for i, phrase in enumerate(self._phrases_for(intent_name, count)))
+        usage = types.SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+        return types.SimpleNamespace(text=text, usage_metadata=usage)
+
+
+class _FakeResource(types.SimpleNamespace):
+    """A stored resource; fields that were never set read as None, like unset proto fields."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return None
+
+
+def _as_resource(value):
+    """Turns request payload dicts (and lists of them) into attribute-style objects, as the API returns them."""
+    if isinstance(value, dict):
+        return _FakeResource(**{key: _as_resource(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_as_resource(item) for item in value]
+    return value
+
+
+class _FakeResourceClient:
+    def __init__(self, agent_id: str, latency: float, requests_per_second: float, error_rate: float,
+                 seed: int, existing: list, kind: str, defaults: dict):
+        self.agent_id = agent_id
+        self.stats = _CallStats(latency, error_rate, seed)
+        self.quota = _Quota(requests_per_second)
+        self._kind = kind
+        self._defaults = defaults
+        self._resources = {}
+        self.updates = []
+        self._lock = threading.Lock()
+        for display_name in existing:
+            self._store(display_name, {})
+
+    def _call(self, method: str):
+        self.stats.record(method, self.quota)
+
+    def _store(self, display_name: str, fields: dict, resource_id: str = None):
+        resource_id = resource_id or str(len(self._resources))
+        resource = _FakeResource(name=f"{self.agent_id}/{self._kind}/{resource_id}", display_name=display_name,
+                                 **{**self._defaults, **{key: _as_resource(value) for key, value in fields.items()}})
+        self._resources[display_name] = resource
+        return resource
+
+    def _update(self, obj, fields: dict):
+        """Applies an update to a stored resource and records its display name and updated fields."""
+        with self._lock:
+            self.updates.append((obj.display_name, sorted(fields)))
+            for key, value in fields.items():
+                setattr(obj, key, _as_resource(value))
+        return obj
+
+    def _create(self, display_name: str, fields: dict):
+        with self._lock:
+            if display_name in self._resources:
+                raise FakeServiceError(f"409 ALREADY_EXISTS: '{display_name}' already exists.")
+            return self._store(display_name, fields)
+
+    def _list(self):
+        with self._lock:
+            return list(self._resources.values())
+
+    def _list_page(self, request):
+        """One page of a Dialogflow CX ListIntents/ListEntityTypes request; page tokens are offsets."""
+        resources = self._list()
+        start = int(request.page_token or 0)
+        page = resources[start:start + (request.page_size or 100)]
+        next_page_token = str(start + len(page)) if start + len(page) < len(resources) else ""
+        return types.SimpleNamespace(**{self._kind_field: page}, next_page_token=next_page_token)
+
+
+class FakeIntentsClient(_FakeResourceClient):
+    def __init__(self, agent_id: str = "projects/p/locations/global/agents/fake", latency: float = 0.0,
+                 requests_per_second: float = None, error_rate: float = 0.0, seed: int = 0, existing: list = (),
+                 default_intents: bool = False):
+        """
+        Fake dfcx_scrapi Intents client. Also serves as the Dialogflow CX IntentsClient for paged
+        listing (list_intents(request=...)). Created and updated fields are stored, so a sync
+        against the fake compares them like a live agent.
+
+        Args:
+            agent_id (str): Agent resource name.
+            latency (float): Seconds per call.
+            requests_per_second (float): Quota; calls beyond it fail with 429 RESOURCE_EXHAUSTED.
+            error_rate (float): Probability that a call fails with a retryable 503.
+            seed (int): Seed for injected errors.
+            existing (list): Display names of intents that already exist (creating them fails with ALREADY_EXISTS).
+            default_intents (bool): Add the built-in Default Welcome and Default Negative intents
+                every CX agent has, with their fixed resource ids.
+        """
+        super().__init__(agent_id, latency, requests_per_second, error_rate, seed, existing, "intents",
+                         {"training_phrases": [], "parameters": [], "description": "", "priority": 0,
+                          "is_fallback": False})
+        if default_intents:
+            self._store("Default Welcome Intent", {}, DEFAULT_WELCOME_INTENT_ID)
+            self._store("Default Negative Intent", {"is_fallback": True}, DEFAULT_NEGATIVE_INTENT_ID)
+
+    def create_intent(self, agent_id=None, obj=None, display_name=None, language_code=None, **kwargs):
+        self._call("create_intent")
+        return self._create(display_name, kwargs)
+
+    _kind_field = "intents"
+
+    def list_intents(self, agent_id=None, language_code=None, request=None):
+        self._call("list_intents")
+        return self._list() if request is None else self._list_page(request)
+
+    def update_intent(self, intent_id=None, obj=None, language_code=None, **kwargs):
+        self._call("update_intent")
+        return self._update(obj, kwargs)
+
+    def delete_intent(self, intent_id=None, obj=None):
+        self._call("delete_intent")
+
+
+class FakeEntityTypesClient(_FakeResourceClient):
+    def __init__(self, agent_id: str = "projects/p/locations/global/agents/fake", latency: float = 0.0,
+                 requests_per_second: float = None, error_rate: float = 0.0, seed: int = 0, existing: list = ()):
+        """
+        Fake dfcx_scrapi EntityTypes client. Arguments as for FakeIntentsClient.
+        """
+        super().__init__(agent_id, latency, requests_per_second, error_rate, seed, existing, "entityTypes",
+                         {"entities": []})
+
+    def create_entity_type(self, agent_id=None, display_name=None, language_code=None, obj=None, **kwargs):
+        self._call("create_entity_type")
+        return self._create(display_name, kwargs)
+
+    _kind_field = "entity_types"
+
+    def list_entity_types(self, agent_id=None, language_code="en", request=None):
+        self._call("list_entity_types")
+        return self._list() if request is None else self._list_page(request)
+
+    def update_entity_type(self, entity_type_id=None, obj=None, **kwargs):
+        self._call("update_entity_type")
+        return self._update(obj, kwargs)
+
+    def delete_entity_type(self, entity_id=None, obj=None, force=False):
+        self._call("delete_entity_type")
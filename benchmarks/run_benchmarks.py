@@ -0,0 +1,229 @@
+"""
+End-to-end benchmarks on synthetic agent configs, with in-process fakes for Gemini
+and Dialogflow CX (see fakes.py), so no credentials or network are needed.
+
+Measures:
+    tagging     phrases tagged per second by GeminiEnricher._format_phrase_with_entities
+    enrichment  intents enriched per second and Gemini calls/tokens of enrich_agent_config
+    deploy      wall time and RPCs of a first deploy and of a redeploy (everything
+                ALREADY_EXISTS), both sequential (create_entities/create_intents) and
+                through DeploymentScheduler
+    fanout      wall time of deploying to --fanout-agents agents one after another
+                and through FanOutDeployer
+
+Results are written as JSON; pass --compare with an earlier results file to print
+the change of every metric and fail on regressions.
+
+Usage:
+    python benchmarks/run_benchmarks.py --intents 200 --phrases 20 --output bench.json
+    python benchmarks/run_benchmarks.py --intents 200 --phrases 20 --compare bench.json
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeEntityTypesClient, FakeGenerativeModel, FakeIntentsClient
+from synthetic import WORDS, make_agent_config
+from entity_matcher import EntityMatcher
+from gemini_enricher import GeminiEnricher
+from dialogflow_agent_manager import DialogflowAgentManager
+from deployment_scheduler import DeploymentScheduler
+from fanout import FanOutDeployer
+from training_phrases import PhraseCompiler
+
+# Metrics where a larger value is better; every other metric is a time or a count where smaller is better.
+HIGHER_IS_BETTER = {"phrases_per_second", "intents_per_second"}
+
+
+def bench_tagging(config: dict, args) -> dict:
+    enricher = GeminiEnricher(None, args.generate, model=FakeGenerativeModel())
+    matcher = EntityMatcher(enricher._prepare_entities_for_matching(config))
+    rng = random.Random(args.seed)
+    synonyms = [s for entity in config["entities"] for entry in entity["entries"] for s in entry["synonyms"]]
+    phrases = []
+    for _ in range(args.tagging_phrases):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 10))]
+        if synonyms:
+            words.insert(rng.randint(0, len(words)), rng.choice(synonyms))
+        phrases.append(" ".join(words))
+    start = time.perf_counter()
+    for phrase in phrases:
+        enricher._format_phrase_with_entities(phrase, matcher)
+    seconds = time.perf_counter() - start
+    return {"phrases": len(phrases), "seconds": round(seconds, 4), "phrases_per_second": round(len(phrases) / seconds, 1)}
+
+
+def bench_enrichment(config: dict, args) -> dict:
+    model = FakeGenerativeModel(latency=args.gemini_latency, error_rate=args.gemini_error_rate, seed=args.seed)
+    enricher = GeminiEnricher(None, args.generate, max_concurrent_requests=args.gemini_concurrency,
+                              max_retries=args.max_retries, model=model,
+                              batch_token_budget=args.batch_token_budget or None)
+    start = time.perf_counter()
+    enricher.enrich_agent_config(copy.deepcopy(config))
+    seconds = time.perf_counter() - start
+    intents = len(config["intents"])
+    return {"intents": intents, "seconds": round(seconds, 4), "intents_per_second": round(intents / seconds, 2),
+            "gemini_calls": enricher.usage["calls"], "injected_errors": sum(model.stats.errors.values()),
+            "prompt_tokens": enricher.usage["prompt_tokens"], "output_tokens": enricher.usage["output_tokens"]}
+
+
+def _make_manager(args, entities_client, intents_client) -> DialogflowAgentManager:
+    return DialogflowAgentManager(None, intents_client.agent_id, max_retries=args.max_retries,
+                                  intents_client=intents_client, entities_client=entities_client,
+                                  intents_service=intents_client, entity_types_service=entities_client)
+
+
+def _fake_clients(args):
+    kwargs = dict(latency=args.api_latency, requests_per_second=args.api_quota, error_rate=args.api_error_rate, seed=args.seed)
+    return FakeEntityTypesClient(**kwargs), FakeIntentsClient(**kwargs)
+
+
+def _deploy_metrics(seconds: float, entities_client, intents_client) -> dict:
+    calls = entities_client.stats.calls + intents_client.stats.calls
+    return {"seconds": round(seconds, 4), "rpcs": sum(calls.values()), "rpcs_by_method": dict(sorted(calls.items())),
+            "quota_rejections": entities_client.quota.rejected + intents_client.quota.rejected}
+
+
+def bench_deploy(config: dict, args) -> dict:
+    results = {}
+    for mode in ("sequential", "scheduler"):
+        entities_client, intents_client = _fake_clients(args)
+        manager = _make_manager(args, entities_client, intents_client)
+        for run in ("first", "redeploy"):
+            entities_client.stats.calls.clear()
+            intents_client.stats.calls.clear()
+            start = time.perf_counter()
+            if mode == "sequential":
+                manager.create_entities(config)
+                manager.create_intents(config)
+            else:
+                DeploymentScheduler(manager, max_workers=args.deploy_workers).deploy(config)
+            results[f"{mode}_{run}"] = _deploy_metrics(time.perf_counter() - start, entities_client, intents_client)
+    return results
+
+
+def bench_fanout(config: dict, args) -> dict:
+    targets = [{"agent_path": f"projects/p{i}/locations/global/agents/fake"} for i in range(args.fanout_agents)]
+    results = {"agents": len(targets)}
+    for mode in ("sequential", "fanout"):
+        phrase_compiler = PhraseCompiler()
+
+        def deploy_target(target):
+            kwargs = dict(agent_id=target["agent_path"], latency=args.api_latency,
+                          requests_per_second=args.api_quota, error_rate=args.api_error_rate, seed=args.seed)
+            manager = DialogflowAgentManager(None, target["agent_path"], max_retries=args.max_retries,
+                                             intents_client=FakeIntentsClient(**kwargs),
+                                             entities_client=FakeEntityTypesClient(**kwargs),
+                                             phrase_compiler=phrase_compiler)
+            return DeploymentScheduler(manager, max_workers=args.deploy_workers).deploy(config)
+
+        start = time.perf_counter()
+        if mode == "sequential":
+            for target in targets:
+                deploy_target(target)
+        else:
+            FanOutDeployer(targets, deploy_target, max_parallel_agents=args.fanout_agents).run()
+        results[f"{mode}_seconds"] = round(time.perf_counter() - start, 4)
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Flattens nested numeric results to {'section.metric': value}."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current: dict, previous: dict, tolerance: float) -> list:
+    """
+    Prints every metric next to its previous value.
+
+    Returns:
+        list: Metrics that got worse by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    now, before = flatten(current["results"]), flatten(previous["results"])
+    print(f"{'metric':<48} {'previous':>12} {'current':>12} {'change':>8}")
+    for metric, value in now.items():
+        old = before.get(metric)
+        if old is None:
+            continue
+        change = (value - old) / old if old else 0.0
+        worse = -change if metric.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > tolerance and not metric.split(".")[-2:-1] == ["rpcs_by_method"]:
+            regressions.append(metric)
+            flag = "  REGRESSION"
+        print(f"{metric:<48} {old:>12} {value:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark tagging, enrichment and deployment with local fakes.")
+    parser.add_argument("--intents", type=int, default=200)
+    parser.add_argument("--phrases", type=int, default=20, help="Training phrases per intent.")
+    parser.add_argument("--entities", type=int, default=10)
+    parser.add_argument("--synonyms", type=int, default=50, help="Synonyms per entity type.")
+    parser.add_argument("--generate", type=int, default=5, help="Phrases Gemini generates per intent.")
+    parser.add_argument("--tagging-phrases", type=int, default=20000)
+    parser.add_argument("--gemini-latency", type=float, default=0.02, help="Seconds per fake Gemini call.")
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-concurrency", type=int, default=4)
+    parser.add_argument("--batch-token-budget", type=int, default=0, help="Enable batched prompts with this budget.")
+    parser.add_argument("--api-latency", type=float, default=0.005, help="Seconds per fake Dialogflow RPC.")
+    parser.add_argument("--api-quota", type=float, default=None, help="Fake Dialogflow requests per second quota.")
+    parser.add_argument("--api-error-rate", type=float, default=0.0)
+    parser.add_argument("--deploy-workers", type=int, default=8)
+    parser.add_argument("--fanout-agents", type=int, default=4, help="Agents deployed to in the fanout benchmark.")
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--only", nargs="+", choices=["tagging", "enrichment", "deploy", "fanout"],
+                        default=["tagging", "enrichment", "deploy", "fanout"])
+    parser.add_argument("--output", help="Write the results JSON to this file.")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression before failing.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    config = make_agent_config(args.intents, args.phrases, args.entities, args.synonyms, seed=args.seed)
+    benchmarks = {"tagging": bench_tagging, "enrichment": bench_enrichment, "deploy": bench_deploy,
+                  "fanout": bench_fanout}
+    results = {}
+    for name in args.only:
+        results[name] = benchmarks[name](config, args)
+        print(f"{name}: {json.dumps(results[name])}")
+
+    report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+              "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+              "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        regressions = compare(report, previous, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
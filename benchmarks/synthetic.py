@@ -0,0 +1,70 @@
+"""
+Synthetic agent configurations shaped like agent_config_params.yaml, for benchmarks.
+"""
+import random
+
+WORDS = ["i", "want", "to", "check", "my", "order", "status", "please", "show", "me", "the", "last",
+         "transaction", "account", "balance", "can", "you", "get", "how", "many", "what", "is", "send", "track"]
+
+
+def make_entities(entity_count: int, synonyms_per_entity: int, rng: random.Random) -> list:
+    """
+    Builds the YAML 'entities' list.
+
+    Args:
+        entity_count (int): Number of custom entity types.
+        synonyms_per_entity (int): Synonyms per entity type, spread over up to 10 entries.
+        rng (random.Random): Random source.
+
+    Returns:
+        list: Entity definitions with display_name, kind and entries.
+    """
+    entities = []
+    for e in range(entity_count):
+        entry_count = max(1, min(10, synonyms_per_entity))
+        entries = []
+        for v in range(entry_count):
+            value = f"item{e}x{v}"
+            synonym_count = synonyms_per_entity // entry_count
+            synonyms = [value] + [f"{rng.choice(WORDS)} {value}s{k}" for k in range(max(0, synonym_count - 1))]
+            entries.append({"value": value, "synonyms": synonyms})
+        entities.append({"display_name": f"entity-{e}", "kind": "KIND_MAP", "entries": entries})
+    return entities
+
+
+def make_agent_config(intents: int = 100, phrases_per_intent: int = 20, entities: int = 10,
+                      synonyms_per_entity: int = 20, annotated_ratio: float = 0.3, seed: int = 0) -> dict:
+    """
+    Builds an agent configuration with plain and text_parts training phrases.
+
+    Args:
+        intents (int): Number of intents.
+        phrases_per_intent (int): Training phrases per intent.
+        entities (int): Number of custom entity types.
+        synonyms_per_entity (int): Synonyms per entity type.
+        annotated_ratio (float): Fraction of phrases with an entity annotation (text_parts).
+        seed (int): Seed, so the same arguments always give the same config.
+
+    Returns:
+        dict: Config with 'entities' and 'intents'.
+    """
+    rng = random.Random(seed)
+    entity_list = make_entities(entities, synonyms_per_entity, rng)
+    intent_list = []
+    for i in range(intents):
+        entity = entity_list[i % len(entity_list)] if entity_list else None
+        training_phrases = []
+        for _ in range(phrases_per_intent):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9)))
+            if entity and rng.random() < annotated_ratio:
+                value = rng.choice(rng.choice(entity["entries"])["synonyms"])
+                training_phrases.append({"text_parts": [{"text": f"{words} "},
+                                                        {"text": value, "parameter_id": entity["display_name"]}]})
+            else:
+                training_phrases.append(words)
+        intent = {"display_name": f"intent.{i}", "description": f"Synthetic intent number {i}.",
+                  "training_phrases": training_phrases}
+        if entity:
+            intent["parameters"] = [{"id": entity["display_name"], "entity_type_display_name": entity["display_name"]}]
+        intent_list.append(intent)
+    return {"entities": entity_list, "intents": intent_list}
@@ -0,0 +1,97 @@
+import yaml
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Options used for every agent config file this project writes.
+YAML_DUMP_OPTIONS = dict(sort_keys=False, default_flow_style=False, allow_unicode=True, indent=2)
+
+# The libyaml-based loader parses many times faster than the pure-Python one and builds the same objects.
+YAML_SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Likewise for writing: same output as yaml.dump, except that characters outside the Basic
+# Multilingual Plane (e.g. emoji) are written as escapes, which load back to the same text.
+YAML_SAFE_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def load_yaml(path: str):
+    """
+    Parses a YAML file with the fastest available safe loader.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        The parsed document.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        yaml.YAMLError: If the file is not valid YAML.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=YAML_SAFE_LOADER)
+
+
+def dump_config(config_data: dict, path: str):
+    """
+    Writes an agent configuration to a YAML file.
+
+    Args:
+        config_data (dict): The configuration data.
+        path (str): Destination file path.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(config_data, f, Dumper=YAML_SAFE_DUMPER, **YAML_DUMP_OPTIONS)
+
+
+class IncrementalConfigWriter:
+    def __init__(self, path: str, config_data: dict):
+        """
+        Opens `path` and writes every top-level key of `config_data` that precedes
+        'intents'. Intents are then appended one at a time with write_intent, so the
+        file grows while enrichment is still running. The finished file is identical
+        to dump_config(config_data, path).
+
+        Args:
+            path (str): Destination file path.
+            config_data (dict): The configuration data; only its non-intent keys are written here.
+        """
+        self.path = path
+        self.intents_written = 0
+        keys = list(config_data)
+        split = keys.index("intents") if "intents" in keys else len(keys)
+        self._has_intents_key = "intents" in keys
+        self._trailing = {key: config_data[key] for key in keys[split + 1:]}
+        self._file = open(path, "w", encoding="utf-8")
+        leading = {key: config_data[key] for key in keys[:split]}
+        if leading:
+            yaml.dump(leading, self._file, Dumper=YAML_SAFE_DUMPER, **YAML_DUMP_OPTIONS)
+        self._file.flush()
+
+    def write_intent(self, intent: dict):
+        """
+        Appends one intent to the 'intents' list.
+
+        Args:
+            intent (dict): The (enriched) intent.
+        """
+        if self.intents_written == 0:
+            self._file.write("intents:\n")
+        # A top-level block sequence is rendered exactly like one nested under a mapping key.
+        yaml.dump([intent], self._file, Dumper=YAML_SAFE_DUMPER, **YAML_DUMP_OPTIONS)
+        self._file.flush()
+        self.intents_written += 1
+
+    def close(self):
+        """Writes the keys that follow 'intents' and closes the file."""
+        if self._has_intents_key and self.intents_written == 0:
+            self._file.write("intents: []\n")
+        if self._trailing:
+            yaml.dump(self._trailing, self._file, Dumper=YAML_SAFE_DUMPER, **YAML_DUMP_OPTIONS)
+        self._file.close()
+        logging.info(f"Wrote {self.intents_written} intents to '{self.path}'.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,311 @@
+"""
+Sharded agent configs: a directory with one YAML file per entity type and per intent,
+
+    <directory>/entities/<display name>.yaml
+    <directory>/intents/<display name>.yaml
+
+instead of one big agent_config_params.yaml. Shards are parsed lazily, in worker
+processes, and intents are handed out as a stream, so memory does not grow with the
+number of intents. Writing a sharded config only touches the files whose content
+changed.
+
+Convert an existing single-file config:
+
+    python config_shards.py split agent_config_params.yaml agent_config/
+"""
+import argparse
+import logging
+import os
+import re
+from collections import deque
+
+import yaml
+
+from config_io import YAML_DUMP_OPTIONS, YAML_SAFE_DUMPER, IncrementalConfigWriter, load_yaml
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ENTITIES_DIR = "entities"
+INTENTS_DIR = "intents"
+SHARD_SUFFIXES = (".yaml", ".yml")
+
+# Shards parsed per task sent to a worker process; amortizes the inter-process overhead.
+SHARDS_PER_TASK = 32
+
+_UNSAFE_FILE_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def is_sharded(path: str) -> bool:
+    """Returns whether an agent config path is a shard directory rather than a YAML file."""
+    return os.path.isdir(path)
+
+
+def shard_file_name(display_name: str) -> str:
+    """Returns the file name of the shard holding a display name."""
+    return (_UNSAFE_FILE_CHARS.sub("_", display_name).strip() or "_") + ".yaml"
+
+
+def list_shards(directory: str) -> list:
+    """
+    Lists the shard files of a directory in name order (the order intents are processed in).
+
+    Args:
+        directory (str): An 'entities' or 'intents' shard directory. May not exist.
+
+    Returns:
+        list: File paths.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.endswith(SHARD_SUFFIXES) and not name.startswith(".")]
+
+
+def load_shards(paths: list) -> list:
+    """
+    Parses shard files. A shard holds one mapping (one intent or entity type) or a list of them.
+
+    Args:
+        paths (list): Shard file paths.
+
+    Returns:
+        list: The definitions, in file order.
+    """
+    items = []
+    for path in paths:
+        document = load_yaml(path)
+        if isinstance(document, list):
+            items.extend(document)
+        elif document is not None:
+            items.append(document)
+    return items
+
+
+def iter_shards(paths: list, workers: int = None):
+    """
+    Yields the definitions of the shard files in order. Shards are parsed in up to `workers`
+    processes, at most two tasks ahead of the consumer per worker, so only a bounded
+    number of parsed definitions is held at any time.
+
+    Args:
+        paths (list): Shard file paths.
+        workers (int): Parser processes (default: CPU count). With 1, parsing happens in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = [paths[i:i + SHARDS_PER_TASK] for i in range(0, len(paths), SHARDS_PER_TASK)]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from load_shards(chunk)
+        return
+    # Imported here: the process pool module is slow to import and single-file configs never need it.
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        remaining = iter(chunks)
+        try:
+            for chunk in remaining:
+                in_flight.append(executor.submit(load_shards, chunk))
+                if len(in_flight) >= 2 * workers:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+class ShardedIntents:
+    def __init__(self, directory: str, workers: int = None):
+        """
+        Lazy, re-iterable sequence of the intents of a shard directory. Every iteration
+        parses the shards again instead of keeping them in memory.
+
+        Args:
+            directory (str): The 'intents' shard directory.
+            workers (int): Parser processes (default: CPU count).
+        """
+        self.directory = directory
+        self.workers = workers
+        self._paths = list_shards(directory)
+
+    def __iter__(self):
+        return iter_shards(self._paths, self.workers)
+
+    def __len__(self) -> int:
+        """Number of shard files (intents, unless a shard holds a list)."""
+        return len(self._paths)
+
+
+def load_sharded_config(directory: str, workers: int = None) -> dict:
+    """
+    Opens a sharded agent config. Entity types are loaded right away (they are needed
+    as a whole for entity tagging); intents are streamed from their shards when iterated.
+
+    Args:
+        directory (str): The shard directory.
+        workers (int): Parser processes (default: CPU count).
+
+    Returns:
+        dict: {'entities': list, 'intents': ShardedIntents}.
+    """
+    return {
+        "entities": list(iter_shards(list_shards(os.path.join(directory, ENTITIES_DIR)), workers)),
+        "intents": ShardedIntents(os.path.join(directory, INTENTS_DIR), workers),
+    }
+
+
+class ShardedConfigWriter:
+    def __init__(self, directory: str, config_data: dict):
+        """
+        Writes a sharded agent config: the entity types right away, then intents one at
+        a time with write_intent (same interface as IncrementalConfigWriter). A shard is
+        only rewritten when its content changed, and shards of intents or entity types
+        that were not written are removed when the writer is closed without an error.
+
+        Args:
+            directory (str): The shard directory (created if missing).
+            config_data (dict): The configuration; only its 'entities' are written here.
+        """
+        self.directory = directory
+        self.counts = {"written": 0, "unchanged": 0, "removed": 0}
+        self.intents_written = 0
+        self._written = {ENTITIES_DIR: set(), INTENTS_DIR: set()}
+        for subdirectory in self._written:
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+        for entity in config_data.get("entities") or []:
+            self._write_shard(ENTITIES_DIR, entity)
+
+    def _write_shard(self, subdirectory: str, item: dict):
+        written = self._written[subdirectory]
+        base = shard_file_name(item.get("display_name") or "_")
+        name = base
+        suffix = 1
+        while name in written:
+            suffix += 1
+            name = f"{base[:-len('.yaml')]}_{suffix}.yaml"
+        written.add(name)
+        path = os.path.join(self.directory, subdirectory, name)
+        content = yaml.dump(item, Dumper=YAML_SAFE_DUMPER, **YAML_DUMP_OPTIONS).encode("utf-8")
+        try:
+            with open(path, "rb") as f:
+                if f.read() == content:
+                    self.counts["unchanged"] += 1
+                    return
+        except FileNotFoundError:
+            pass
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+        self.counts["written"] += 1
+
+    def write_intent(self, intent: dict):
+        """
+        Writes one intent's shard (if its content changed).
+
+        Args:
+            intent (dict): The (enriched) intent.
+        """
+        self._write_shard(INTENTS_DIR, intent)
+        self.intents_written += 1
+
+    def close(self, remove_stale: bool = True):
+        """
+        Finishes the config.
+
+        Args:
+            remove_stale (bool): Delete shards that were not written by this writer.
+        """
+        if remove_stale:
+            for subdirectory, written in self._written.items():
+                for path in list_shards(os.path.join(self.directory, subdirectory)):
+                    if os.path.basename(path) not in written:
+                        os.remove(path)
+                        self.counts["removed"] += 1
+        logging.info(f"Wrote {self.intents_written} intents to '{self.directory}': {self.counts['written']} shard(s) "
+                     f"rewritten, {self.counts['unchanged']} unchanged, {self.counts['removed']} removed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # An interrupted stream has not written every intent, so nothing counts as stale.
+        self.close(remove_stale=exc_type is None)
+
+
+def load_agent_config_data(path: str, workers: int = None) -> dict:
+    """
+    Loads an agent config from a YAML file or a shard directory.
+
+    Args:
+        path (str): File or shard directory.
+        workers (int): Parser processes for a shard directory (default: CPU count).
+
+    Returns:
+        dict: The agent config; for a shard directory, its intents are a lazy ShardedIntents.
+
+    Raises:
+        FileNotFoundError: If the path does not exist.
+        yaml.YAMLError: If a file is not valid YAML.
+    """
+    if is_sharded(path):
+        return load_sharded_config(path, workers)
+    return load_yaml(path)
+
+
+def open_config_writer(path: str, config_data: dict, sharded: bool):
+    """
+    Opens the writer for an enriched agent config.
+
+    Args:
+        path (str): Destination file or shard directory.
+        config_data (dict): The configuration data (see IncrementalConfigWriter / ShardedConfigWriter).
+        sharded (bool): Write a shard directory instead of a single file.
+
+    Returns:
+        ShardedConfigWriter or IncrementalConfigWriter
+    """
+    if sharded:
+        return ShardedConfigWriter(path, config_data)
+    return IncrementalConfigWriter(path, config_data)
+
+
+def dump_sharded_config(config_data: dict, directory: str) -> dict:
+    """
+    Writes a whole agent config as shards.
+
+    Args:
+        config_data (dict): The configuration data.
+        directory (str): The shard directory.
+
+    Returns:
+        dict: Counts of written, unchanged and removed shards.
+    """
+    with ShardedConfigWriter(directory, config_data) as writer:
+        for intent in config_data.get("intents") or []:
+            writer.write_intent(intent)
+    return writer.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between single-file and sharded agent configs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split = commands.add_parser("split", help="Write a single-file agent config as a shard directory.")
+    split.add_argument("agent_config", help="Agent config YAML file.")
+    split.add_argument("directory", help="Shard directory to write.")
+    join = commands.add_parser("join", help="Write a shard directory as a single-file agent config.")
+    join.add_argument("directory", help="Shard directory.")
+    join.add_argument("agent_config", help="Agent config YAML file to write.")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        dump_sharded_config(load_yaml(args.agent_config), args.directory)
+    else:
+        config_data = load_sharded_config(args.directory)
+        with IncrementalConfigWriter(args.agent_config, config_data) as writer:
+            for intent in config_data["intents"]:
+                writer.write_intent(intent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Offline checks of an agent config (agent_config_params.yaml or its enriched version).
+Imports nothing beyond the standard library, so it runs without the Gemini or Dialogflow SDKs.
+"""
+from training_phrases import AnnotationError, has_annotations, parse_annotations
+
+ERROR = "error"
+WARNING = "warning"
+
+ENTITY_KINDS = {"KIND_MAP", "KIND_LIST", "KIND_REGEXP"}
+
+
+class ValidationIssue:
+    """One problem found in an agent config. (Not a dataclass: importing dataclasses costs more than the checks.)"""
+    __slots__ = ("severity", "location", "message")
+
+    def __init__(self, severity: str, location: str, message: str):
+        self.severity = severity
+        self.location = location
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.severity.upper()}: {self.location}: {self.message}"
+
+
+class _Collector:
+    def __init__(self):
+        self.issues = []
+
+    def error(self, location: str, message: str):
+        self.issues.append(ValidationIssue(ERROR, location, message))
+
+    def warning(self, location: str, message: str):
+        self.issues.append(ValidationIssue(WARNING, location, message))
+
+
+def _check_entities(entities: list, report: _Collector) -> set:
+    """Checks the 'entities' list and returns the defined display names."""
+    names = set()
+    for index, entity in enumerate(entities):
+        location = f"entities[{index}]"
+        if not isinstance(entity, dict):
+            report.error(location, "entity type must be a mapping")
+            continue
+        display_name = entity.get("display_name")
+        if not display_name:
+            report.error(location, "missing display_name")
+            continue
+        location = f"{location} '{display_name}'"
+        if display_name in names:
+            report.error(location, f"duplicate entity type display name '{display_name}'")
+        names.add(display_name)
+        kind = entity.get("kind", "KIND_MAP")
+        if kind not in ENTITY_KINDS:
+            report.error(location, f"unknown kind '{kind}' (expected one of {', '.join(sorted(ENTITY_KINDS))})")
+        entries = entity.get("entries") or []
+        if not entries:
+            report.warning(location, "no entries")
+        for entry_index, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("value"):
+                report.error(f"{location} entries[{entry_index}]", "entry without a value")
+    return names
+
+
+def _check_parameters(intent: dict, location: str, entity_names: set, report: _Collector) -> set:
+    """Checks an intent's parameters and returns the defined parameter ids."""
+    parameter_ids = set()
+    for index, param in enumerate(intent.get("parameters") or []):
+        param_location = f"{location} parameters[{index}]"
+        if not isinstance(param, dict):
+            report.error(param_location, "parameter must be a mapping")
+            continue
+        param_id = param.get("id")
+        entity_type = param.get("entity_type_display_name")
+        if not param_id:
+            report.error(param_location, "missing id")
+        elif param_id in parameter_ids:
+            report.error(param_location, f"duplicate parameter id '{param_id}'")
+        else:
+            parameter_ids.add(param_id)
+        if not entity_type:
+            report.error(param_location, "missing entity_type_display_name")
+        elif not entity_type.startswith("@sys.") and entity_type not in entity_names:
+            hint = ""
+            if entity_type.startswith("@") and entity_type[1:] in entity_names:
+                hint = f" (custom entity types are referenced without '@': '{entity_type[1:]}')"
+            report.error(param_location, f"custom entity type '{entity_type}' is not defined in 'entities'{hint}")
+    return parameter_ids
+
+
+def _check_training_phrases(intent: dict, location: str, parameter_ids: set, report: _Collector):
+    phrases = intent.get("training_phrases") or []
+    if not phrases:
+        report.warning(location, "no training phrases")
+    for index, phrase in enumerate(phrases):
+        phrase_location = f"{location} training_phrases[{index}]"
+        if isinstance(phrase, str):
+            if not has_annotations(phrase):
+                continue
+            try:
+                parts = parse_annotations(phrase)
+            except AnnotationError as e:
+                report.error(phrase_location, f"cannot parse annotated phrase '{phrase}': {e}")
+                continue
+        elif isinstance(phrase, dict) and isinstance(phrase.get("text_parts"), list):
+            parts = phrase["text_parts"]
+            if not parts:
+                report.error(phrase_location, "empty text_parts")
+        else:
+            report.error(phrase_location, "training phrase must be a string or a mapping with a 'text_parts' list")
+            continue
+        for part in parts:
+            if not isinstance(part, dict) or not isinstance(part.get("text"), str):
+                report.error(phrase_location, f"part without text: {part}")
+                continue
+            parameter_id = part.get("parameter_id")
+            if parameter_id and parameter_id not in parameter_ids:
+                report.error(phrase_location, f"parameter id '{parameter_id}' (on '{part['text']}') is not defined "
+                                              f"in the intent's parameters")
+
+
+def validate_agent_config(config_data) -> list:
+    """
+    Checks an agent config without any API calls:
+
+    - entity types and intents have display names, and no display name is used twice;
+    - parameters have ids and entity types, and custom entity types are defined in 'entities';
+    - parameter ids referenced in 'text_parts' and bracket annotations are intent parameters;
+    - bracket-annotated phrases ('[text]{@parameter-id}') parse;
+    - training phrases are strings or 'text_parts' mappings.
+
+    Args:
+        config_data: The loaded agent config.
+
+    Returns:
+        list: ValidationIssue objects, errors and warnings, in config order.
+    """
+    report = _Collector()
+    if not isinstance(config_data, dict):
+        report.error("agent config", "must be a mapping with 'entities' and 'intents'")
+        return report.issues
+    entity_names = _check_entities(config_data.get("entities") or [], report)
+    intent_names = set()
+    for index, intent in enumerate(config_data.get("intents") or []):
+        location = f"intents[{index}]"
+        if not isinstance(intent, dict):
+            report.error(location, "intent must be a mapping")
+            continue
+        display_name = intent.get("display_name")
+        if not display_name:
+            report.error(location, "missing display_name")
+        else:
+            location = f"{location} '{display_name}'"
+            if display_name in intent_names:
+                report.error(location, f"duplicate intent display name '{display_name}'")
+            intent_names.add(display_name)
+        parameter_ids = _check_parameters(intent, location, entity_names, report)
+        _check_training_phrases(intent, location, parameter_ids, report)
+    return report.issues
+
+
+def count_issues(issues: list) -> tuple:
+    """
+    Returns:
+        tuple: (error count, warning count).
+    """
+    errors = sum(1 for issue in issues if issue.severity == ERROR)
+    return errors, len(issues) - errors
@@ -0,0 +1,292 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from agent_sync import DELETE, ENTITY_TYPE, INTENT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+FAILED_OUTCOMES = {"error"}
+
+# Intent tasks accepted per worker before the intent stream is read further.
+PENDING_INTENTS_PER_WORKER = 4
+
+
+class DeploymentSummary:
+    def __init__(self):
+        """Collects the outcome of every deployed entity type and intent."""
+        self.outcomes = {ENTITY_TYPE: {}, INTENT: {}}
+        self.errors = {}
+        self.entity_type_list_calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, resource: str, display_name: str, outcome: str, error: Exception = None):
+        """
+        Records the outcome of one item.
+
+        Args:
+            resource (str): 'entity_type' or 'intent'.
+            display_name (str): The item's display name.
+            outcome (str): 'created', 'updated', 'deleted', 'unchanged', 'skipped' or 'error'.
+            error (Exception): The exception that made the item fail, if any.
+        """
+        with self._lock:
+            self.outcomes[resource][display_name] = outcome
+            if error is not None:
+                self.errors[(resource, display_name)] = str(error)
+
+    def counts(self) -> dict:
+        """
+        Returns:
+            dict: {resource: {outcome: count}}.
+        """
+        counts = {}
+        for resource, outcomes in self.outcomes.items():
+            resource_counts = counts.setdefault(resource, {})
+            for outcome in outcomes.values():
+                resource_counts[outcome] = resource_counts.get(outcome, 0) + 1
+        return counts
+
+    def failed(self) -> list:
+        """
+        Returns:
+            list: (resource, display_name) of every item that failed.
+        """
+        return [(resource, name) for resource, outcomes in self.outcomes.items()
+                for name, outcome in outcomes.items() if outcome in FAILED_OUTCOMES]
+
+    def log(self, label: str = "Deployment"):
+        """Logs per-resource outcome counts, the list_entity_types calls made and the list of failed items."""
+        for resource, resource_counts in self.counts().items():
+            if resource_counts:
+                logging.info(f"📊 {label} summary ({resource}): " +
+                             ", ".join(f"{count} {outcome}" for outcome, count in sorted(resource_counts.items())))
+        intent_count = len(self.outcomes[INTENT])
+        logging.info(f"ℹ️ Resolved entity types with {self.entity_type_list_calls} list_entity_types call(s) "
+                     f"for {intent_count} intent(s).")
+        failed = self.failed()
+        if failed:
+            logging.error(f"❌ {len(failed)} item(s) failed:")
+            for resource, name in failed:
+                detail = self.errors.get((resource, name))
+                logging.error(f"   - {resource} '{name}'" + (f": {detail}" if detail else ""))
+
+
+class DeploymentScheduler:
+    def __init__(self, agent_manager, max_workers: int = 8):
+        """
+        Initializes the scheduler.
+
+        Args:
+            agent_manager (DialogflowAgentManager): Manager used to create, update and delete resources.
+                Its rate_limiter and max_retries apply to every request the scheduler makes.
+            max_workers (int): Number of requests in flight at once.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.agent_manager = agent_manager
+        self.max_workers = max_workers
+
+    @staticmethod
+    def custom_entity_dependencies(intent_data: dict) -> set:
+        """
+        Returns the custom entity type display names an intent's parameters reference.
+
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+
+        Returns:
+            set: Display names, excluding @sys entity types.
+        """
+        return {param.get("entity_type_display_name") for param in intent_data.get("parameters", [])
+                if param.get("entity_type_display_name") and not param["entity_type_display_name"].startswith("@sys.")}
+
+    @staticmethod
+    def _run_task(summary: DeploymentSummary, resource: str, display_name: str, task) -> str:
+        try:
+            outcome = task()
+            summary.record(resource, display_name, outcome)
+        except Exception as e:
+            logging.error(f"❌ Unexpected error deploying {resource} '{display_name}': {e}")
+            outcome = "error"
+            summary.record(resource, display_name, outcome, e)
+        return outcome
+
+    def _submit_after(self, executor: ThreadPoolExecutor, dependencies: list, summary: DeploymentSummary,
+                      display_name: str, task) -> Future:
+        """Submits an intent task once all the entity futures it depends on are done."""
+        proxy = Future()
+        remaining = [len(dependencies)]
+        lock = threading.Lock()
+
+        def submit():
+            future = executor.submit(self._run_task, summary, INTENT, display_name, task)
+            future.add_done_callback(lambda done: proxy.set_result(done.result()))
+
+        def on_dependency_done(_):
+            with lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                submit()
+
+        if not dependencies:
+            submit()
+        for dependency in dependencies:
+            dependency.add_done_callback(on_dependency_done)
+        return proxy
+
+    def run(self, entity_tasks: list, intent_tasks, summary: DeploymentSummary = None) -> DeploymentSummary:
+        """
+        Runs entity type tasks concurrently, and starts each intent task as soon as
+        the entity types it references are done (intents without custom entity
+        parameters start immediately). At most PENDING_INTENTS_PER_WORKER intents per worker
+        are waiting or running at a time, so a lazy intent stream (e.g. sharded intents
+        read from disk) is consumed at the pace of deployment instead of all at once.
+
+        Args:
+            entity_tasks (list): (display_name, callable returning an outcome) per entity type.
+            intent_tasks (iterable): (display_name, dependency display names, callable returning an outcome)
+                per intent. May be a generator; each task is submitted as soon as it is yielded.
+            summary (DeploymentSummary): Summary to add to; a new one is created if omitted.
+
+        Returns:
+            DeploymentSummary: Outcomes of all tasks. Failures never stop the run.
+
+        Raises:
+            Exception: Whatever iterating `intent_tasks` raised, after the tasks already submitted finished.
+        """
+        summary = summary or DeploymentSummary()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="deploy") as executor:
+            entity_futures = {
+                display_name: executor.submit(self._run_task, summary, ENTITY_TYPE, display_name, task)
+                for display_name, task in entity_tasks
+            }
+            slots = threading.Semaphore(self.max_workers * PENDING_INTENTS_PER_WORKER)
+            intent_futures = []
+            try:
+                for display_name, dependencies, task in intent_tasks:
+                    slots.acquire()
+                    future = self._submit_after(executor, [entity_futures[d] for d in dependencies if d in entity_futures],
+                                                summary, display_name, task)
+                    future.add_done_callback(lambda _: slots.release())
+                    intent_futures.append(future)
+            finally:
+                # Intent tasks are submitted from callbacks, so wait for them before the pool shuts
+                # down (also when the intent stream raised).
+                wait(list(entity_futures.values()) + intent_futures)
+        return summary
+
+    def deploy(self, config_data: dict) -> DeploymentSummary:
+        """
+        Creates every entity type and intent in the configuration (skipping existing ones).
+
+        Args:
+            config_data (dict): The loaded YAML configuration data.
+
+        Returns:
+            DeploymentSummary: Outcomes of all items.
+        """
+        return self.deploy_stream(config_data.get("entities", []), config_data.get("intents", []))
+
+    def deploy_stream(self, entities: list, intents, synchronizer=None) -> DeploymentSummary:
+        """
+        Deploys entity types, then intents as they arrive from `intents`, which may be a
+        generator still being produced (e.g. by the enrichment pipeline). Each intent is
+        submitted as soon as it is yielded.
+
+        Args:
+            entities (list): The YAML 'entities' list.
+            intents (iterable): YAML intents; consumed lazily.
+            synchronizer (AgentSynchronizer): If given, each item is planned against the live
+                snapshot and only the needed create/update RPCs are sent; pruned resources are
+                deleted once the stream is exhausted.
+
+        Returns:
+            DeploymentSummary: Outcomes of all items.
+
+        Raises:
+            Exception: Whatever iterating `intents` raised, after the intents received before it
+                are deployed. Nothing is pruned then, as the intents that were not received
+                would be deleted.
+        """
+        manager = self.agent_manager
+        logging.info(f"🚀 Deploying {len(entities)} entity types and streamed intents with {self.max_workers} workers.")
+        summary = DeploymentSummary()
+        list_calls_before = manager.entity_type_list_calls
+        if synchronizer is None:
+            entity_tasks = [(entity.get("display_name"), lambda entity=entity: manager.create_entity(entity))
+                            for entity in entities]
+            intent_tasks = ((intent_data.get("display_name"), self.custom_entity_dependencies(intent_data),
+                             lambda intent_data=intent_data: manager.create_intent(intent_data))
+                            for intent_data in intents)
+            try:
+                self.run(entity_tasks, intent_tasks, summary)
+            finally:
+                summary.entity_type_list_calls = manager.entity_type_list_calls - list_calls_before
+                summary.log()
+            return summary
+
+        if synchronizer.live_intents is None:
+            synchronizer.fetch_snapshot()
+        entity_items = [item for item in map(synchronizer.plan_entity_type, entities) if item]
+        planned_intents = set()
+        stream_complete = [False]
+
+        def intent_items():
+            for intent_data in intents:
+                item = synchronizer.plan_intent(intent_data)
+                if item:
+                    planned_intents.add(item.display_name)
+                    yield item
+            stream_complete[0] = True
+
+        try:
+            self._apply_items(synchronizer, entity_items, intent_items(), summary)
+            if stream_complete[0]:
+                entity_type_deletes, intent_deletes = synchronizer.plan_prunes(
+                    {item.display_name for item in entity_items}, planned_intents)
+                self._apply_deletes(synchronizer, entity_type_deletes, intent_deletes, summary)
+            else:
+                logging.warning("⚠️ The intent stream did not complete; nothing was pruned.")
+        finally:
+            summary.entity_type_list_calls = manager.entity_type_list_calls - list_calls_before
+            summary.log("Sync")
+        return summary
+
+    def _apply_items(self, synchronizer, entity_items: list, intent_items, summary: DeploymentSummary = None) -> DeploymentSummary:
+        """Runs create/update/unchanged plan items, intents waiting on the entity types they reference."""
+        entity_tasks = [(item.display_name, lambda item=item: synchronizer.apply_entity_type(item)) for item in entity_items]
+        intent_tasks = ((item.display_name, self.custom_entity_dependencies(item.desired),
+                         lambda item=item: synchronizer.apply_intent(item)) for item in intent_items)
+        return self.run(entity_tasks, intent_tasks, summary)
+
+    def _apply_deletes(self, synchronizer, entity_type_deletes: list, intent_deletes: list, summary: DeploymentSummary):
+        """Deletes pruned intents, then the pruned entity types they may have referenced."""
+        self.run([], [(item.display_name, set(), lambda item=item: synchronizer.apply_intent(item)) for item in intent_deletes], summary)
+        self.run([(item.display_name, lambda item=item: synchronizer.apply_entity_type(item)) for item in entity_type_deletes], [], summary)
+
+    def deploy_plan(self, synchronizer, plan) -> DeploymentSummary:
+        """
+        Executes a sync plan concurrently. Creates and updates run first, with intents
+        waiting on the entity types they reference; pruned intents are then deleted,
+        followed by pruned entity types.
+
+        Args:
+            synchronizer (AgentSynchronizer): Synchronizer that built the plan.
+            plan (SyncPlan): The plan to execute.
+
+        Returns:
+            DeploymentSummary: Outcomes of all items.
+        """
+        list_calls_before = self.agent_manager.entity_type_list_calls
+        summary = self._apply_items(synchronizer,
+                                    [item for item in plan.entity_types if item.action != DELETE],
+                                    [item for item in plan.intents if item.action != DELETE])
+        self._apply_deletes(synchronizer,
+                            [item for item in plan.entity_types if item.action == DELETE],
+                            [item for item in plan.intents if item.action == DELETE],
+                            summary)
+        summary.entity_type_list_calls = self.agent_manager.entity_type_list_calls - list_calls_before
+        summary.log("Sync")
+        return summary
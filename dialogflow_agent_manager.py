@@ -1,28 +1,124 @@
 import yaml
 import logging
-from dfcx_scrapi.core.intents import Intents
-from dfcx_scrapi.core.entity_types import EntityTypes
+import threading
+import time
+from rate_limiter import TokenBucket, call_with_retries
+from run_metrics import NO_METRICS, RunMetrics, SUCCESS, SKIPPED, ERROR
+from agent_snapshot import LIST_PAGE_SIZE, AgentSnapshot, EntityTypeRecord, IntentRecord
+from training_phrases import CompiledPhrases, PhraseCompiler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class DialogflowAgentManager:
-    def __init__(self, creds_path: str, agent_path: str):
+    def __init__(self, creds_path: str, agent_path: str, max_retries: int = 0, rate_limiter: TokenBucket = None,
+                 intents_client=None, entities_client=None, metrics: RunMetrics = None, agents_client=None,
+                 phrase_compiler: PhraseCompiler = None, intents_service=None, entity_types_service=None):
         """
         Initializes the DialogflowAgentManager with credentials and agent path.
         
         Args:
             creds_path (str): Path to your GCP service account key file.
             agent_path (str): Your Dialogflow CX agent path (e.g., 'projects/projectId/locations/locationId/agents/agentId').
+            max_retries (int): Retries with exponential backoff on RESOURCE_EXHAUSTED/UNAVAILABLE errors.
+            rate_limiter (TokenBucket): Optional bucket capping API requests per second; share one per project.
+            intents_client: Optional pre-built Intents client (e.g. an in-process fake).
+            entities_client: Optional pre-built EntityTypes client (e.g. an in-process fake).
+            metrics (RunMetrics): Optional collector for RPC latencies, outcomes and retries.
+            agents_client: Optional pre-built Dialogflow CX AgentsClient (used for package export/restore).
+            phrase_compiler (PhraseCompiler): Optional compiler memoizing formatted training phrases by
+                content. Share one between managers deploying the same config to several agents so
+                phrases are formatted once.
+            intents_service: Optional pre-built Dialogflow CX IntentsClient (used for paged listing).
+            entity_types_service: Optional pre-built Dialogflow CX EntityTypesClient (used for paged listing).
         """
         try:
-            self.intents_client = Intents(creds_path=creds_path, agent_id=agent_path)
-            self.entities_client = EntityTypes(creds_path=creds_path, agent_id=agent_path)
+            if intents_client is None or entities_client is None:
+                # Imported here: dfcx_scrapi pulls in pandas, gRPC and Vertex AI, which take seconds to load.
+                from dfcx_scrapi.core.intents import Intents
+                from dfcx_scrapi.core.entity_types import EntityTypes
+            self.intents_client = intents_client or Intents(creds_path=creds_path, agent_id=agent_path)
+            self.entities_client = entities_client or EntityTypes(creds_path=creds_path, agent_id=agent_path)
             self.agent_path = agent_path
+            self.max_retries = max_retries
+            self.rate_limiter = rate_limiter
+            self.metrics = metrics or NO_METRICS
+            self._agents_client = agents_client
+            self._intents_service = intents_service
+            self._entity_types_service = entity_types_service
+            self.phrase_compiler = phrase_compiler or PhraseCompiler()
+            # display_name -> resource name of custom entity types, filled lazily
+            self._entity_type_index = {}
+            self._unresolved_entity_types = set()
+            self._entity_type_index_lock = threading.Lock()
+            self.entity_type_list_calls = 0
             logging.info(f"✅ Successfully initialized clients for agent: {agent_path}")
         except Exception as e:
             logging.error(f"❌ Error initializing Dialogflow CX clients: {e}")
             raise
 
+    @property
+    def agents_client(self):
+        """AgentsClient for export/restore operations, created on first use with the Intents client's credentials."""
+        if self._agents_client is None:
+            from google.cloud.dialogflowcx_v3beta1 import services
+            self._agents_client = services.agents.AgentsClient(
+                credentials=self.intents_client.creds, client_options=self.intents_client._set_region(self.agent_path))
+        return self._agents_client
+
+    @property
+    def intents_service(self):
+        """IntentsClient for paged listing, created on first use with the Intents client's credentials."""
+        if self._intents_service is None:
+            from google.cloud.dialogflowcx_v3beta1 import services
+            self._intents_service = services.intents.IntentsClient(
+                credentials=self.intents_client.creds, client_options=self.intents_client._set_region(self.agent_path))
+        return self._intents_service
+
+    @property
+    def entity_types_service(self):
+        """EntityTypesClient for paged listing, created on first use with the Intents client's credentials."""
+        if self._entity_types_service is None:
+            from google.cloud.dialogflowcx_v3beta1 import services
+            self._entity_types_service = services.entity_types.EntityTypesClient(
+                credentials=self.intents_client.creds, client_options=self.intents_client._set_region(self.agent_path))
+        return self._entity_types_service
+
+    def call_api(self, func, label: str, /, **kwargs):
+        """
+        Calls a Dialogflow CX client method under the QPS cap, retrying transient errors.
+        Each attempt's latency, the retries and the final outcome (ALREADY_EXISTS counts
+        as skipped) are recorded in the run metrics under 'dialogflow.<method name>'.
+        
+        Args:
+            func (callable): The client method to call.
+            label (str): Description of the call used in retry log messages.
+            **kwargs: Arguments passed to the client method.
+            
+        Returns:
+            The client method's return value.
+        """
+        metrics = self.metrics
+        call = f"dialogflow.{getattr(func, '__name__', label)}"
+
+        def attempt():
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                return func(**kwargs)
+            finally:
+                metrics.observe_latency(call, time.perf_counter() - start)
+
+        try:
+            result = call_with_retries(attempt, max_retries=self.max_retries, description=label,
+                                       on_retry=lambda e: metrics.record_retry(call))
+        except Exception as e:
+            message = str(e).upper()
+            metrics.record_outcome(call, SKIPPED if "ALREADY_EXISTS" in message or "ALREADY EXISTS" in message else ERROR)
+            raise
+        metrics.record_outcome(call, SUCCESS)
+        return result
+
     def create_entities(self, config_data: dict):
         """
         Creates custom entities in Dialogflow CX based on the provided configuration.
@@ -32,33 +128,60 @@ class DialogflowAgentManager:
         """
         if "entities" in config_data:
             for entity in config_data["entities"]:
-                display_name = entity.get("display_name")
-                entries = entity.get("entries", [])
-                kind = entity.get("kind", "KIND_MAP")
-                auto_expansion = entity.get("auto_expansion_mode", "AUTO_EXPANSION_MODE_DEFAULT")
-
-                if not display_name:
-                    logging.warning(f"Skipping entity due to missing display_name: {entity}")
-                    continue
-
-                formatted_entries = [{"value": e["value"], "synonyms": e.get("synonyms", [])} for e in entries]
-
-                try:
-                    self.entities_client.create_entity_type(
-                        display_name=display_name,
-                        kind=kind,
-                        auto_expansion_mode=auto_expansion,
-                        entities=formatted_entries
-                    )
-                    logging.info(f"✅ Created custom entity: {display_name}")
-                except Exception as e:
-                    if "ALREADY_EXISTS" in str(e).upper():
-                        logging.info(f"⚠️ Entity '{display_name}' already exists. Skipping.")
-                    else:
-                        logging.error(f"❌ Error creating entity '{display_name}': {e}")
+                self.create_entity(entity)
         else:
             logging.info("ℹ️ No custom entities defined in YAML.")
 
+    def build_entity_payload(self, entity: dict) -> dict:
+        """
+        Formats a YAML entity definition into create_entity_type arguments.
+        
+        Args:
+            entity (dict): One entry of the YAML 'entities' list.
+            
+        Returns:
+            dict: Keyword arguments for create_entity_type, or None if the entity is malformed.
+        """
+        display_name = entity.get("display_name")
+        if not display_name:
+            logging.warning(f"Skipping entity due to missing display_name: {entity}")
+            return None
+
+        entries = entity.get("entries", [])
+        return {
+            "display_name": display_name,
+            "kind": entity.get("kind", "KIND_MAP"),
+            "auto_expansion_mode": entity.get("auto_expansion_mode", "AUTO_EXPANSION_MODE_DEFAULT"),
+            "entities": [{"value": e["value"], "synonyms": e.get("synonyms", [])} for e in entries]
+        }
+
+    def create_entity(self, entity: dict) -> str:
+        """
+        Creates a single custom entity type, skipping it if it already exists.
+        
+        Args:
+            entity (dict): One entry of the YAML 'entities' list.
+            
+        Returns:
+            str: 'created', 'skipped' or 'error'.
+        """
+        payload = self.build_entity_payload(entity)
+        if payload is None:
+            return "skipped"
+        display_name = payload["display_name"]
+
+        try:
+            created_entity = self.call_api(self.entities_client.create_entity_type, f"create entity '{display_name}'", **payload)
+            self._entity_type_index[display_name] = created_entity.name
+            logging.info(f"✅ Created custom entity: {display_name}")
+            return "created"
+        except Exception as e:
+            if "ALREADY_EXISTS" in str(e).upper():
+                logging.info(f"⚠️ Entity '{display_name}' already exists. Skipping.")
+                return "skipped"
+            logging.error(f"❌ Error creating entity '{display_name}': {e}")
+            return "error"
+
     def create_intents(self, config_data: dict):
         """
         Creates intents in Dialogflow CX based on the provided configuration.
@@ -67,86 +190,164 @@ class DialogflowAgentManager:
             config_data (dict): The loaded YAML configuration data.
         """
         intents_to_create = config_data.get("intents", [])
+        list_calls_before = self.entity_type_list_calls
         for intent_data in intents_to_create:
-            display_name = intent_data.get('display_name')
-            raw_training_phrases = intent_data.get('training_phrases', [])
+            self.create_intent(intent_data)
+        
+        logging.info(f"ℹ️ Resolved entity types with {self.entity_type_list_calls - list_calls_before} list_entity_types call(s) "
+                     f"for {len(intents_to_create)} intent(s).")
+        self.list_current_intents()
+
+    def compile_training_phrases(self, intent_data: dict) -> CompiledPhrases:
+        """
+        Compiles an intent's YAML training phrases (plain strings, bracket annotations such as
+        "[XYZ000]{@order-id}", and 'text_parts'). Memoized by content, so unchanged phrases are
+        parsed once however often the intent is planned, built or compared.
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            CompiledPhrases: The compiled phrases.
+        """
+        return self.phrase_compiler.compile(intent_data.get('training_phrases', []), intent_data.get('display_name'))
+
+    def format_training_phrases(self, intent_data: dict) -> list:
+        """
+        Formats an intent's YAML training phrases into Dialogflow CX training phrase dictionaries.
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            list: Dictionaries with 'parts' and 'repeat_count' (shared; do not modify).
+        """
+        return self.compile_training_phrases(intent_data).payload
+
+    def iter_valid_parameters(self, intent_data: dict):
+        """
+        Yields the well-formed parameters of an intent as (id, entity_type_display_name, is_list).
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+        """
+        for param in intent_data.get('parameters', []):
+            param_id = param.get('id')
+            entity_type = param.get('entity_type_display_name')
 
-            if not display_name:
-                logging.warning(f"Skipping intent due to missing display_name: {intent_data}")
+            if not (param_id and entity_type):
+                logging.warning(f"Skipping malformed parameter for '{intent_data.get('display_name')}': {param}")
                 continue
+            yield param_id, entity_type, param.get("is_list", False)
 
+    def format_parameters(self, intent_data: dict) -> list:
+        """
+        Formats an intent's parameters, resolving entity type display names to resource paths.
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            list: Dictionaries with 'id', 'entity_type' and 'is_list'.
+        """
+        display_name = intent_data.get('display_name')
+        formatted_intent_parameters = []
+        for param_id, entity_type, is_list in self.iter_valid_parameters(intent_data):
+            # Resolve custom entity to full resource path
+            entity_type_api = self._resolve_entity_type_path(entity_type)
+            if not entity_type_api:
+                logging.error(f"❌ Could not resolve entity type '{entity_type}' for intent '{display_name}'. Skipping parameter.")
+                continue
+
+            formatted_intent_parameters.append({
+                "id": param_id,
+                "entity_type": entity_type_api,
+                "is_list": is_list
+            })
+        return formatted_intent_parameters
+
+    def build_intent_payload(self, intent_data: dict) -> dict:
+        """
+        Formats a YAML intent definition into create_intent arguments.
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            dict: Keyword arguments for create_intent, or None if the intent is malformed.
+        """
+        display_name = intent_data.get('display_name')
+        if not display_name:
+            logging.warning(f"Skipping intent due to missing display_name: {intent_data}")
+            return None
+
+        payload = {
+            "agent_id": self.intents_client.agent_id,
+            "display_name": display_name,
+            "training_phrases": self.format_training_phrases(intent_data),
+            "description": intent_data.get('description', f"Intent for {display_name}"),
+            "priority": intent_data.get('priority', 500000),
+            "is_fallback": intent_data.get('is_fallback', False)
+        }
+        formatted_intent_parameters = self.format_parameters(intent_data)
+        if formatted_intent_parameters:
+            payload["parameters"] = formatted_intent_parameters
+        return payload
+
+    def create_intent(self, intent_data: dict) -> str:
+        """
+        Creates a single intent, skipping it if it already exists.
+        
+        Args:
+            intent_data (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            str: 'created', 'skipped' or 'error'.
+        """
+        display_name = intent_data.get('display_name')
+        if display_name:
             logging.info(f"\n🚀 Processing intent: '{display_name}'")
+        payload = self.build_intent_payload(intent_data)
+        if payload is None:
+            return "skipped"
 
-            # Format training phrases
-            formatted_training_phrases = []
-            for phrase_item in raw_training_phrases:
-                if isinstance(phrase_item, str):
-                    formatted_training_phrases.append({
-                        "parts": [{"text": phrase_item}],
-                        "repeat_count": 1
-                    })
-                elif isinstance(phrase_item, dict) and "text_parts" in phrase_item:
-                    parts = phrase_item["text_parts"]
-                    if all("text" in part for part in parts):
-                        formatted_training_phrases.append({
-                            "parts": parts,
-                            "repeat_count": phrase_item.get("repeat_count", 1)
-                        })
-                    else:
-                        logging.warning(f"Skipping malformed 'text_parts': {phrase_item} for intent '{display_name}'")
-                else:
-                    logging.warning(f"Unrecognized training phrase format: {phrase_item} for intent '{display_name}'")
-
-            # Format parameters
-            formatted_intent_parameters = []
-            for param in intent_data.get('parameters', []):
-                param_id = param.get('id')
-                entity_type = param.get('entity_type_display_name')
-
-                if not (param_id and entity_type):
-                    logging.warning(f"Skipping malformed parameter for '{display_name}': {param}")
-                    continue
-
-                # Resolve custom entity to full resource path
-                entity_type_api = self._resolve_entity_type_path(entity_type)
-                if not entity_type_api:
-                    logging.error(f"❌ Could not resolve entity type '{entity_type}' for intent '{display_name}'. Skipping parameter.")
-                    continue
-
-                param_dict = {
-                    "id": param_id,
-                    "entity_type": entity_type_api,
-                    "is_list": param.get("is_list", False)
-                }
-                formatted_intent_parameters.append(param_dict)
-
-            # Final payload for intent creation
-            try:
-                payload = {
-                    "agent_id": self.intents_client.agent_id,
-                    "display_name": display_name,
-                    "training_phrases": formatted_training_phrases,
-                    "description": intent_data.get('description', f"Intent for {display_name}"),
-                    "priority": intent_data.get('priority', 500000),
-                    "is_fallback": intent_data.get('is_fallback', False)
-                }
-                if formatted_intent_parameters:
-                    payload["parameters"] = formatted_intent_parameters
-
-                created_intent = self.intents_client.create_intent(**payload)
-                logging.info(f"✅ Created intent: '{created_intent.display_name}'")
+        try:
+            created_intent = self.call_api(self.intents_client.create_intent, f"create intent '{display_name}'", **payload)
+            logging.info(f"✅ Created intent: '{created_intent.display_name}'")
+            return "created"
+        except Exception as e:
+            if "already exists" in str(e).lower():
+                logging.info(f"⚠️ Intent '{display_name}' already exists. Skipping.")
+                return "skipped"
+            logging.error(f"❌ Error creating intent '{display_name}': {e}")
+            return "error"
 
-            except Exception as e:
-                if "already exists" in str(e).lower():
-                    logging.info(f"⚠️ Intent '{display_name}' already exists. Skipping.")
-                else:
-                    logging.error(f"❌ Error creating intent '{display_name}': {e}")
+    def register_entity_types(self, entity_types: list):
+        """
+        Seeds the entity type index from already-listed entity types (e.g. an agent snapshot),
+        so resolving their display names needs no further list calls.
         
-        self.list_current_intents()
+        Args:
+            entity_types (list): Entity type objects with 'name' and 'display_name'.
+        """
+        for ent in entity_types:
+            self._entity_type_index[ent.display_name] = ent.name
+        self._unresolved_entity_types.clear()
+
+    def _refresh_entity_type_index(self):
+        """
+        Rebuilds the display_name -> resource name index of custom entity types
+        with a single list_entity_types call.
+        """
+        self.entity_type_list_calls += 1
+        all_entities = self.call_api(self.entities_client.list_entity_types, "list entity types", agent_id=self.agent_path)
+        self._entity_type_index = {ent.display_name: ent.name for ent in all_entities}
+        self._unresolved_entity_types.clear()
 
     def _resolve_entity_type_path(self, entity_type_display_name: str) -> str:
         """
         Resolves a custom entity display name to its full resource path.
+        Uses the cached entity type index and only lists entity types again on a miss.
         
         Args:
             entity_type_display_name (str): The display name of the entity type.
@@ -156,24 +357,85 @@ class DialogflowAgentManager:
         """
         if entity_type_display_name.startswith('@sys.'):
             return f"projects/-/locations/-/agents/-/entityTypes/{entity_type_display_name[1:]}"
-        else:
+
+        entity_type_path = self._entity_type_index.get(entity_type_display_name)
+        if entity_type_path or entity_type_display_name in self._unresolved_entity_types:
+            return entity_type_path
+        with self._entity_type_index_lock:
+            # Another thread may have refreshed the index while we waited for the lock.
+            entity_type_path = self._entity_type_index.get(entity_type_display_name)
+            if entity_type_path or entity_type_display_name in self._unresolved_entity_types:
+                return entity_type_path
             try:
-                all_entities = self.entities_client.list_entity_types(agent_id=self.agent_path)
-                for ent in all_entities:
-                    if ent.display_name == entity_type_display_name:
-                        return ent.name
-                return None
+                self._refresh_entity_type_index()
             except Exception as e:
                 logging.error(f"Error resolving custom entity '{entity_type_display_name}': {e}")
                 return None
+            entity_type_path = self._entity_type_index.get(entity_type_display_name)
+            if not entity_type_path:
+                # Remember the miss so further parameters using it don't trigger another listing.
+                self._unresolved_entity_types.add(entity_type_display_name)
+            return entity_type_path
+
+    def _iter_pages(self, method, request, label: str):
+        """Yields the responses of a paged list call, one call_api (rate limited and retried) per page."""
+        page = 1
+        while True:
+            response = self.call_api(method, f"{label} (page {page})", request=request)
+            yield response
+            if not response.next_page_token:
+                return
+            request.page_token = response.next_page_token
+            page += 1
 
-    def list_current_intents(self):
-        """Lists all current intents in the Dialogflow CX agent."""
+    def iter_intent_records(self, page_size: int = LIST_PAGE_SIZE):
+        """
+        Pages through the agent's intents and yields one lightweight record per intent.
+        Only one page of full intents is held at a time.
+        
+        Args:
+            page_size (int): Intents per list call.
+            
+        Yields:
+            IntentRecord: (name, display_name, phrase_count).
+        """
+        from google.cloud.dialogflowcx_v3beta1 import types
+        request = types.ListIntentsRequest(parent=self.agent_path, page_size=page_size,
+                                           intent_view=types.IntentView.INTENT_VIEW_FULL)
+        for response in self._iter_pages(self.intents_service.list_intents, request, "list intents"):
+            for intent in response.intents:
+                yield IntentRecord(intent.name, intent.display_name, len(intent.training_phrases))
+
+    def iter_entity_type_records(self, page_size: int = LIST_PAGE_SIZE):
+        """
+        Pages through the agent's custom entity types and yields one lightweight record per entity type.
+        
+        Args:
+            page_size (int): Entity types per list call.
+            
+        Yields:
+            EntityTypeRecord: (name, display_name, entry_count).
+        """
+        from google.cloud.dialogflowcx_v3beta1 import types
+        request = types.ListEntityTypesRequest(parent=self.agent_path, page_size=page_size)
+        for response in self._iter_pages(self.entity_types_service.list_entity_types, request, "list entity types"):
+            for entity_type in response.entity_types:
+                yield EntityTypeRecord(entity_type.name, entity_type.display_name, len(entity_type.entities))
+
+    def list_current_intents(self) -> AgentSnapshot:
+        """
+        Lists all current intents (and entity types) in the Dialogflow CX agent, page by page.
+        
+        Returns:
+            AgentSnapshot: The listed records, or None if listing failed.
+        """
         logging.info("\n📋 Listing current intents:")
         try:
-            df = self.intents_client.bulk_intent_to_df()
-            for name in sorted(df['display_name'].unique()):
-                logging.info(f"- {name}")
+            snapshot = AgentSnapshot.capture(self)
+            for record in snapshot.intents:
+                logging.info(f"- {record.display_name} ({record.phrase_count} training phrases)")
+            return snapshot
         except Exception as e:
             logging.error(f"❌ Error fetching intents: {e}")
+            return None
 
@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class EnrichmentJournal:
+    def __init__(self, path: str, resume: bool = False, fsync_every: int = 25, fsync_interval: float = 2.0):
+        """
+        Opens an append-only JSONL journal of finished Gemini generations, so an
+        interrupted enrichment run can be resumed without paying for them again.
+
+        Each line records the generation key (see GenerationCache.make_key), the
+        intent's display name and the generated phrases. When deduplication changes
+        an intent's phrases, a later line for the same key records the accepted
+        ones (re-requested phrases included); the last line for a key wins. Lines
+        are flushed immediately and fsynced in batches.
+
+        Args:
+            path (str): Path of the journal file.
+            resume (bool): Load and keep existing entries. Otherwise the journal starts empty, and
+                an existing journal is kept as '<path>.prev' rather than truncated.
+            fsync_every (int): fsync after this many appended entries.
+            fsync_interval (float): ...or when this many seconds have passed since the last fsync.
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.entries = {}
+        self.resumed = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+            logging.info(f"Resuming enrichment: {len(self.entries)} finished generation(s) found in '{path}'.")
+        elif not resume and os.path.exists(path) and os.path.getsize(path):
+            # Left by an interrupted run: its generations were paid for, so don't throw them away.
+            os.replace(path, f"{path}.prev")
+            logging.warning(f"⚠️ Found the journal of an interrupted run in '{path}' and moved it to '{path}.prev'. "
+                            f"To reuse its generations, move it back and rerun with --resume.")
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a partially written last line; everything before it is intact.
+                    logging.warning(f"Ignoring unreadable line {line_number} in journal '{self.path}'.")
+                    continue
+                self.entries[record["key"]] = record["phrases"]
+
+    def get(self, key: str) -> list:
+        """
+        Returns the journaled phrases for a generation key, or None.
+
+        Args:
+            key (str): Generation key.
+        """
+        phrases = self.entries.get(key)
+        if phrases is not None:
+            self.resumed += 1
+        return phrases
+
+    def append(self, key: str, display_name: str, phrases: list):
+        """
+        Records a finished generation. Safe to call from several threads.
+
+        Args:
+            key (str): Generation key.
+            display_name (str): The intent's display name (for readability of the journal).
+            phrases (list): The generated plain text phrases.
+        """
+        line = json.dumps({"key": key, "display_name": display_name, "phrases": phrases}, ensure_ascii=False)
+        with self._lock:
+            self.entries[key] = phrases
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Fsyncs outstanding entries and closes the journal."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    def discard(self):
+        """Closes and deletes the journal once its results are in the compacted enriched file."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        logging.info(f"Enrichment journal '{self.path}' compacted and removed.")
@@ -0,0 +1,169 @@
+import logging
+from collections import deque
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _fold_char(char: str) -> str:
+    """
+    Case-folds a single character the way re.IGNORECASE compares literals.
+    Only single-character case mappings are used (as re does), so a folded
+    string always has the same length as the original.
+    """
+    upper = char.upper()
+    if len(upper) == 1:
+        lower = upper.lower()
+        if len(lower) == 1:
+            return lower
+    lower = char.lower()
+    return lower if len(lower) == 1 else lower[0]
+
+
+class EntityMatcher:
+    """
+    Multi-pattern, case-insensitive entity matcher built on an Aho-Corasick automaton.
+
+    The automaton is compiled once from the list returned by
+    GeminiEnricher._prepare_entities_for_matching and then tags any number of
+    phrases in a single linear pass each, instead of running one regex search
+    per synonym per cursor position.
+    """
+
+    def __init__(self, entities_for_matching: list):
+        """
+        Compiles the automaton for the given entities.
+
+        Args:
+            entities_for_matching (list): Dictionaries with 'text' and 'parameter_id',
+                sorted by text length descending. When two synonyms are equal
+                ignoring case, the one listed first wins, as with the regex scan.
+        """
+        self._goto = [{}]        # state -> {char: next_state}
+        self._fail = [0]         # state -> failure state
+        self._output = [None]    # state -> (length, parameter_id) of the pattern ending here
+        self._dict_link = [0]    # state -> nearest failure-chain state with an output
+        self._fold_cache = {}
+        self.has_empty_pattern = False
+        self.pattern_count = 0
+
+        for em in entities_for_matching:
+            self._add_pattern(em["text"], em["parameter_id"])
+        self._build_links()
+        logging.info(f"Compiled entity matcher with {self.pattern_count} patterns and {len(self._goto)} states.")
+
+    def _fold(self, text: str) -> str:
+        cache = self._fold_cache
+        folded = []
+        for char in text:
+            mapped = cache.get(char)
+            if mapped is None:
+                mapped = cache[char] = _fold_char(char)
+            folded.append(mapped)
+        return "".join(folded)
+
+    def _add_pattern(self, text: str, parameter_id: str):
+        self.pattern_count += 1
+        if not text:
+            self.has_empty_pattern = True
+            return
+        state = 0
+        for char in self._fold(text):
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            state = next_state
+        # Keep the first pattern registered for a state so ties resolve in list order.
+        if self._output[state] is None:
+            self._output[state] = (len(text), parameter_id)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                failure = self._fail[next_state]
+                self._dict_link[next_state] = failure if self._output[failure] is not None else self._dict_link[failure]
+
+    def find_longest_matches(self, phrase: str) -> dict:
+        """
+        Finds, for every position where an entity starts, the longest entity starting there.
+
+        Args:
+            phrase (str): The plain text phrase.
+
+        Returns:
+            dict: Maps start index -> (length, parameter_id).
+        """
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        best_at_start = {}
+        state = 0
+        for index, char in enumerate(self._fold(phrase)):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match_state = state if output[state] is not None else dict_link[state]
+            while match_state:
+                length, parameter_id = output[match_state]
+                start = index - length + 1
+                current = best_at_start.get(start)
+                if current is None or length > current[0]:
+                    best_at_start[start] = (length, parameter_id)
+                match_state = dict_link[match_state]
+        return best_at_start
+
+    def format_phrase(self, phrase: str) -> dict or str:
+        """
+        Formats a plain text phrase into Dialogflow CX 'text_parts' format.
+
+        Produces exactly the same parts as the original per-position regex scan:
+        scanning left to right, the longest entity starting at the cursor is tagged
+        and plain text runs up to the next entity start.
+
+        Args:
+            phrase (str): The plain text phrase.
+
+        Returns:
+            dict or str: Formatted phrase as a dictionary with 'text_parts' or a simple string.
+        """
+        best_at_start = self.find_longest_matches(phrase) if phrase else {}
+        starts = sorted(best_at_start)
+        parts = []
+        current_index = 0
+        next_start = 0
+
+        while current_index < len(phrase):
+            # Skip entity starts that were swallowed by a previous match.
+            while next_start < len(starts) and starts[next_start] < current_index:
+                next_start += 1
+
+            if next_start < len(starts) and starts[next_start] == current_index:
+                length, parameter_id = best_at_start[current_index]
+                if current_index > 0:
+                    # The regex scan always emitted the (empty) text preceding a
+                    # mid-phrase entity; kept so output stays byte-for-byte identical.
+                    parts.append({"text": ""})
+                parts.append({"text": phrase[current_index:current_index + length], "parameter_id": parameter_id})
+                current_index += length
+            elif next_start < len(starts) and not self.has_empty_pattern:
+                parts.append({"text": phrase[current_index:starts[next_start]]})
+                current_index = starts[next_start]
+            else:
+                parts.append({"text": phrase[current_index:]})
+                current_index = len(phrase)
+
+        if len(parts) == 1 and "parameter_id" not in parts[0]:
+            return parts[0]["text"]
+        else:
+            return {"text_parts": parts}
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Settings of the 'dialogflow' section that apply to the fan-out as a whole, not to one agent.
+FAN_OUT_KEYS = {"agent_path", "max_parallel_agents"}
+
+OK = "ok"
+PARTIAL = "partial"
+FAILED = "failed"
+
+
+def agent_project(agent_path: str) -> str:
+    """Returns the project id of an agent path ('projects/<id>/locations/...')."""
+    parts = agent_path.split("/")
+    return parts[1] if len(parts) > 1 and parts[0] == "projects" else agent_path
+
+
+def _per_agent_file(path: str, agent_path: str) -> str:
+    """Inserts the agent id before the extension, e.g. agent_package.zip -> agent_package.<agent id>.zip."""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{agent_path.rstrip('/').rsplit('/', 1)[-1]}{extension}"
+
+
+def resolve_agent_targets(dialogflow_config: dict) -> list:
+    """
+    Expands the 'dialogflow' section into one settings mapping per target agent.
+
+    'agent_path' is either a single agent path or a list whose entries are agent paths or
+    mappings with an 'agent_path' and any 'dialogflow' settings to override for that agent
+    (e.g. creds_path, max_workers, requests_per_second, deploy_mode). With several agents,
+    the package files of deploy_mode "package" and the snapshot file get the agent id in
+    their names unless an entry sets its own 'package' / 'snapshot_file'.
+
+    Args:
+        dialogflow_config (dict): The 'dialogflow' section of the project configuration.
+
+    Returns:
+        list: Per-agent 'dialogflow' sections, each with a single 'agent_path' string.
+    """
+    entries = dialogflow_config.get("agent_path")
+    if isinstance(entries, (str, dict)):
+        entries = [entries]
+    if not entries:
+        raise ValueError("dialogflow.agent_path must name at least one agent.")
+
+    shared = {key: value for key, value in dialogflow_config.items() if key not in FAN_OUT_KEYS}
+    targets = []
+    seen = set()
+    for entry in entries:
+        overrides = {"agent_path": entry} if isinstance(entry, str) else dict(entry)
+        agent_path = overrides.get("agent_path")
+        if not agent_path:
+            raise ValueError(f"dialogflow.agent_path entry without an 'agent_path': {entry}")
+        if agent_path in seen:
+            raise ValueError(f"Agent '{agent_path}' is listed more than once in dialogflow.agent_path.")
+        seen.add(agent_path)
+        target = {**shared, **overrides}
+        if len(entries) > 1 and "package" not in overrides:
+            package = dict(shared.get("package") or {})
+            package["output_file"] = _per_agent_file(package.get("output_file", "agent_package.zip"), agent_path)
+            package["export_file"] = _per_agent_file(package.get("export_file", "agent_export.zip"), agent_path)
+            target["package"] = package
+        if len(entries) > 1 and "snapshot_file" not in overrides and shared.get("snapshot_file"):
+            target["snapshot_file"] = _per_agent_file(shared["snapshot_file"], agent_path)
+        targets.append(target)
+    return targets
+
+
+class FanOutSummary:
+    def __init__(self):
+        """Collects the result of deploying to every agent."""
+        self.results = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_path: str, seconds: float, summary=None, error: Exception = None):
+        """
+        Records the result of one agent.
+
+        Args:
+            agent_path (str): The agent.
+            seconds (float): Time spent deploying to it.
+            summary (DeploymentSummary): Item outcomes, if the deployment produced them.
+            error (Exception): The exception that stopped the agent's deployment, if any.
+        """
+        if error is not None:
+            status = FAILED
+        elif summary is not None and summary.failed():
+            status = PARTIAL
+        else:
+            status = OK
+        with self._lock:
+            self.results[agent_path] = {
+                "status": status,
+                "seconds": round(seconds, 3),
+                "counts": summary.counts() if summary is not None else {},
+                "error": str(error) if error is not None else None,
+            }
+
+    def failed(self) -> list:
+        """
+        Returns:
+            list: Agents whose deployment failed or had failed items.
+        """
+        return [agent_path for agent_path, result in self.results.items() if result["status"] != OK]
+
+    def log(self):
+        """Logs one line per agent and the overall result."""
+        for agent_path, result in self.results.items():
+            counts = "; ".join(f"{resource}: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+                               for resource, outcomes in result["counts"].items() if outcomes)
+            symbol = {OK: "✅", PARTIAL: "⚠️", FAILED: "❌"}[result["status"]]
+            logging.info(f"{symbol} {agent_path}: {result['status']} in {result['seconds']}s" +
+                         (f" ({counts})" if counts else "") + (f": {result['error']}" if result["error"] else ""))
+        failed = self.failed()
+        logging.info(f"📊 Fan-out summary: {len(self.results) - len(failed)} of {len(self.results)} agent(s) deployed cleanly.")
+
+
+class FanOutDeployer:
+    def __init__(self, targets: list, deploy_agent, max_parallel_agents: int = 4):
+        """
+        Deploys the same, already enriched agent config to several agents at once.
+
+        Args:
+            targets (list): Per-agent 'dialogflow' sections from resolve_agent_targets.
+            deploy_agent (callable): Called with one target; deploys to that agent and returns its
+                DeploymentSummary (or None). Exceptions only fail that agent.
+            max_parallel_agents (int): Number of agents deployed at the same time. Each agent
+                additionally runs up to its own 'max_workers' requests in flight.
+        """
+        if max_parallel_agents < 1:
+            raise ValueError("max_parallel_agents must be at least 1.")
+        self.targets = targets
+        self.deploy_agent = deploy_agent
+        self.max_parallel_agents = max_parallel_agents
+
+    def _deploy_one(self, target: dict, summary: FanOutSummary):
+        agent_path = target["agent_path"]
+        start = time.perf_counter()
+        try:
+            result = self.deploy_agent(target)
+            summary.record(agent_path, time.perf_counter() - start, result)
+        except Exception as e:
+            logging.error(f"❌ Deployment to '{agent_path}' failed: {e}")
+            summary.record(agent_path, time.perf_counter() - start, error=e)
+
+    def run(self) -> FanOutSummary:
+        """
+        Deploys to every target.
+
+        Returns:
+            FanOutSummary: Per-agent results. A failing agent never stops the others.
+        """
+        summary = FanOutSummary()
+        workers = min(self.max_parallel_agents, len(self.targets))
+        logging.info(f"🌐 Deploying to {len(self.targets)} agent(s), {workers} at a time.")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent") as executor:
+            for target in self.targets:
+                executor.submit(self._deploy_one, target, summary)
+        # Report in configuration order, not completion order.
+        summary.results = {target["agent_path"]: summary.results[target["agent_path"]] for target in self.targets}
+        summary.log()
+        return summary
@@ -1,25 +1,83 @@
 import yaml
-import google.generativeai as genai
 import re
+import json
 import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from entity_matcher import EntityMatcher
+from rate_limiter import RateLimiter, call_with_retries, estimate_tokens
+from generation_cache import GenerationCache
+from enrichment_journal import EnrichmentJournal
+from phrase_dedup import PhraseDeduplicator
+from run_metrics import NO_METRICS, RunMetrics, SUCCESS, SKIPPED, ERROR
+from training_phrases import PhraseCompiler
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+DEFAULT_MODEL_NAME = "gemini-2.5-flash"
+# Rough number of output tokens per generated phrase, used to size batched requests.
+OUTPUT_TOKENS_PER_PHRASE = 20
+# Call type under which Gemini requests appear in the run metrics.
+GEMINI_CALL = "gemini.generate_content"
+
 class GeminiEnricher:
-    def __init__(self, api_key: str, phrases_to_generate: int):
+    def __init__(self, api_key: str, phrases_to_generate: int, max_concurrent_requests: int = 1,
+                 requests_per_minute: float = None, tokens_per_minute: float = None, max_retries: int = 3,
+                 cache: GenerationCache = None, model=None, deduplicator: PhraseDeduplicator = None,
+                 batch_token_budget: int = None, max_intents_per_batch: int = 20, metrics: RunMetrics = None,
+                 max_pending_intents: int = 256, phrase_compiler: PhraseCompiler = None):
         """
         Initializes the GeminiEnricher with the Gemini API key and desired number of phrases.
         
         Args:
             api_key (str): Your Gemini API key.
             phrases_to_generate (int): The number of new training phrases to generate per intent.
+            max_concurrent_requests (int): Maximum number of Gemini requests in flight at once (1 = sequential).
+            requests_per_minute (float): Optional cap on Gemini requests per minute.
+            tokens_per_minute (float): Optional cap on estimated prompt tokens per minute.
+            max_retries (int): Retries with jittered backoff on rate-limit (429) and server (5xx) errors.
+            cache (GenerationCache): Optional persistent cache; unchanged intents are served from it.
+            model: Optional pre-built model exposing generate_content(prompt), e.g. a fake for tests.
+            deduplicator (PhraseDeduplicator): Optional filter for generated phrases that duplicate
+                phrases already in the agent.
+            batch_token_budget (int): If set, several intents are packed into one JSON-mode request
+                whose estimated prompt and output tokens stay within this budget.
+            max_intents_per_batch (int): Upper bound on intents per batched request.
+            metrics (RunMetrics): Optional collector for stage timings, Gemini latencies, retries and tokens.
+            max_pending_intents (int): Maximum number of intents read ahead of the one being yielded by
+                iter_enriched_intents, so memory stays bounded however many intents are streamed.
+            phrase_compiler (PhraseCompiler): Optional compiler of the intents' existing training phrases.
         """
-        if not api_key:
-            raise ValueError("Gemini API key cannot be empty.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+        if model is None:
+            if not api_key:
+                raise ValueError("Gemini API key cannot be empty.")
+            # Imported here: the SDK takes seconds to load and is not needed for validation or deploy-only runs.
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(DEFAULT_MODEL_NAME)
+        if max_concurrent_requests < 1:
+            raise ValueError("max_concurrent_requests must be at least 1.")
+        if max_pending_intents < 1:
+            raise ValueError("max_pending_intents must be at least 1.")
+        self.model = model
+        self.model_name = getattr(model, "model_name", DEFAULT_MODEL_NAME)
+        self.cache = cache
+        self.deduplicator = deduplicator
+        self.batch_token_budget = batch_token_budget
+        self.max_intents_per_batch = max_intents_per_batch
+        self.max_pending_intents = max_pending_intents
+        self.phrase_compiler = phrase_compiler or PhraseCompiler()
+        self.usage = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "batched_calls": 0,
+                      "batched_intents": 0, "fallback_intents": 0}
+        self._usage_lock = threading.Lock()
+        self.metrics = metrics or NO_METRICS
         self.phrases_to_generate = phrases_to_generate
-        logging.info("GeminiEnricher initialized.")
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+        logging.info(f"GeminiEnricher initialized (max {max_concurrent_requests} concurrent requests).")
 
     def _prepare_entities_for_matching(self, config_data: dict) -> list:
         """
@@ -47,78 +105,80 @@ class GeminiEnricher:
         logging.info(f"Prepared {len(all_entities_for_matching)} entities for matching.")
         return all_entities_for_matching
 
-    def _format_phrase_with_entities(self, phrase: str, entities_for_matching: list) -> dict or str:
+    def _format_phrase_with_entities(self, phrase: str, entity_matcher: EntityMatcher) -> dict or str:
         """
         Formats a plain text phrase into Dialogflow CX 'text_parts' format,
-        identifying and tagging entities based on the provided entity list.
+        identifying and tagging entities with the precompiled entity matcher.
         
         Args:
             phrase (str): The plain text phrase.
-            entities_for_matching (list): List of entities prepared for matching.
+            entity_matcher (EntityMatcher): Matcher compiled from the entities prepared for matching.
             
         Returns:
             dict or str: Formatted phrase as a dictionary with 'text_parts' or a simple string.
         """
-        parts = []
-        current_index = 0
+        return entity_matcher.format_phrase(phrase)
+
+    def _record_usage(self, **counts):
+        with self._usage_lock:
+            for name, count in counts.items():
+                self.usage[name] += count
+
+    def _generate_content(self, prompt: str, intent_name: str, generation_config: dict = None):
+        """
+        Sends a prompt to Gemini under the rate limiter, retrying transient errors.
+        Every attempt and the tokens of every response are counted in self.usage.
         
-        while current_index < len(phrase):
-            best_match = None
-            best_match_text = ""
-            best_match_param_id = None
-            best_match_start = -1
-
-            # Search for the longest entity match starting from the current_index
-            for em in entities_for_matching:
-                entity_text = em["text"]
-                param_id = em["parameter_id"]
-                
-                # Use re.IGNORECASE for case-insensitive matching
-                match = re.search(re.escape(entity_text), phrase[current_index:], re.IGNORECASE)
-                
-                if match and match.start() == 0: # If the entity is found at the beginning of the remaining string
-                    if len(entity_text) > len(best_match_text): # Prioritize longest match
-                        best_match = match
-                        best_match_text = entity_text
-                        best_match_param_id = param_id
-                        best_match_start = current_index
+        Args:
+            prompt (str): The prompt to send.
+            intent_name (str): The intent the prompt is for, used in log messages.
+            generation_config (dict): Optional generation config (e.g. a JSON response MIME type).
             
-            if best_match:
-                # Add the text before the entity if any
-                if best_match_start > 0: # Check if there's plain text before the entity at current_index
-                    parts.append({"text": phrase[current_index:current_index + best_match.start()]})
-                
-                # Add the entity part
-                matched_text_in_phrase = phrase[current_index + best_match.start() : current_index + best_match.end()]
-                parts.append({"text": matched_text_in_phrase, "parameter_id": best_match_param_id})
-                
-                current_index += best_match.end()
-            else:
-                # If no entity is found at current_index, add the next segment of plain text
-                next_entity_start_index = len(phrase)
-                for em in entities_for_matching:
-                    # Find the first occurrence of any entity *after* current_index
-                    match = re.search(re.escape(em["text"]), phrase[current_index:], re.IGNORECASE)
-                    if match:
-                        next_entity_start_index = min(next_entity_start_index, current_index + match.start())
-                
-                # Add the plain text segment up to the next found entity or end of string
-                if next_entity_start_index > current_index:
-                    parts.append({"text": phrase[current_index:next_entity_start_index]})
-                    current_index = next_entity_start_index
+        Returns:
+            The Gemini response object.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        metrics = self.metrics
+
+        def attempt():
+            self.rate_limiter.acquire(prompt_tokens)
+            self._record_usage(calls=1)
+            start = time.perf_counter()
+            try:
+                if generation_config is None:
+                    response = self.model.generate_content(prompt)
                 else:
-                    # Fallback: if no further entities are found, add the rest of the phrase as plain text
-                    parts.append({"text": phrase[current_index:]})
-                    current_index = len(phrase) # Move current_index to the end to terminate loop
-                    
-        # If the phrase consists of a single part that is not an entity, return it as a simple string
-        if len(parts) == 1 and "parameter_id" not in parts[0]:
-            return parts[0]["text"]
-        else:
-            # Otherwise, return it in the text_parts format
-            return {"text_parts": parts}
+                    response = self.model.generate_content(prompt, generation_config=generation_config)
+            finally:
+                metrics.observe_latency(GEMINI_CALL, time.perf_counter() - start)
+            metadata = getattr(response, "usage_metadata", None)
+            used_prompt_tokens = getattr(metadata, "prompt_token_count", None) or prompt_tokens
+            used_output_tokens = getattr(metadata, "candidates_token_count", None) or estimate_tokens(response.text)
+            self._record_usage(prompt_tokens=used_prompt_tokens, output_tokens=used_output_tokens)
+            metrics.record_tokens(used_prompt_tokens, used_output_tokens)
+            return response
+
+        try:
+            response = call_with_retries(attempt, max_retries=self.max_retries, description=f"Gemini request for '{intent_name}'",
+                                         on_retry=lambda e: metrics.record_retry(GEMINI_CALL))
+        except Exception:
+            metrics.record_outcome(GEMINI_CALL, ERROR)
+            raise
+        metrics.record_outcome(GEMINI_CALL, SUCCESS)
+        return response
 
-    def _generate_training_phrases_with_gemini(self, intent_name: str, description: str, existing_phrases: list) -> list:
+    def log_usage(self):
+        """Logs Gemini calls and tokens spent so far."""
+        usage = self.usage
+        message = (f"📈 Gemini usage: {usage['calls']} call(s), {usage['prompt_tokens']} prompt and "
+                   f"{usage['output_tokens']} output tokens")
+        if usage["batched_calls"]:
+            message += (f"; {usage['batched_intents']} intent(s) in {usage['batched_calls']} batched call(s), "
+                        f"{usage['fallback_intents']} retried individually")
+        logging.info(message + ".")
+
+    def _generate_training_phrases_with_gemini(self, intent_name: str, description: str, existing_phrases: list,
+                                               phrases_to_generate: int = None, cache_checked: bool = False) -> list:
         """
         Generates new training phrases using Gemini, ensuring clean output without
         introductory remarks or numbering.
@@ -127,10 +187,14 @@ class GeminiEnricher:
             intent_name (str): The display name of the intent.
             description (str): The description of the intent.
             existing_phrases (list): A list of existing training phrases for context.
+            phrases_to_generate (int): How many phrases to ask for; defaults to self.phrases_to_generate.
+            cache_checked (bool): The caller already missed the cache for this generation, so it is
+                not looked up (and counted) again; the result is still stored.
             
         Returns:
             list: A list of newly generated plain text phrases.
         """
+        phrases_to_generate = phrases_to_generate or self.phrases_to_generate
         prompt = f"""You are a Dialogflow CX assistant. Your task is to generate new, diverse, and natural training phrases for a given intent. Do not include any introductory or concluding remarks, just the phrases themselves, one per line. Do not number the phrases.
 
 Here is the intent information:
@@ -139,11 +203,19 @@ Description: "{description}"
 Existing training phrases (for context, do not regenerate these):
 {chr(10).join(f"- {phrase}" for phrase in existing_phrases)}
 
-Generate {self.phrases_to_generate} new diverse and natural training phrases that match the above intent. Each phrase should be on a new line.
+Generate {phrases_to_generate} new diverse and natural training phrases that match the above intent. Each phrase should be on a new line.
 """
         
+        if cache_checked:
+            cache_key = None if self.cache is None else GenerationCache.make_key(
+                self.model_name, intent_name, description, existing_phrases, phrases_to_generate)
+        else:
+            cache_key, cached_phrases = self._lookup_cache(intent_name, description, existing_phrases, phrases_to_generate)
+            if cached_phrases is not None:
+                return cached_phrases
+
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate_content(prompt, intent_name)
             # Post-process the response to remove any numbering, leading dashes, or extra whitespace
             generated_phrases = []
             for line in response.text.strip().split("\n"):
@@ -153,60 +225,331 @@ Generate {self.phrases_to_generate} new diverse and natural training phrases tha
                 if cleaned_line: # Only add non-empty lines
                     generated_phrases.append(cleaned_line)
             logging.info(f"Generated {len(generated_phrases)} phrases for '{intent_name}'.")
+            if cache_key and generated_phrases:
+                self.cache.put(cache_key, generated_phrases)
             return generated_phrases
         except Exception as e:
             logging.error(f"Error generating phrases for '{intent_name}': {e}")
             return []
 
-    def enrich_agent_config(self, config_data: dict) -> dict:
+    def _lookup_cache(self, intent_name: str, description: str, existing_phrases: list, phrases_to_generate: int):
+        """
+        Looks up a generation in the cache.
+        
+        Returns:
+            tuple: (cache key, cached phrases); both None without a cache, phrases None on a miss.
+        """
+        if self.cache is None:
+            return None, None
+        cache_key = GenerationCache.make_key(self.model_name, intent_name, description, existing_phrases, phrases_to_generate)
+        cached_phrases = self.cache.get(cache_key)
+        if cached_phrases is not None:
+            logging.info(f"Using {len(cached_phrases)} cached phrases for '{intent_name}'.")
+            self.metrics.record_outcome(GEMINI_CALL, SKIPPED)
+        return cache_key, cached_phrases
+
+    def _build_batch_prompt(self, batch: list) -> str:
+        """
+        Builds one prompt asking for phrases for several intents as a JSON object.
+        
+        Args:
+            batch (list): (intent name, description, existing phrases) per intent.
+            
+        Returns:
+            str: The prompt.
+        """
+        intents = [{"intent_name": name, "description": description, "existing_phrases": existing_phrases}
+                   for name, description, existing_phrases in batch]
+        return f"""You are a Dialogflow CX assistant. Your task is to generate new, diverse, and natural training phrases for each of the intents below.
+
+Respond with a single JSON object and nothing else. Its keys must be the intent names exactly as given, and each value must be an array of {self.phrases_to_generate} new training phrases (strings) that match that intent. Do not regenerate the existing phrases.
+
+Intents:
+{json.dumps(intents, ensure_ascii=False, indent=1)}
+"""
+
+    def _estimate_batch_tokens(self, intent_name: str, description: str, existing_phrases: list) -> int:
+        """Estimates the prompt and output tokens one intent adds to a batched request."""
+        entry = json.dumps({"intent_name": intent_name, "description": description, "existing_phrases": existing_phrases},
+                           ensure_ascii=False, indent=1)
+        return estimate_tokens(entry) + self.phrases_to_generate * OUTPUT_TOKENS_PER_PHRASE
+
+    def _parse_batch_response(self, text: str, intent_names: list):
+        """
+        Validates a batched response against the expected schema: a JSON object mapping
+        each requested intent name to a non-empty array of non-empty strings.
+        
+        Args:
+            text (str): The response text.
+            intent_names (list): The intent names that were requested.
+            
+        Returns:
+            tuple: ({intent name: phrases} for valid entries, [intent names that failed validation]).
+        """
+        # Tolerate a Markdown code fence around the JSON.
+        text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text)
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            logging.warning(f"Batched Gemini response is not valid JSON: {e}")
+            return {}, list(intent_names)
+        if not isinstance(data, dict):
+            logging.warning("Batched Gemini response is not a JSON object.")
+            return {}, list(intent_names)
+
+        results, failed = {}, []
+        for name in intent_names:
+            phrases = data.get(name)
+            if isinstance(phrases, list) and phrases and all(isinstance(p, str) and p.strip() for p in phrases):
+                results[name] = [p.strip() for p in phrases][:self.phrases_to_generate]
+            else:
+                failed.append(name)
+        return results, failed
+
+    def _generate_batch(self, batch: list, journal: EnrichmentJournal = None):
+        """
+        Generates phrases for a batch of intents with one request, then resolves each
+        intent's future. Intents missing or invalid in the response are generated with
+        individual requests.
+        
+        Args:
+            batch (list): (future, intent name, description, existing phrases, journal key) per intent.
+            journal (EnrichmentJournal): Optional journal to record finished generations in.
+        """
+        names = [name for _, name, _, _, _ in batch]
+        results, failed = {}, names
+        if len(batch) > 1:
+            prompt = self._build_batch_prompt([(name, desc, existing) for _, name, desc, existing, _ in batch])
+            try:
+                response = self._generate_content(prompt, f"batch of {len(batch)} intents",
+                                                  generation_config={"response_mime_type": "application/json"})
+                results, failed = self._parse_batch_response(response.text, names)
+            except Exception as e:
+                logging.error(f"Error generating phrases for a batch of {len(batch)} intents: {e}")
+            self._record_usage(batched_calls=1, batched_intents=len(batch), fallback_intents=len(failed))
+            if failed:
+                logging.warning(f"Retrying {len(failed)} of {len(batch)} batched intent(s) individually: {failed}")
+
+        for future, name, desc, existing, key in batch:
+            try:
+                if name in results:
+                    phrases = results[name]
+                    logging.info(f"Generated {len(phrases)} phrases for '{name}' (batched).")
+                    if self.cache is not None:
+                        self.cache.put(GenerationCache.make_key(self.model_name, name, desc, existing, self.phrases_to_generate), phrases)
+                else:
+                    # The intent missed the cache before it was batched.
+                    phrases = self._generate_training_phrases_with_gemini(name, desc, existing, cache_checked=True)
+                if journal is not None and phrases:
+                    journal.append(key, name, phrases)
+                future.set_result(phrases)
+            except Exception as e:
+                future.set_exception(e)
+
+    def _collect_existing_phrases(self, intent: dict) -> list:
+        """
+        Flattens an intent's training phrases (text_parts and bracket annotations included)
+        into plain strings so they can be passed to Gemini for context.
+        
+        Args:
+            intent (dict): One entry of the YAML 'intents' list.
+            
+        Returns:
+            list: The existing phrases as plain text.
+        """
+        return self.phrase_compiler.compile(intent["training_phrases"], intent["display_name"]).texts
+
+    def _apply_generated_phrases(self, intent: dict, new_plain_phrases: list, entity_matcher: EntityMatcher):
+        """
+        Formats newly generated phrases with entity detection and appends them to the intent.
+        
+        Args:
+            intent (dict): The intent being enriched (modified in place).
+            new_plain_phrases (list): Plain text phrases returned by Gemini.
+            entity_matcher (EntityMatcher): Matcher compiled from the config's entities.
+        """
+        new_formatted_phrases = []
+        for phrase in new_plain_phrases:
+            formatted_phrase = self._format_phrase_with_entities(phrase, entity_matcher)
+            new_formatted_phrases.append(formatted_phrase)
+
+        logging.info(f"Generated and formatted for '{intent['display_name']}': {new_formatted_phrases}")
+
+        # Append the new formatted phrases to the intent's training_phrases list
+        intent["training_phrases"].extend(new_formatted_phrases)
+
+    def _deduplicate(self, intent_name: str, description: str, existing_phrases: list, generated_phrases: list) -> list:
+        """
+        Filters one intent's generated phrases through the deduplicator and, if enabled,
+        asks Gemini again for as many phrases as were dropped.
+        
+        Args:
+            intent_name (str): The display name of the intent.
+            description (str): The description of the intent.
+            existing_phrases (list): The intent's existing plain text phrases.
+            generated_phrases (list): Phrases returned by Gemini.
+            
+        Returns:
+            list: The phrases to add to the intent.
+        """
+        dedup = self.deduplicator
+        kept = dedup.filter(intent_name, generated_phrases)
+        seen = existing_phrases + generated_phrases
+        missing = len(generated_phrases) - len(kept)
+        for _ in range(dedup.max_rerequests if dedup.rerequest else 0):
+            if not missing:
+                break
+            dedup.record_rerequest(intent_name, missing)
+            # Everything generated so far goes in as context, so Gemini avoids the rejected phrases too.
+            retry_phrases = self._generate_training_phrases_with_gemini(intent_name, description, seen, missing)
+            retry_kept = dedup.filter(intent_name, retry_phrases)
+            kept.extend(retry_kept)
+            seen = seen + retry_phrases
+            missing = len(retry_phrases) - len(retry_kept)
+        dedup.log_intent(intent_name)
+        return kept
+
+    def _generate_and_journal(self, journal: EnrichmentJournal, key: str, intent_name: str, description: str,
+                              existing_phrases: list) -> list:
+        """Generates phrases for one intent and records them in the journal as soon as they arrive."""
+        generated_phrases = self._generate_training_phrases_with_gemini(intent_name, description, existing_phrases)
+        if generated_phrases:
+            # Failed generations are not journaled, so a resumed run retries them.
+            journal.append(key, intent_name, generated_phrases)
+        return generated_phrases
+
+    def _finish_intent(self, intent: dict, future: Future, existing_phrases: list, key: str, entity_matcher: EntityMatcher,
+                       journal: EnrichmentJournal = None) -> dict:
+        """
+        Waits for an intent's generation (if any), deduplicates it and adds the tagged phrases to the intent.
+        If deduplication changed the phrases, the accepted ones replace the generation in the journal:
+        re-requested phrases differ between calls, and filtering the accepted phrases again on resume
+        keeps all of them, so a resumed run adds the same phrases without calling Gemini.
+        """
+        if future is not None:
+            with self.metrics.stage("gemini_wait"):
+                new_phrases = future.result()
+            if self.deduplicator is not None:
+                with self.metrics.stage("dedup"):
+                    # Runs in intent order, so which of two colliding phrases survives is deterministic.
+                    generated_phrases = new_phrases
+                    new_phrases = self._deduplicate(intent["display_name"], intent.get("description", ""),
+                                                    existing_phrases, generated_phrases)
+                if journal is not None and key is not None and new_phrases != generated_phrases:
+                    journal.append(key, intent["display_name"], new_phrases)
+            with self.metrics.stage("entity_tagging"):
+                self._apply_generated_phrases(intent, new_phrases, entity_matcher)
+        return intent
+
+    def iter_enriched_intents(self, config_data: dict, journal: EnrichmentJournal = None):
+        """
+        Enriches the configuration's intents and yields each one as soon as it is ready.
+        Up to max_concurrent_requests Gemini requests run in the background; intents
+        are always yielded in their original order, so consumers see a deterministic stream.
+        With a batch_token_budget, consecutive intents that need Gemini share requests.
+        At most max_pending_intents intents are read ahead, so 'intents' may be a lazy
+        iterable (e.g. sharded config intents) without ever being held in memory at once;
+        with a deduplicator it is iterated twice.
+        
+        Args:
+            config_data (dict): The loaded YAML configuration data. Intents are modified in place.
+            journal (EnrichmentJournal): Optional journal. Generations already in it are reused
+                instead of calling Gemini, and new ones are appended as they finish.
+            
+        Yields:
+            dict: Each intent of config_data['intents'], enriched where possible.
+        """
+        metrics = self.metrics
+        with metrics.stage("entity_prep"):
+            # Prepare entities for matching *before* iterating through intents
+            all_entities_for_matching = self._prepare_entities_for_matching(config_data)
+            entity_matcher = EntityMatcher(all_entities_for_matching)
+
+        if self.deduplicator is not None:
+            with metrics.stage("dedup_index"):
+                # Generated phrases are checked against the whole agent, not just their own intent.
+                for intent in config_data.get("intents", []):
+                    if "training_phrases" in intent:
+                        self.deduplicator.add_existing(intent["display_name"], self._collect_existing_phrases(intent))
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrent_requests, thread_name_prefix="gemini")
+        try:
+            pending = deque()
+            batch, batch_names, batch_tokens = [], set(), 0
+            batch_header_tokens = estimate_tokens(self._build_batch_prompt([])) if self.batch_token_budget else 0
+            for intent in config_data.get("intents", []):
+                if "training_phrases" not in intent:
+                    logging.warning(f"Intent '{intent['display_name']}' has no 'training_phrases' key. Skipping enrichment for this intent.")
+                    pending.append((intent, None, None, None))
+                    continue
+                name = intent["display_name"]
+                desc = intent.get("description", "")
+                existing_phrases = self._collect_existing_phrases(intent)
+                key, journaled_phrases = None, None
+                if journal is not None:
+                    key = GenerationCache.make_key(self.model_name, name, desc, existing_phrases, self.phrases_to_generate)
+                    journaled_phrases = journal.get(key)
+
+                if journaled_phrases is not None:
+                    metrics.record_outcome(GEMINI_CALL, SKIPPED)
+                    future = Future()
+                    future.set_result(journaled_phrases)
+                elif self.batch_token_budget:
+                    future = Future()
+                    _, cached_phrases = self._lookup_cache(name, desc, existing_phrases, self.phrases_to_generate)
+                    if cached_phrases is not None:
+                        if journal is not None:
+                            journal.append(key, name, cached_phrases)
+                        future.set_result(cached_phrases)
+                    else:
+                        tokens = self._estimate_batch_tokens(name, desc, existing_phrases)
+                        # Responses are keyed by intent name, so a name may appear only once per batch.
+                        if batch and (batch_header_tokens + batch_tokens + tokens > self.batch_token_budget
+                                      or len(batch) >= self.max_intents_per_batch or name in batch_names):
+                            executor.submit(self._generate_batch, batch, journal)
+                            batch, batch_names, batch_tokens = [], set(), 0
+                        batch.append((future, name, desc, existing_phrases, key))
+                        batch_names.add(name)
+                        batch_tokens += tokens
+                elif journal is None:
+                    future = executor.submit(self._generate_training_phrases_with_gemini, name, desc, existing_phrases)
+                else:
+                    future = executor.submit(self._generate_and_journal, journal, key, name, desc, existing_phrases)
+                pending.append((intent, future, existing_phrases, key))
+                while len(pending) > self.max_pending_intents:
+                    if batch and batch[0][0] is pending[0][1]:
+                        # The oldest intent waits on the batch still being filled: send it now.
+                        executor.submit(self._generate_batch, batch, journal)
+                        batch, batch_names, batch_tokens = [], set(), 0
+                    yield self._finish_intent(*pending.popleft(), entity_matcher, journal)
+            if batch:
+                executor.submit(self._generate_batch, batch, journal)
+
+            while pending:
+                yield self._finish_intent(*pending.popleft(), entity_matcher, journal)
+        finally:
+            # Don't spend Gemini quota on intents nobody will consume if the stream is abandoned.
+            executor.shutdown(wait=True, cancel_futures=True)
+            if journal is not None and journal.resumed:
+                logging.info(f"Reused {journal.resumed} journaled generation(s) from a previous run.")
+            if self.deduplicator is not None:
+                self.deduplicator.log_summary()
+            self.log_usage()
+
+    def enrich_agent_config(self, config_data: dict, journal: EnrichmentJournal = None) -> dict:
         """
         Enriches the agent configuration with Gemini-generated training phrases.
         
         Args:
             config_data (dict): The loaded YAML configuration data.
+            journal (EnrichmentJournal): Optional checkpoint journal (see iter_enriched_intents).
             
         Returns:
             dict: The updated configuration data with enriched training phrases.
         """
         enriched_data = config_data.copy()
-        
-        # Prepare entities for matching *before* iterating through intents
-        all_entities_for_matching = self._prepare_entities_for_matching(enriched_data)
-
-        for intent in enriched_data.get("intents", []):
-            name = intent["display_name"]
-            desc = intent.get("description", "")
-            existing_phrases = []
-
-            # Collect existing training phrases, flattening text_parts into simple strings if necessary,
-            # so they can be passed to Gemini for context.
-            if "training_phrases" in intent:
-                for tp in intent["training_phrases"]:
-                    if isinstance(tp, str):
-                        existing_phrases.append(tp)
-                    elif isinstance(tp, dict) and "text_parts" in tp:
-                        text = "".join(part["text"] for part in tp["text_parts"])
-                        existing_phrases.append(text)
-
-                # Generate new plain text phrases using Gemini
-                new_plain_phrases = self._generate_training_phrases_with_gemini(name, desc, existing_phrases)
-                
-                # Format the newly generated phrases with entity detection
-                new_formatted_phrases = []
-                for phrase in new_plain_phrases:
-                    formatted_phrase = self._format_phrase_with_entities(phrase, all_entities_for_matching)
-                    new_formatted_phrases.append(formatted_phrase)
-
-                logging.info(f"Generated and formatted for '{name}': {new_formatted_phrases}")
-
-                # Append the new formatted phrases to the intent's training_phrases list
-                if "training_phrases" in intent:
-                    intent["training_phrases"].extend(new_formatted_phrases)
-                else:
-                    intent["training_phrases"] = new_formatted_phrases
-            else:
-                logging.warning(f"Intent '{name}' has no 'training_phrases' key. Skipping enrichment for this intent.")
+        for _ in self.iter_enriched_intents(enriched_data, journal):
+            pass
 
         logging.info("Agent configuration enrichment complete.")
         return enriched_data
-
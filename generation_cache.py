@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class GenerationCache:
+    def __init__(self, path: str, max_entries: int = None, max_age_days: float = None):
+        """
+        Opens (or creates) a persistent SQLite cache of Gemini generations.
+        Entries are keyed by a hash of everything that goes into the prompt, so an
+        intent is only sent to Gemini again when one of those inputs changes.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_entries (int): Keep at most this many entries, evicting the least recently used.
+            max_age_days (float): Evict entries created more than this many days ago.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            " key TEXT PRIMARY KEY,"
+            " phrases TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used_at)")
+        self._conn.commit()
+        self.evict()
+        logging.info(f"Generation cache opened at '{path}'.")
+
+    @staticmethod
+    def make_key(model_name: str, intent_name: str, description: str, existing_phrases: list, phrases_to_generate: int) -> str:
+        """
+        Builds the content-addressed key for one generation request.
+
+        Args:
+            model_name (str): The Gemini model used.
+            intent_name (str): The display name of the intent.
+            description (str): The description of the intent.
+            existing_phrases (list): The existing phrases included in the prompt.
+            phrases_to_generate (int): Number of phrases requested.
+
+        Returns:
+            str: A hex SHA-256 digest.
+        """
+        payload = json.dumps([model_name, intent_name, description, list(existing_phrases), phrases_to_generate],
+                             ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list:
+        """
+        Looks up a cached generation.
+
+        Args:
+            key (str): Key built with make_key.
+
+        Returns:
+            list: The cached phrases, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT phrases FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE generations SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, phrases: list):
+        """
+        Stores a generation.
+
+        Args:
+            key (str): Key built with make_key.
+            phrases (list): The generated plain text phrases.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, phrases, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(phrases, ensure_ascii=False), now, now)
+            )
+            self._conn.commit()
+            self.stores += 1
+
+    def evict(self):
+        """Removes entries that are older than max_age_days or beyond max_entries (least recently used first)."""
+        with self._lock:
+            removed = 0
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += self._conn.execute("DELETE FROM generations WHERE created_at < ?", (cutoff,)).rowcount
+            if self.max_entries is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM generations WHERE key IN ("
+                    " SELECT key FROM generations ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+            self._conn.commit()
+            self.evictions += removed
+
+    def log_stats(self):
+        """Logs hit/miss counters for this run."""
+        lookups = self.hits + self.misses
+        hit_rate = (100.0 * self.hits / lookups) if lookups else 0.0
+        logging.info(f"Generation cache: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate), "
+                     f"{self.stores} stored, {self.evictions} evicted.")
+
+    def close(self):
+        """Applies eviction limits and closes the database."""
+        self.evict()
+        with self._lock:
+            self._conn.close()
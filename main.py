@@ -1,17 +1,34 @@
+"""
+Command line entry point.
+
+    python main.py validate [agent_config.yaml]   check the agent config offline
+    python main.py enrich                         generate training phrases with Gemini
+    python main.py deploy                         enrich (if enabled) and deploy (the default)
+    python main.py plan                           print what a deploy would change
+
+Only the standard library and PyYAML are imported here. The workflow modules are
+imported when a command needs them, and the Gemini and Dialogflow SDKs only when
+their clients are created, so `validate` starts instantly.
+"""
+import argparse
+import time
 import yaml
 import logging
-from gemini_enricher import GeminiEnricher
-from dialogflow_agent_manager import DialogflowAgentManager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+VALIDATE = "validate"
+ENRICH = "enrich"
+DEPLOY = "deploy"
+PLAN = "plan"
+
 def load_config(config_path: str) -> dict:
     """
     Loads the YAML configuration file.
-    
+
     Args:
         config_path (str): The path to the configuration file.
-        
+
     Returns:
         dict: The loaded configuration.
     """
@@ -32,75 +49,88 @@ def load_config(config_path: str) -> dict:
         logging.error(f"Configuration error: {e}")
         exit(1)
 
-def main():
-    config = load_config("config.yaml")
-
-    # Determine which agent config file to use
-    use_gemini_enrichment = config['gemini_enrichment']['enabled']
-    
-    if use_gemini_enrichment:
-        agent_config_file_path = config['agent_config']['enriched_file']
-        original_config_file_path = config['agent_config']['original_file']
-
-        logging.info(f"Gemini enrichment is ENABLED. Loading original config from '{original_config_file_path}' for enrichment.")
-        try:
-            with open(original_config_file_path, 'r') as f:
-                agent_config_data = yaml.safe_load(f)
-        except FileNotFoundError:
-            logging.error(f"Error: Original agent configuration file '{original_config_file_path}' not found.")
-            exit(1)
-        except yaml.YAMLError as e:
-            logging.error(f"Error parsing original agent configuration file '{original_config_file_path}': {e}")
-            exit(1)
-
-        # Initialize and run Gemini Enricher
-        gemini_api_key = config['gemini_enrichment']['api_key']
-        phrases_to_generate = config['gemini_enrichment']['phrases_to_generate']
-        
-        try:
-            enricher = GeminiEnricher(api_key=gemini_api_key, phrases_to_generate=phrases_to_generate)
-            enriched_agent_config_data = enricher.enrich_agent_config(agent_config_data)
-
-            # Save the enriched configuration to a new file
-            with open(agent_config_file_path, "w", encoding="utf-8") as f:
-                yaml.dump(enriched_agent_config_data, f, sort_keys=False, default_flow_style=False, allow_unicode=True, indent=2)
-            logging.info(f"Enriched configuration saved to '{agent_config_file_path}'")
-
-        except ValueError as e:
-            logging.error(f"Gemini enrichment setup error: {e}")
-            exit(1)
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during Gemini enrichment: {e}")
-            exit(1)
-            
-    else:
-        agent_config_file_path = config['agent_config']['original_file']
-        logging.info(f"Gemini enrichment is DISABLED. Using original config from '{agent_config_file_path}'.")
-        try:
-            with open(agent_config_file_path, 'r') as f:
-                agent_config_data = yaml.safe_load(f)
-        except FileNotFoundError:
-            logging.error(f"Error: Original agent configuration file '{agent_config_file_path}' not found.")
-            exit(1)
-        except yaml.YAMLError as e:
-            logging.error(f"Error parsing original agent configuration file '{agent_config_file_path}': {e}")
-            exit(1)
-
-    # Initialize and run Dialogflow Agent Manager
-    creds_path = config['dialogflow']['creds_path']
-    agent_path = config['dialogflow']['agent_path']
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """Parses command line arguments."""
+    parser = argparse.ArgumentParser(description="Enrich and deploy Dialogflow CX entities and intents from YAML.")
+    parser.add_argument("--config", default="config.yaml", help="Path to the project configuration file.")
+    parser.add_argument("--plan", action="store_true",
+                        help="Same as the 'plan' command.")
+    parser.add_argument("--build-package", action="store_true",
+                        help="Build and verify the agent package (see dialogflow.package) without restoring it. "
+                             "Skips Gemini enrichment like --plan.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume an interrupted enrichment run, reusing generations recorded in its journal.")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    validate = commands.add_parser(VALIDATE, help="Check an agent config offline (no SDKs, no API calls).")
+    validate.add_argument("agent_config", nargs="?",
+                          help="Agent config to check (default: agent_config.original_file of --config).")
+    validate.add_argument("--strict", action="store_true", help="Fail on warnings too.")
+
+    # Command options default to SUPPRESS so they don't overwrite the same options given before the command.
+    enrich = commands.add_parser(ENRICH, help="Generate training phrases with Gemini and write the enriched config, "
+                                              "without deploying.")
+    enrich.add_argument("--resume", action="store_true", default=argparse.SUPPRESS,
+                        help="Resume an interrupted enrichment run.")
+    deploy = commands.add_parser(DEPLOY, help="Enrich (if enabled) and deploy. The default when no command is given.")
+    deploy.add_argument("--resume", action="store_true", default=argparse.SUPPRESS,
+                        help="Resume an interrupted enrichment run.")
+    deploy.add_argument("--build-package", action="store_true", default=argparse.SUPPRESS,
+                        help="Build and verify the agent package without restoring it.")
+    commands.add_parser(PLAN, help="Print the create/update/delete plan against the live agent without changing it. "
+                                   "Skips Gemini enrichment and plans the last enriched config when enrichment is enabled.")
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args.command = PLAN if args.plan else DEPLOY
+    args.plan = args.command == PLAN
+    return args
+
+def run_validate(args: argparse.Namespace) -> int:
+    """
+    Validates an agent config and prints every issue.
+
+    Returns:
+        int: Exit code (1 if there are errors, or warnings with --strict).
+    """
+    from config_shards import load_agent_config_data
+    from config_validation import count_issues, validate_agent_config
 
+    path = args.agent_config or load_config(args.config)['agent_config']['original_file']
+    started = time.perf_counter()
     try:
-        agent_manager = DialogflowAgentManager(creds_path=creds_path, agent_path=agent_path)
-        
-        # Create entities first as intents might depend on them
-        agent_manager.create_entities(agent_config_data)
-        agent_manager.create_intents(agent_config_data)
-        
-    except Exception as e:
-        logging.error(f"An error occurred during Dialogflow agent management: {e}")
-        exit(1)
+        agent_config_data = load_agent_config_data(path)
+    except FileNotFoundError:
+        logging.error(f"Error: Agent configuration file '{path}' not found.")
+        return 1
+    except yaml.YAMLError as e:
+        logging.error(f"Error parsing agent configuration file '{path}': {e}")
+        return 1
+    issues = validate_agent_config(agent_config_data)
+    for issue in issues:
+        print(issue)
+    errors, warnings = count_issues(issues)
+    intents = len(agent_config_data.get("intents") or []) if isinstance(agent_config_data, dict) else 0
+    print(f"{path}: {intents} intents, {errors} error(s), {warnings} warning(s) "
+          f"({time.perf_counter() - started:.3f}s)")
+    return 1 if errors or (args.strict and warnings) else 0
+
+def main(argv: list = None):
+    args = parse_args(argv)
+    if args.command == VALIDATE:
+        exit(run_validate(args))
+
+    # Imported only now; the SDKs themselves are loaded when the first client is created.
+    from workflow import create_metrics, run_workflow, write_run_report
+    load_started = time.perf_counter()
+    config = load_config(args.config)
+    metrics = create_metrics(config)
+    metrics.record_stage("load_config", time.perf_counter() - load_started)
+    try:
+        run_workflow(args, config, metrics)
+    finally:
+        # Also runs when a stage fails (exit() raises SystemExit), so failed runs are reported too.
+        write_run_report(config, metrics)
 
 if __name__ == "__main__":
     main()
-
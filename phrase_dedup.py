@@ -0,0 +1,260 @@
+import hashlib
+import logging
+import re
+import struct
+from array import array
+from collections import Counter
+from operator import eq
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_SHINGLE_CACHE_SIZE = 200000
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+EXACT = "exact"
+NEAR = "near"
+
+
+def normalize_phrase(text: str) -> str:
+    """
+    Normalizes a phrase for duplicate detection: case-folded, punctuation removed,
+    whitespace collapsed.
+
+    Args:
+        text (str): The phrase.
+
+    Returns:
+        str: The normalized phrase.
+    """
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.casefold())).strip()
+
+
+class PhraseIndex:
+    def __init__(self, similarity_threshold: float = 0.8, num_perm: int = 32, bands: int = 8, shingle_size: int = 4,
+                 max_candidates: int = 16):
+        """
+        In-memory index of training phrases for duplicate lookups in sub-linear time.
+
+        Exact duplicates are found through a dict of normalized phrases. Near duplicates
+        are found with MinHash signatures over character shingles, bucketed by LSH bands:
+        only the phrases sharing the most bands with a query (at most `max_candidates`)
+        are compared, and a candidate counts as a duplicate when its estimated Jaccard
+        similarity reaches the threshold.
+
+        Each shingle is hashed once into `num_perm` independent 32-bit values (one
+        extendable-output digest); a signature is the column-wise minimum over the
+        phrase's shingles. Shingle hashes are memoized, since short phrases in one
+        agent share most of their shingles.
+
+        Args:
+            similarity_threshold (float): Estimated Jaccard similarity at or above which two phrases are near duplicates.
+            num_perm (int): Number of MinHash permutations (signature length).
+            bands (int): Number of LSH bands; num_perm must be divisible by it.
+            shingle_size (int): Length of the character shingles.
+            max_candidates (int): Maximum number of LSH candidates verified per lookup.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands.")
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+        self._unpack = struct.Struct(f"<{num_perm}I").unpack
+        self._shingle_hashes = {}
+        self._exact = {}         # normalized phrase -> phrase id
+        self._buckets = {}       # (band, band hash) -> [phrase ids]
+        self._signatures = []    # phrase id -> MinHash signature
+        self._owners = []        # phrase id -> owner (e.g. intent display name)
+        self._phrases = []       # phrase id -> original phrase
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def _signature(self, normalized: str) -> array:
+        padded = f" {normalized} "
+        size = self.shingle_size
+        shingles = {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+        cache = self._shingle_hashes
+        if len(cache) > _SHINGLE_CACHE_SIZE:
+            cache.clear()
+        rows = []
+        for shingle in shingles:
+            row = cache.get(shingle)
+            if row is None:
+                row = cache[shingle] = self._unpack(hashlib.shake_128(shingle.encode("utf-8")).digest(4 * self.num_perm))
+            rows.append(row)
+        return array("I", map(min, zip(*rows)))
+
+    def _band_keys(self, signature: array):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, hash(tuple(signature[band * rows:(band + 1) * rows]))
+
+    def _similarity(self, first: array, second: array) -> float:
+        return sum(map(eq, first, second)) / self.num_perm
+
+    def find_duplicate(self, phrase: str, normalized: str = None, signature: array = None):
+        """
+        Looks for a phrase in the index that duplicates `phrase`.
+
+        Args:
+            phrase (str): The phrase to check.
+            normalized (str): Precomputed normalize_phrase(phrase), optional.
+            signature (array): Precomputed MinHash signature, optional.
+
+        Returns:
+            tuple: (kind, owner, matched phrase, similarity) with kind 'exact' or 'near', or None.
+        """
+        normalized = normalized if normalized is not None else normalize_phrase(phrase)
+        phrase_id = self._exact.get(normalized)
+        if phrase_id is not None:
+            return EXACT, self._owners[phrase_id], self._phrases[phrase_id], 1.0
+
+        signature = signature if signature is not None else self._signature(normalized)
+        collisions = Counter()
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                collisions.update(bucket)
+        best_id, best_similarity = None, 0.0
+        for candidate, _ in collisions.most_common(self.max_candidates):
+            similarity = self._similarity(signature, self._signatures[candidate])
+            if similarity > best_similarity:
+                best_id, best_similarity = candidate, similarity
+        if best_id is not None and best_similarity >= self.similarity_threshold:
+            return NEAR, self._owners[best_id], self._phrases[best_id], best_similarity
+        return None
+
+    def add(self, phrase: str, owner: str, normalized: str = None, signature: array = None):
+        """
+        Adds a phrase to the index.
+
+        Args:
+            phrase (str): The phrase.
+            owner (str): Who the phrase belongs to (e.g. the intent's display name).
+            normalized (str): Precomputed normalize_phrase(phrase), optional.
+            signature (array): Precomputed MinHash signature, optional.
+        """
+        normalized = normalized if normalized is not None else normalize_phrase(phrase)
+        signature = signature if signature is not None else self._signature(normalized)
+        phrase_id = len(self._owners)
+        self._owners.append(owner)
+        self._phrases.append(phrase)
+        self._signatures.append(signature)
+        self._exact.setdefault(normalized, phrase_id)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(phrase_id)
+
+    def check_and_add(self, phrase: str, owner: str):
+        """
+        Checks a phrase for duplicates and adds it to the index if it has none.
+
+        Args:
+            phrase (str): The phrase to check.
+            owner (str): Who the phrase belongs to.
+
+        Returns:
+            tuple: The duplicate found (see find_duplicate), or None if the phrase was added.
+        """
+        normalized = normalize_phrase(phrase)
+        signature = self._signature(normalized)
+        duplicate = self.find_duplicate(phrase, normalized, signature)
+        if duplicate is None:
+            self.add(phrase, owner, normalized, signature)
+        return duplicate
+
+
+class PhraseDeduplicator:
+    def __init__(self, similarity_threshold: float = 0.8, action: str = "drop", rerequest: bool = False,
+                 max_rerequests: int = 1, index: PhraseIndex = None):
+        """
+        Filters generated training phrases against every phrase already in the agent
+        (existing ones and previously accepted generations), and keeps per-intent stats.
+
+        Args:
+            similarity_threshold (float): Estimated Jaccard similarity for near duplicates.
+            action (str): 'drop' removes duplicates; 'flag' keeps them and logs a warning.
+            rerequest (bool): Ask Gemini again for as many phrases as were dropped.
+            max_rerequests (int): Maximum number of re-requests per intent.
+            index (PhraseIndex): Optional pre-built index; one is created from similarity_threshold otherwise.
+        """
+        if action not in ("drop", "flag"):
+            raise ValueError("action must be 'drop' or 'flag'.")
+        self.action = action
+        self.rerequest = rerequest and action == "drop"
+        self.max_rerequests = max_rerequests
+        self.index = index or PhraseIndex(similarity_threshold=similarity_threshold)
+        self.stats = {}
+
+    def add_existing(self, owner: str, phrases: list):
+        """
+        Indexes phrases that are already part of the agent.
+
+        Args:
+            owner (str): The intent's display name.
+            phrases (list): Plain text phrases.
+        """
+        for phrase in phrases:
+            self.index.add(phrase, owner)
+
+    def filter(self, owner: str, phrases: list) -> list:
+        """
+        Checks generated phrases one by one; accepted phrases are indexed, so later
+        phrases (of this or any other intent) are also checked against them.
+
+        Args:
+            owner (str): The intent's display name.
+            phrases (list): Generated plain text phrases.
+
+        Returns:
+            list: The phrases to keep.
+        """
+        stats = self.stats.setdefault(owner, {"generated": 0, EXACT: 0, NEAR: 0, "cross_intent": 0,
+                                              "kept": 0, "rerequested": 0})
+        kept = []
+        for phrase in phrases:
+            stats["generated"] += 1
+            duplicate = self.index.check_and_add(phrase, owner)
+            if duplicate is None:
+                kept.append(phrase)
+                continue
+            kind, matched_owner, matched_phrase, similarity = duplicate
+            stats[kind] += 1
+            if matched_owner != owner:
+                stats["cross_intent"] += 1
+            if self.action == "flag":
+                logging.warning(f"⚠️ '{owner}': '{phrase}' duplicates '{matched_phrase}' in '{matched_owner}' "
+                                f"({kind}, similarity {similarity:.2f}).")
+                kept.append(phrase)
+        stats["kept"] += len(kept)
+        return kept
+
+    def record_rerequest(self, owner: str, count: int):
+        """Records that `count` phrases were requested again for an intent."""
+        self.stats[owner]["rerequested"] += count
+
+    def log_intent(self, owner: str):
+        """Logs the dedup rate of one intent."""
+        stats = self.stats.get(owner)
+        if not stats or not stats["generated"]:
+            return
+        duplicates = stats[EXACT] + stats[NEAR]
+        verb = "flagged" if self.action == "flag" else "dropped"
+        message = (f"🧹 Dedup for '{owner}': {stats['generated']} generated, {stats[EXACT]} exact and "
+                   f"{stats[NEAR]} near duplicate(s) {verb} ({duplicates / stats['generated']:.0%}, "
+                   f"{stats['cross_intent']} matching other intents)")
+        if stats["rerequested"]:
+            message += f", {stats['rerequested']} re-requested"
+        logging.info(message + ".")
+
+    def log_summary(self):
+        """Logs dedup totals over all intents."""
+        generated = sum(stats["generated"] for stats in self.stats.values())
+        if not generated:
+            return
+        duplicates = sum(stats[EXACT] + stats[NEAR] for stats in self.stats.values())
+        logging.info(f"🧹 Dedup summary: {duplicates} of {generated} generated phrases were duplicates "
+                     f"({duplicates / generated:.1%}) across {len(self.stats)} intent(s); {len(self.index)} phrases indexed.")
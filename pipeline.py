@@ -0,0 +1,69 @@
+import logging
+import queue
+import threading
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+_END_OF_STREAM = object()
+
+
+class _ProducerError:
+    def __init__(self, error: Exception):
+        """Ends the intent stream by re-raising the producer's exception in the consumer."""
+        self.error = error
+
+
+def run_enrich_deploy_pipeline(enricher, scheduler, config_data: dict, writer, queue_size: int = 16, synchronizer=None,
+                               journal=None):
+    """
+    Enriches and deploys intents at the same time. A producer thread pulls enriched
+    intents from GeminiEnricher.iter_enriched_intents, appends each to the enriched
+    YAML and hands it to the deployer through a bounded queue. The deployer creates
+    entity types right away (enrichment never changes them) and pushes each intent
+    as soon as it arrives, so end-to-end time approaches max(enrich, deploy).
+
+    Args:
+        enricher (GeminiEnricher): The enricher.
+        scheduler (DeploymentScheduler): The deployment scheduler.
+        config_data (dict): The original agent configuration (intents are enriched in place).
+        writer (IncrementalConfigWriter): Writer for the enriched configuration file.
+        queue_size (int): Maximum number of enriched intents waiting to be deployed.
+        synchronizer (AgentSynchronizer): Optional synchronizer for sync-mode deployment.
+        journal (EnrichmentJournal): Optional checkpoint journal passed to the enricher.
+
+    Returns:
+        DeploymentSummary: Outcomes of all deployed items.
+
+    Raises:
+        Exception: The enricher's error, once the intents received before it are deployed.
+            Nothing is pruned in that case.
+    """
+    intent_queue = queue.Queue(maxsize=queue_size)
+
+    def produce():
+        try:
+            for intent in enricher.iter_enriched_intents(config_data, journal):
+                writer.write_intent(intent)
+                intent_queue.put(intent)
+        except Exception as e:
+            intent_queue.put(_ProducerError(e))
+            return
+        intent_queue.put(_END_OF_STREAM)
+
+    def consume():
+        # A producer error must fail the stream rather than end it: a stream that looks
+        # complete would let a sync deploy prune the intents that were never enriched.
+        while True:
+            intent = intent_queue.get()
+            if intent is _END_OF_STREAM:
+                return
+            if isinstance(intent, _ProducerError):
+                raise intent.error
+            yield intent
+
+    producer = threading.Thread(target=produce, name="enrich-producer", daemon=True)
+    producer.start()
+    summary = scheduler.deploy_stream(config_data.get("entities", []), consume(), synchronizer)
+    producer.join()
+    logging.info("Enrich/deploy pipeline complete.")
+    return summary
@@ -0,0 +1,159 @@
+import logging
+import random
+import threading
+import time
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# HTTP status codes and gRPC status names that are worth retrying.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_STATUS_NAMES = ("RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initializes a thread-safe token bucket.
+
+        Args:
+            rate_per_second (float): Tokens added to the bucket per second.
+            capacity (float): Maximum number of tokens the bucket can hold. Defaults to one second's worth.
+            clock (callable): Monotonic clock, injectable for tests.
+            sleep (callable): Sleep function, injectable for tests.
+        """
+        if rate_per_second <= 0:
+            raise ValueError("Token bucket rate must be positive.")
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_second)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Blocks until `amount` tokens are available and takes them.
+        Requests larger than the capacity are clamped to the capacity.
+
+        Args:
+            amount (float): Number of tokens to take.
+
+        Returns:
+            float: Total seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate_per_second
+            self._sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initializes a combined requests-per-minute / tokens-per-minute limiter.
+        Either limit can be left as None to disable it.
+
+        Args:
+            requests_per_minute (float): Maximum requests per minute.
+            tokens_per_minute (float): Maximum (estimated) tokens per minute.
+            clock (callable): Monotonic clock, injectable for tests.
+            sleep (callable): Sleep function, injectable for tests.
+        """
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, requests_per_minute, clock, sleep) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute, clock, sleep) if tokens_per_minute else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until one request carrying `tokens` tokens may be sent.
+
+        Args:
+            tokens (int): Estimated token count of the request.
+
+        Returns:
+            float: Total seconds spent waiting.
+        """
+        waited = 0.0
+        if self.request_bucket:
+            waited += self.request_bucket.acquire(1)
+        if self.token_bucket and tokens:
+            waited += self.token_bucket.acquire(tokens)
+        return waited
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for rate limiting."""
+    return max(1, len(text) // 4)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Checks whether an API error is transient (rate limiting or server side). Only the
+    status is looked at (the error's code, its StatusCode name or the numeric status the
+    message starts with), never the rest of the message, which may quote user content.
+
+    Args:
+        error (Exception): The raised exception.
+
+    Returns:
+        bool: True if the call should be retried.
+    """
+    code = getattr(error, "code", None)
+    if callable(code):
+        # gRPC errors expose code() returning a StatusCode enum.
+        try:
+            code = code()
+        except Exception:
+            code = None
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    name = getattr(code, "name", None)
+    if name and name.upper() in RETRYABLE_STATUS_NAMES:
+        return True
+    # google.api_core exceptions render as e.g. "429 Resource has been exhausted".
+    message = str(error)
+    return message[:3].isdigit() and int(message[:3]) in RETRYABLE_STATUS_CODES
+
+
+def call_with_retries(func, *args, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                      retryable=is_retryable_error, description: str = "API call", sleep=time.sleep,
+                      on_retry=None, **kwargs):
+    """
+    Calls `func`, retrying transient errors with full-jitter exponential backoff.
+
+    Args:
+        func (callable): The function to call.
+        max_retries (int): Retries after the first attempt before giving up.
+        base_delay (float): Backoff delay of the first retry in seconds.
+        max_delay (float): Upper bound of a single backoff delay in seconds.
+        retryable (callable): Predicate deciding whether an exception is retryable.
+        description (str): Label used in log messages.
+        sleep (callable): Sleep function, injectable for tests.
+        on_retry (callable): Optional callback receiving the exception before each retry (e.g. for metrics).
+
+    Returns:
+        The return value of `func`. Non-retryable errors, and the last retryable
+        error once retries are exhausted, are re-raised.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= max_retries or not retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            attempt += 1
+            if on_retry is not None:
+                on_retry(e)
+            logging.warning(f"Transient error on {description} (attempt {attempt}/{max_retries}): {e}. Retrying in {delay:.2f}s.")
+            sleep(delay)
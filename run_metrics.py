@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = "dfcx_intent_manager"
+
+SUCCESS = "success"
+SKIPPED = "skipped"
+ERROR = "error"
+
+_NO_STAGE = nullcontext()
+
+
+class _CallStats:
+    def __init__(self):
+        self.outcomes = {}
+        self.retries = 0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def observe(self, seconds: float):
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_count += 1
+        self.latency_sum += seconds
+        self.latency_max = max(self.latency_max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the max for the unbounded bucket)."""
+        target = q * self.latency_count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS + (self.latency_max,), self.bucket_counts):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.latency_max)
+        return self.latency_max
+
+    def to_dict(self) -> dict:
+        latency = {"count": self.latency_count, "sum_seconds": round(self.latency_sum, 6)}
+        if self.latency_count:
+            latency.update(mean_seconds=round(self.latency_sum / self.latency_count, 6),
+                           max_seconds=round(self.latency_max, 6),
+                           p50_seconds=round(self.quantile(0.5), 6), p90_seconds=round(self.quantile(0.9), 6),
+                           p99_seconds=round(self.quantile(0.99), 6))
+        return {"outcomes": dict(self.outcomes), "retries": self.retries, "latency": latency}
+
+
+class RunMetrics:
+    def __init__(self, enabled: bool = True):
+        """
+        Collects per-run timings and API call statistics. Safe to use from several threads.
+
+        Stage timers accumulate: entering the same stage several times adds up its
+        durations and counts the entries. Calls are keyed by type (e.g.
+        'dialogflow.create_intent', 'gemini.generate_content'); each attempt's latency
+        goes into a histogram, and each finished call is counted as success, skipped or error.
+
+        Args:
+            enabled (bool): When False every method returns immediately, so instrumented
+                code pays almost nothing.
+        """
+        self.enabled = enabled
+        self.started_at = time.time()
+        self.stages = {}
+        self.calls = {}
+        self.tokens = {"prompt": 0, "output": 0}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """
+        Times a stage of the run.
+
+        Args:
+            name (str): Stage name (e.g. 'load_config', 'enrichment', 'deploy').
+
+        Returns:
+            A context manager.
+        """
+        if not self.enabled:
+            return _NO_STAGE
+        return self._timed_stage(name)
+
+    @contextmanager
+    def _timed_stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name: str, seconds: float):
+        """Adds a stage duration measured elsewhere (e.g. before the metrics existed)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "count": 0})
+            stage["seconds"] += seconds
+            stage["count"] += 1
+
+    def _call_stats(self, call: str) -> _CallStats:
+        stats = self.calls.get(call)
+        if stats is None:
+            stats = self.calls[call] = _CallStats()
+        return stats
+
+    def observe_latency(self, call: str, seconds: float):
+        """Records the latency of one attempt of a call."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._call_stats(call).observe(seconds)
+
+    def record_outcome(self, call: str, outcome: str):
+        """Counts a finished call as 'success', 'skipped' or 'error'."""
+        if not self.enabled:
+            return
+        with self._lock:
+            outcomes = self._call_stats(call).outcomes
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def record_retry(self, call: str):
+        """Counts one retry of a call."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._call_stats(call).retries += 1
+
+    def record_tokens(self, prompt_tokens: int = 0, output_tokens: int = 0):
+        """Adds prompt and response token counts."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.tokens["prompt"] += prompt_tokens
+            self.tokens["output"] += output_tokens
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: The run report (stages, calls, tokens).
+        """
+        with self._lock:
+            finished_at = time.time()
+            return {
+                "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+                "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(finished_at)),
+                "wall_seconds": round(finished_at - self.started_at, 3),
+                "stages": {name: {"seconds": round(stage["seconds"], 6), "count": stage["count"]}
+                           for name, stage in self.stages.items()},
+                "calls": {call: stats.to_dict() for call, stats in sorted(self.calls.items())},
+                "tokens": dict(self.tokens),
+            }
+
+    def write_json(self, path: str):
+        """Writes the run report as JSON."""
+        if not self.enabled:
+            return
+        _write_atomically(path, json.dumps(self.report(), indent=2) + "\n")
+        logging.info(f"📈 Run report written to '{path}'.")
+
+    def write_prometheus(self, path: str):
+        """
+        Writes the metrics in the Prometheus text exposition format, e.g. for the
+        node_exporter textfile collector. The file is replaced atomically.
+        """
+        if not self.enabled:
+            return
+        p = PROMETHEUS_PREFIX
+        lines = [f"# TYPE {p}_stage_seconds gauge"]
+        with self._lock:
+            for name, stage in self.stages.items():
+                lines.append(f'{p}_stage_seconds{{stage="{name}"}} {stage["seconds"]:.6f}')
+            lines.append(f"# TYPE {p}_calls_total counter")
+            for call, stats in sorted(self.calls.items()):
+                for outcome, count in sorted(stats.outcomes.items()):
+                    lines.append(f'{p}_calls_total{{call="{call}",outcome="{outcome}"}} {count}')
+            lines.append(f"# TYPE {p}_call_retries_total counter")
+            for call, stats in sorted(self.calls.items()):
+                lines.append(f'{p}_call_retries_total{{call="{call}"}} {stats.retries}')
+            lines.append(f"# TYPE {p}_call_latency_seconds histogram")
+            for call, stats in sorted(self.calls.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), stats.bucket_counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{p}_call_latency_seconds_bucket{{call="{call}",le="{le}"}} {cumulative}')
+                lines.append(f'{p}_call_latency_seconds_sum{{call="{call}"}} {stats.latency_sum:.6f}')
+                lines.append(f'{p}_call_latency_seconds_count{{call="{call}"}} {stats.latency_count}')
+            lines.append(f"# TYPE {p}_tokens_total counter")
+            for kind, count in self.tokens.items():
+                lines.append(f'{p}_tokens_total{{kind="{kind}"}} {count}')
+        _write_atomically(path, "\n".join(lines) + "\n")
+        logging.info(f"📈 Prometheus metrics written to '{path}'.")
+
+
+def _write_atomically(path: str, text: str):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temporary_path, path)
+
+
+# Shared instance for components created without metrics.
+NO_METRICS = RunMetrics(enabled=False)
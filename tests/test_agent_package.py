@@ -0,0 +1,50 @@
+import os
+import sys
+import zipfile
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent_package import AgentPackageBuilder, diff_agent_configs, read_agent_package
+from agent_sync import AgentSynchronizer
+from benchmarks.fakes import FakeEntityTypesClient, FakeIntentsClient
+from dialogflow_agent_manager import DialogflowAgentManager
+
+
+def make_manager():
+    intents_client = FakeIntentsClient()
+    return DialogflowAgentManager(None, intents_client.agent_id, intents_client=intents_client,
+                                  entities_client=FakeEntityTypesClient())
+
+
+def intent(display_name, *phrases):
+    return {"display_name": display_name, "training_phrases": list(phrases)}
+
+
+def test_package_round_trips_sample_config(tmp_path):
+    with open(os.path.join(ROOT, "agent_config_params.yaml"), encoding="utf-8") as f:
+        config_data = yaml.safe_load(f)
+    manager = make_manager()
+    path = str(tmp_path / "agent.zip")
+
+    AgentPackageBuilder(manager).build(path, config_data["entities"], config_data["intents"])
+
+    actual = read_agent_package(path)
+    assert diff_agent_configs(config_data, actual, AgentSynchronizer(manager)) == []
+
+
+def test_base_resource_with_colliding_directory_is_kept(tmp_path):
+    manager = make_manager()
+    base = str(tmp_path / "base.zip")
+    path = str(tmp_path / "agent.zip")
+    AgentPackageBuilder(manager).build(base, [], [intent("a/b", "from base"), intent("a_b_2", "other")])
+
+    AgentPackageBuilder(manager).build(path, [], [intent("a_b", "from yaml")], base_package=base)
+
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+    assert {"intents/a_b/a_b.json", "intents/a_b_2/a_b_2.json", "intents/a_b_3/a_b_3.json"} <= names
+    phrases = {i["display_name"]: i["training_phrases"] for i in read_agent_package(path)["intents"]}
+    assert phrases == {"a_b": ["from yaml"], "a/b": ["from base"], "a_b_2": ["other"]}
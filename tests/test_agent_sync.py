@@ -0,0 +1,74 @@
+import copy
+import os
+import sys
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent_sync import DELETE, UNCHANGED, UPDATE, AgentSynchronizer
+from benchmarks.fakes import FakeEntityTypesClient, FakeIntentsClient
+from dialogflow_agent_manager import DialogflowAgentManager
+
+
+def load_sample_config():
+    with open(os.path.join(ROOT, "agent_config_params.yaml"), encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def deployed_agent(config_data, **intents_kwargs):
+    """Returns a manager for a fake agent holding config_data, as after a first deploy."""
+    intents_client = FakeIntentsClient(**intents_kwargs)
+    entities_client = FakeEntityTypesClient()
+    manager = DialogflowAgentManager(None, intents_client.agent_id, intents_client=intents_client,
+                                     entities_client=entities_client)
+    manager.create_entities(config_data)
+    for intent_data in config_data["intents"]:
+        manager.create_intent(intent_data)
+    return manager, intents_client
+
+
+def test_unchanged_agent_plans_no_changes():
+    config_data = load_sample_config()
+    manager, _ = deployed_agent(config_data)
+
+    plan = AgentSynchronizer(manager).build_plan(config_data)
+
+    assert [(item.display_name, item.action) for item in plan.intents + plan.entity_types
+            if item.action != UNCHANGED] == []
+    assert not plan.has_changes()
+
+
+def test_changed_field_updates_only_that_field():
+    config_data = load_sample_config()
+    manager, intents_client = deployed_agent(config_data)
+    changed = copy.deepcopy(config_data)
+    changed["intents"][0]["description"] = "A new description."
+    name = changed["intents"][0]["display_name"]
+
+    synchronizer = AgentSynchronizer(manager)
+    plan = synchronizer.build_plan(changed)
+    updates = [item for item in plan.intents + plan.entity_types if item.action != UNCHANGED]
+    synchronizer.apply(plan)
+
+    assert [(item.display_name, item.action, item.fields) for item in updates] == [(name, UPDATE, ["description"])]
+    assert intents_client.updates == [(name, ["description"])]
+
+
+def test_prune_never_deletes_the_default_intents():
+    config_data = load_sample_config()
+    manager, intents_client = deployed_agent(config_data, default_intents=True)
+    kept = {"entities": config_data["entities"], "intents": config_data["intents"][1:]}
+
+    synchronizer = AgentSynchronizer(manager, prune=True)
+    plan = synchronizer.build_plan(kept)
+    synchronizer.apply(plan)
+
+    assert [item.display_name for item in plan.intents if item.action == DELETE] == \
+        [config_data["intents"][0]["display_name"]]
+    assert intents_client.stats.calls["delete_intent"] == 1
+    # Even with nothing in the YAML, only the non-default intents go.
+    empty_plan = AgentSynchronizer(manager, prune=True).build_plan({"entities": [], "intents": []})
+    deleted = {item.display_name for item in empty_plan.intents if item.action == DELETE}
+    assert deleted == {intent["display_name"] for intent in config_data["intents"]}
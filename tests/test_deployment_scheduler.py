@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeEntityTypesClient, FakeIntentsClient
+from deployment_scheduler import DeploymentScheduler
+from dialogflow_agent_manager import DialogflowAgentManager
+
+ENTITY = {"display_name": "fruit", "kind": "KIND_MAP", "entries": [{"value": "apple", "synonyms": ["apple"]}]}
+
+
+class RecordingEntityTypesClient(FakeEntityTypesClient):
+    def __init__(self, events, create_latency=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+        self.create_latency = create_latency
+
+    def create_entity_type(self, *args, **kwargs):
+        # Only creation is slow, so listing (entity type resolution) does not hide a missing wait.
+        time.sleep(self.create_latency)
+        result = super().create_entity_type(*args, **kwargs)
+        self.events.append(("entity type done", kwargs["display_name"]))
+        return result
+
+
+class RecordingIntentsClient(FakeIntentsClient):
+    def __init__(self, events, **kwargs):
+        super().__init__(**kwargs)
+        self.events = events
+
+    def create_intent(self, *args, **kwargs):
+        self.events.append(("intent started", kwargs["display_name"]))
+        return super().create_intent(*args, **kwargs)
+
+
+def make_manager(entities_client, intents_client):
+    return DialogflowAgentManager(None, intents_client.agent_id, intents_client=intents_client,
+                                  entities_client=entities_client, intents_service=intents_client,
+                                  entity_types_service=entities_client)
+
+
+def intent(name, entity_type=None):
+    parameters = [{"id": "fruit", "entity_type_display_name": entity_type}] if entity_type else []
+    return {"display_name": name, "training_phrases": [f"{name} apple"], "parameters": parameters}
+
+
+def test_intent_waits_for_the_entity_types_it_references():
+    events = []
+    manager = make_manager(RecordingEntityTypesClient(events, create_latency=0.1), RecordingIntentsClient(events))
+
+    summary = DeploymentScheduler(manager, max_workers=4).deploy(
+        {"entities": [ENTITY], "intents": [intent("order", "fruit"), intent("greeting")]})
+
+    assert events.index(("entity type done", "fruit")) < events.index(("intent started", "order"))
+    # Intents without custom entity types do not wait.
+    assert events.index(("intent started", "greeting")) < events.index(("entity type done", "fruit"))
+    assert summary.failed() == []
+
+
+def test_failing_task_is_recorded_and_the_run_continues():
+    intents_client = FakeIntentsClient()
+    manager = make_manager(FakeEntityTypesClient(), intents_client)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    tasks = [("broken", set(), fail)] + [(name, set(), lambda name=name: manager.create_intent(intent(name)))
+                                         for name in ("a", "b")]
+    summary = DeploymentScheduler(manager, max_workers=2).run([], tasks)
+
+    assert summary.outcomes["intent"] == {"broken": "error", "a": "created", "b": "created"}
+    assert summary.errors[("intent", "broken")] == "boom"
+
+
+def test_stream_error_is_raised_after_submitted_tasks_finish():
+    intents_client = FakeIntentsClient()
+    manager = make_manager(FakeEntityTypesClient(latency=0.1), intents_client)
+
+    def intents():
+        # Both wait on the entity type, so they are submitted only after the stream has failed.
+        yield intent("a", "fruit")
+        yield intent("b", "fruit")
+        raise RuntimeError("stream failed")
+
+    with pytest.raises(RuntimeError, match="stream failed"):
+        DeploymentScheduler(manager, max_workers=2).deploy_stream([ENTITY], intents())
+
+    assert sorted(resource.display_name for resource in intents_client.list_intents()) == ["a", "b"]
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_sync import AgentSynchronizer
+from benchmarks.fakes import FakeEntityTypesClient, FakeIntentsClient
+from deployment_scheduler import DeploymentScheduler
+from dialogflow_agent_manager import DialogflowAgentManager
+from pipeline import run_enrich_deploy_pipeline
+
+
+class FailingEnricher:
+    """Yields the first intent unchanged, then fails as a Gemini error would."""
+
+    def iter_enriched_intents(self, config_data, journal=None):
+        yield config_data["intents"][0]
+        raise RuntimeError("enrichment failed")
+
+
+class ListWriter:
+    def __init__(self):
+        self.intents = []
+
+    def write_intent(self, intent):
+        self.intents.append(intent)
+
+
+def test_sync_pipeline_does_not_prune_when_enrichment_fails():
+    entities_client = FakeEntityTypesClient()
+    intents_client = FakeIntentsClient(existing=["a", "b", "c"])
+    manager = DialogflowAgentManager(None, intents_client.agent_id, intents_client=intents_client,
+                                     entities_client=entities_client, intents_service=intents_client,
+                                     entity_types_service=entities_client)
+    config_data = {"entities": [], "intents": [{"display_name": name, "training_phrases": [f"phrase {name}"]}
+                                               for name in ("a", "b", "c")]}
+    writer = ListWriter()
+
+    with pytest.raises(RuntimeError, match="enrichment failed"):
+        run_enrich_deploy_pipeline(FailingEnricher(), DeploymentScheduler(manager, max_workers=2), config_data, writer,
+                                   synchronizer=AgentSynchronizer(manager, prune=True))
+
+    assert [intent["display_name"] for intent in writer.intents] == ["a"]
+    assert intents_client.stats.calls["update_intent"] == 1
+    assert intents_client.stats.calls["delete_intent"] == 0
@@ -0,0 +1,61 @@
+import enum
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeServiceError
+from rate_limiter import call_with_retries, is_retryable_error
+
+
+class StatusCode(enum.Enum):
+    INVALID_ARGUMENT = 3
+    UNAVAILABLE = 14
+
+
+class GrpcError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self._status = status
+
+    def code(self):
+        return self._status
+
+
+def failing(error, calls):
+    def call():
+        calls.append(1)
+        raise error
+    return call
+
+
+def test_bad_request_mentioning_internal_is_not_retried():
+    error = FakeServiceError("400 Invalid argument: display name 'internal_faq' is UNAVAILABLE for this agent.")
+    calls = []
+
+    assert not is_retryable_error(error)
+    with pytest.raises(FakeServiceError):
+        call_with_retries(failing(error, calls), max_retries=3, sleep=lambda _: None)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (FakeServiceError("503 UNAVAILABLE: injected transient error"), True),
+    (FakeServiceError("429 RESOURCE_EXHAUSTED: Quota exceeded for requests per second."), True),
+    (GrpcError(StatusCode.UNAVAILABLE, "connection reset"), True),
+    (GrpcError(StatusCode.INVALID_ARGUMENT, "INTERNAL error in display name 'internal_faq'"), False),
+    (ValueError("RESOURCE_EXHAUSTED appears in the text only"), False),
+])
+def test_classifies_by_status_only(error, retryable):
+    assert is_retryable_error(error) is retryable
+
+
+def test_transient_errors_are_retried():
+    calls = []
+
+    with pytest.raises(FakeServiceError):
+        call_with_retries(failing(FakeServiceError("503 UNAVAILABLE: injected transient error"), calls),
+                          max_retries=2, sleep=lambda _: None)
+    assert len(calls) == 3
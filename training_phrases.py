@@ -0,0 +1,235 @@
+"""
+Training phrase parsing and the compiled phrase model shared by GeminiEnricher,
+DialogflowAgentManager and AgentSynchronizer.
+
+A YAML training phrase is a plain string, a plain string with bracket annotations
+("Tell me about my order [XYZ000]{@order-id}") or a mapping with 'text_parts' (and an
+optional 'repeat_count'). PhraseCompiler parses an intent's phrases once into compact
+TrainingPhrase objects and memoizes the result by content hash, so the same phrases
+are never parsed or formatted twice.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+# '[annotated text]{@parameter-id}' (the '@' is optional), e.g. "Tell me about my order [XYZ000]{@order-id}".
+ANNOTATION_PATTERN = re.compile(r"\[([^\[\]{}]*)\]\{@?([^{}\[\]\s]*)\}")
+_ANNOTATION_CHARS = re.compile(r"[{}]|\]\s*\{")
+
+
+class AnnotationError(ValueError):
+    """Raised for a malformed bracket annotation in a training phrase."""
+
+
+def has_annotations(text: str) -> bool:
+    """
+    Returns whether a plain string phrase uses the bracket annotation syntax. Braces do not
+    occur in natural training phrases, so any '{' or '}' marks the phrase as annotated;
+    square brackets alone are ordinary text.
+    """
+    return "{" in text or "}" in text
+
+
+def parse_annotations(text: str) -> list:
+    """
+    Splits a bracket-annotated phrase into Dialogflow CX training phrase parts.
+
+    Args:
+        text (str): e.g. "Tell me about my order [XYZ000]{@order-id}".
+
+    Returns:
+        list: Parts like [{'text': 'Tell me about my order '}, {'text': 'XYZ000', 'parameter_id': 'order-id'}].
+
+    Raises:
+        AnnotationError: If an annotation is malformed (unbalanced brackets or braces,
+            empty text or parameter id).
+    """
+    parts = []
+    position = 0
+    for match in ANNOTATION_PATTERN.finditer(text):
+        value, parameter_id = match.groups()
+        if not value.strip():
+            raise AnnotationError(f"empty annotated text in '{match.group(0)}'")
+        if not parameter_id:
+            raise AnnotationError(f"missing parameter id in '{match.group(0)}'")
+        if match.start() > position:
+            parts.append({"text": text[position:match.start()]})
+        parts.append({"text": value, "parameter_id": parameter_id})
+        position = match.end()
+    if position < len(text):
+        parts.append({"text": text[position:]})
+    for part in parts:
+        if "parameter_id" not in part:
+            stray = _ANNOTATION_CHARS.search(part["text"])
+            if stray:
+                raise AnnotationError(f"malformed annotation near '{part['text'][max(0, stray.start() - 15):stray.end() + 15]}'")
+    return parts
+
+
+class PhrasePart:
+    """One part of a training phrase; parameter_id is None for plain text."""
+    __slots__ = ("text", "parameter_id")
+
+    def __init__(self, text: str, parameter_id: str = None):
+        self.text = text
+        self.parameter_id = parameter_id
+
+    def to_payload(self) -> dict:
+        """Returns the part as a Dialogflow CX training phrase part dictionary."""
+        if self.parameter_id:
+            return {"text": self.text, "parameter_id": self.parameter_id}
+        return {"text": self.text}
+
+
+class TrainingPhrase:
+    """A parsed training phrase: a tuple of PhraseParts and a repeat count."""
+    __slots__ = ("parts", "repeat_count")
+
+    def __init__(self, parts: tuple, repeat_count: int = 1):
+        self.parts = parts
+        self.repeat_count = repeat_count
+
+    @property
+    def text(self) -> str:
+        """The phrase as plain text, without annotations."""
+        return "".join(part.text for part in self.parts)
+
+    @property
+    def key(self) -> tuple:
+        """Comparable form used by AgentSynchronizer: ((text, parameter id or ''), ...), repeat count >= 1."""
+        return tuple((part.text, part.parameter_id or "") for part in self.parts), max(1, self.repeat_count or 1)
+
+    def to_payload(self) -> dict:
+        """Returns the phrase as a Dialogflow CX training phrase dictionary ('parts', 'repeat_count')."""
+        # PhrasePart.to_payload inlined: this runs once per phrase of every formatted intent.
+        return {"parts": [{"text": part.text, "parameter_id": part.parameter_id} if part.parameter_id
+                          else {"text": part.text} for part in self.parts],
+                "repeat_count": self.repeat_count}
+
+
+def compile_phrase(item) -> TrainingPhrase:
+    """
+    Parses one YAML training phrase.
+
+    Args:
+        item: A string (optionally with bracket annotations) or a mapping with 'text_parts'.
+
+    Returns:
+        TrainingPhrase
+
+    Raises:
+        AnnotationError: If a bracket annotation is malformed.
+        ValueError: If the phrase is neither a string nor a mapping with well-formed 'text_parts'.
+    """
+    if isinstance(item, str):
+        if not has_annotations(item):
+            return TrainingPhrase((PhrasePart(item),))
+        return TrainingPhrase(tuple(PhrasePart(part["text"], part.get("parameter_id"))
+                                    for part in parse_annotations(item)))
+    if isinstance(item, dict) and "text_parts" in item:
+        parts = item["text_parts"]
+        if not isinstance(parts, list) or not parts or \
+                not all(isinstance(part, dict) and isinstance(part.get("text"), str) for part in parts):
+            raise ValueError("malformed 'text_parts'")
+        return TrainingPhrase(tuple(PhrasePart(part["text"], part.get("parameter_id")) for part in parts),
+                              item.get("repeat_count", 1))
+    raise ValueError("unrecognized training phrase format")
+
+
+class CompiledPhrases:
+    """The compiled training phrases of one intent. The payload and comparison key are built on first use."""
+    __slots__ = ("phrases", "_payload", "_comparison_key")
+
+    def __init__(self, phrases: tuple):
+        self.phrases = phrases
+        self._payload = None
+        self._comparison_key = None
+
+    @property
+    def texts(self) -> list:
+        """The phrases as plain text (e.g. the existing phrases shown to Gemini)."""
+        return [phrase.text for phrase in self.phrases]
+
+    @property
+    def payload(self) -> list:
+        """Dialogflow CX training phrase dictionaries. Shared between callers: do not modify."""
+        if self._payload is None:
+            self._payload = [phrase.to_payload() for phrase in self.phrases]
+        return self._payload
+
+    @property
+    def comparison_key(self) -> tuple:
+        """Order-independent comparable form of all phrases (see TrainingPhrase.key)."""
+        if self._comparison_key is None:
+            self._comparison_key = tuple(sorted(phrase.key for phrase in self.phrases))
+        return self._comparison_key
+
+
+def content_digest(training_phrases: list) -> bytes:
+    """
+    Returns a hash of an intent's YAML training phrases, used as an in-memory memo key.
+    Based on repr (about twice as fast as JSON for this), so the same phrases with
+    mapping keys in a different order hash differently, which only costs a memo miss.
+    """
+    return hashlib.blake2b(repr(training_phrases).encode("utf-8"), digest_size=16).digest()
+
+
+class PhraseCompiler:
+    def __init__(self, max_entries: int = 4096):
+        """
+        Compiles intents' training phrases and memoizes them by content hash. Intents whose
+        phrases are unchanged (or identical to another intent's) reuse the compiled phrases
+        and their built payload. Thread-safe; share one between managers deploying the
+        same config to several agents.
+
+        Args:
+            max_entries (int): Least recently used compiled intents beyond this are dropped,
+                so memory stays bounded when intents are streamed. None for no limit.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._compiled = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, training_phrases: list, label: str = "") -> CompiledPhrases:
+        """
+        Compiles an intent's training phrases. Malformed phrases are skipped with a warning,
+        and a phrase with a malformed annotation is kept as literal text.
+
+        Args:
+            training_phrases (list): The intent's YAML 'training_phrases'.
+            label (str): The intent's display name, for warnings.
+
+        Returns:
+            CompiledPhrases
+        """
+        digest = content_digest(training_phrases or [])
+        with self._lock:
+            compiled = self._compiled.get(digest)
+            if compiled is not None:
+                self._compiled.move_to_end(digest)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+        phrases = []
+        for item in training_phrases or []:
+            if type(item) is str and "{" not in item and "}" not in item:
+                # Fast path for the most common case, a plain phrase.
+                phrases.append(TrainingPhrase((PhrasePart(item),)))
+                continue
+            try:
+                phrases.append(compile_phrase(item))
+            except AnnotationError as e:
+                logging.warning(f"Keeping training phrase {item!r} of intent '{label}' as plain text: {e}")
+                phrases.append(TrainingPhrase((PhrasePart(item),)))
+            except ValueError as e:
+                logging.warning(f"Skipping training phrase {item!r} of intent '{label}': {e}")
+        compiled = CompiledPhrases(tuple(phrases))
+        with self._lock:
+            self._compiled[digest] = compiled
+            if self.max_entries is not None and len(self._compiled) > self.max_entries:
+                self._compiled.popitem(last=False)
+        return compiled
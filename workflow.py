@@ -0,0 +1,426 @@
+import argparse
+import yaml
+import logging
+import os
+from gemini_enricher import GeminiEnricher
+from generation_cache import GenerationCache
+from dialogflow_agent_manager import DialogflowAgentManager
+from agent_sync import AgentSynchronizer
+from agent_package import AgentPackageBuilder, diff_agent_configs, export_agent_package, read_agent_package, restore_agent_package
+from deployment_scheduler import DeploymentScheduler
+from rate_limiter import TokenBucket
+from config_io import dump_config
+from config_shards import is_sharded, load_agent_config_data, open_config_writer
+from config_validation import count_issues, validate_agent_config
+from pipeline import run_enrich_deploy_pipeline
+from enrichment_journal import EnrichmentJournal
+from phrase_dedup import PhraseDeduplicator
+from run_metrics import RunMetrics
+from agent_snapshot import record_agent_snapshot
+from training_phrases import PhraseCompiler
+from fanout import FanOutDeployer, agent_project, resolve_agent_targets
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+def load_agent_config(path: str, label: str = "agent", workers: int = None) -> dict:
+    """
+    Loads an agent configuration YAML file or shard directory and validates it, exiting
+    on errors before any Gemini or Dialogflow request is made.
+    
+    Args:
+        path (str): Path to the agent configuration file or shard directory.
+        label (str): Describes the file in error messages (e.g. "original agent").
+        workers (int): Parser processes for a shard directory (default: CPU count).
+        
+    Returns:
+        dict: The loaded agent configuration. The intents of a shard directory are
+            streamed from disk whenever they are iterated.
+    """
+    try:
+        agent_config_data = load_agent_config_data(path, workers)
+    except FileNotFoundError:
+        logging.error(f"Error: {label.capitalize()} configuration file '{path}' not found.")
+        exit(1)
+    except yaml.YAMLError as e:
+        logging.error(f"Error parsing {label} configuration file '{path}': {e}")
+        exit(1)
+    issues = validate_agent_config(agent_config_data)
+    for issue in issues:
+        (logging.error if issue.severity == "error" else logging.warning)(str(issue))
+    errors, _ = count_issues(issues)
+    if errors:
+        logging.error(f"{label.capitalize()} configuration file '{path}' has {errors} error(s); "
+                      f"run 'python main.py validate {path}' for the full list.")
+        exit(1)
+    if is_sharded(path):
+        logging.info(f"Sharded {label} configuration '{path}': {len(agent_config_data['entities'])} entity types, "
+                     f"{len(agent_config_data['intents'])} intent shards.")
+    return agent_config_data
+
+def enriched_config_is_sharded(config: dict) -> bool:
+    """The enriched config is written as shards when the original config or the existing enriched config is sharded."""
+    return is_sharded(config['agent_config']['original_file']) or is_sharded(config['agent_config']['enriched_file'])
+
+def check_enriched_file(config: dict):
+    """
+    Checks that the enriched config can be written where it is configured.
+
+    Raises:
+        ValueError: If the original config is a shard directory and enriched_file is an existing
+            file: the enriched shards need a directory.
+    """
+    original_file = config['agent_config']['original_file']
+    enriched_file = config['agent_config']['enriched_file']
+    if is_sharded(original_file) and os.path.isfile(enriched_file):
+        raise ValueError(f"agent_config.original_file '{original_file}' is a shard directory, so the enriched "
+                         f"config is written as shards too, but agent_config.enriched_file '{enriched_file}' is a "
+                         f"file. Set enriched_file to a directory (e.g. 'enriched_agent_config/') or remove the file.")
+
+def create_generation_cache(config: dict) -> GenerationCache:
+    """Opens the Gemini generation cache if it is enabled in the configuration."""
+    cache_config = config['gemini_enrichment'].get('cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+    return GenerationCache(
+        path=cache_config.get('path', '.gemini_cache.sqlite3'),
+        max_entries=cache_config.get('max_entries'),
+        max_age_days=cache_config.get('max_age_days')
+    )
+
+def create_journal(config: dict, resume: bool) -> EnrichmentJournal:
+    """Opens the enrichment journal next to the enriched file (or at agent_config.journal_file)."""
+    journal_path = config['agent_config'].get('journal_file') or f"{config['agent_config']['enriched_file']}.journal.jsonl"
+    return EnrichmentJournal(journal_path, resume=resume)
+
+def create_deduplicator(gemini_config: dict) -> PhraseDeduplicator:
+    """Creates the generated-phrase deduplicator if it is enabled in the configuration."""
+    dedup_config = gemini_config.get('dedup', {})
+    if not dedup_config.get('enabled', False):
+        return None
+    return PhraseDeduplicator(
+        similarity_threshold=dedup_config.get('similarity_threshold', 0.8),
+        action=dedup_config.get('action', 'drop'),
+        rerequest=dedup_config.get('rerequest', False),
+        max_rerequests=dedup_config.get('max_rerequests', 1)
+    )
+
+def create_metrics(config: dict) -> RunMetrics:
+    """Creates the run metrics collector; it records nothing unless 'metrics.enabled' is set."""
+    return RunMetrics(enabled=config.get('metrics', {}).get('enabled', False))
+
+def write_run_report(config: dict, metrics: RunMetrics):
+    """Writes the JSON run report and, if configured, the Prometheus textfile."""
+    metrics_config = config.get('metrics', {})
+    try:
+        if metrics_config.get('report_file'):
+            metrics.write_json(metrics_config['report_file'])
+        if metrics_config.get('prometheus_file'):
+            metrics.write_prometheus(metrics_config['prometheus_file'])
+    except OSError as e:
+        logging.error(f"Error writing run metrics: {e}")
+
+def create_enricher(config: dict, generation_cache: GenerationCache, metrics: RunMetrics = None) -> GeminiEnricher:
+    """Initializes the Gemini enricher from the 'gemini_enrichment' configuration."""
+    gemini_config = config['gemini_enrichment']
+    batching_config = gemini_config.get('batching', {})
+    return GeminiEnricher(
+        api_key=gemini_config['api_key'],
+        phrases_to_generate=gemini_config['phrases_to_generate'],
+        max_concurrent_requests=gemini_config.get('max_concurrent_requests', 1),
+        requests_per_minute=gemini_config.get('requests_per_minute'),
+        tokens_per_minute=gemini_config.get('tokens_per_minute'),
+        max_retries=gemini_config.get('max_retries', 3),
+        cache=generation_cache,
+        deduplicator=create_deduplicator(gemini_config),
+        batch_token_budget=batching_config.get('token_budget', 8000) if batching_config.get('enabled', False) else None,
+        max_intents_per_batch=batching_config.get('max_intents_per_batch', 20),
+        metrics=metrics,
+        max_pending_intents=gemini_config.get('max_pending_intents', 256)
+    )
+
+def create_agent_manager(config: dict, metrics: RunMetrics = None, rate_limiter: TokenBucket = None,
+                         phrase_compiler: PhraseCompiler = None) -> DialogflowAgentManager:
+    """
+    Initializes the Dialogflow agent manager from the 'dialogflow' configuration. A
+    rate_limiter passed in (e.g. shared by agents of one project) replaces the one
+    built from 'requests_per_second'.
+    """
+    requests_per_second = config['dialogflow'].get('requests_per_second')
+    if rate_limiter is None and requests_per_second:
+        rate_limiter = TokenBucket(requests_per_second)
+    return DialogflowAgentManager(
+        creds_path=config['dialogflow']['creds_path'],
+        agent_path=config['dialogflow']['agent_path'],
+        max_retries=config['dialogflow'].get('max_retries', 0),
+        rate_limiter=rate_limiter,
+        metrics=metrics,
+        phrase_compiler=phrase_compiler
+    )
+
+def create_project_rate_limiters(targets: list) -> dict:
+    """
+    Creates one token bucket per GCP project, since the Dialogflow CX quota is per project.
+    Agents of the same project share it, at the lowest 'requests_per_second' among them.
+
+    Returns:
+        dict: Project id -> TokenBucket, for projects with a limit.
+    """
+    limits = {}
+    for target in targets:
+        requests_per_second = target.get('requests_per_second')
+        if requests_per_second:
+            project = agent_project(target['agent_path'])
+            limits[project] = min(limits.get(project, requests_per_second), requests_per_second)
+    return {project: TokenBucket(requests_per_second) for project, requests_per_second in limits.items()}
+
+def deploy_package(config: dict, agent_config_data: dict, agent_manager: DialogflowAgentManager,
+                   metrics: RunMetrics, restore: bool = True):
+    """
+    Builds an agent package from the agent config, verifies it by reading it back, and
+    restores it to the agent in one operation.
+    
+    Args:
+        config (dict): The project configuration.
+        agent_config_data (dict): The agent configuration to deploy.
+        agent_manager (DialogflowAgentManager): Manager of the target agent.
+        metrics (RunMetrics): Run metrics collector.
+        restore (bool): When False, only build and verify the package (no API calls unless
+            the base export has to be downloaded).
+    """
+    package_config = config['dialogflow'].get('package', {})
+    package_path = package_config.get('output_file', 'agent_package.zip')
+    language_code = package_config.get('language_code', 'en')
+    timeout = package_config.get('timeout_seconds', 600)
+    base_export = package_config.get('base_export')
+    if not base_export and restore:
+        # Restoring replaces the whole agent, so build on top of what is live now.
+        base_export = package_config.get('export_file', 'agent_export.zip')
+        with metrics.stage("export_agent"):
+            export_agent_package(agent_manager, base_export, timeout)
+
+    with metrics.stage("build_package"):
+        AgentPackageBuilder(agent_manager, language_code).build(
+            package_path, agent_config_data.get('entities', []), agent_config_data.get('intents', []),
+            base_package=base_export)
+    with metrics.stage("verify_package"):
+        differences = diff_agent_configs(agent_config_data, read_agent_package(package_path, language_code),
+                                         AgentSynchronizer(agent_manager))
+    if differences:
+        for difference in differences:
+            logging.error(f"   - {difference}")
+        raise ValueError(f"Agent package '{package_path}' does not match the agent config ({len(differences)} difference(s)).")
+    logging.info(f"✅ Agent package '{package_path}' matches the agent config.")
+    if not restore:
+        return
+    with metrics.stage("deploy"):
+        restore_agent_package(agent_manager, package_path, timeout, fallback=package_config.get('fallback', False))
+
+def run_pipelined(config: dict, agent_config_data: dict, resume: bool = False, metrics: RunMetrics = None):
+    """
+    Enriches and deploys at the same time: intents are deployed as soon as Gemini
+    finishes them, and the enriched file is written incrementally.
+    
+    Args:
+        config (dict): The project configuration.
+        agent_config_data (dict): The original agent configuration.
+        resume (bool): Reuse generations journaled by an interrupted run.
+        metrics (RunMetrics): Run metrics collector.
+    """
+    metrics = metrics or RunMetrics(enabled=False)
+    enriched_file_path = config['agent_config']['enriched_file']
+    generation_cache = None
+    journal = None
+    try:
+        generation_cache = create_generation_cache(config)
+        journal = create_journal(config, resume)
+        enricher = create_enricher(config, generation_cache, metrics)
+        agent_manager = create_agent_manager(config, metrics)
+        scheduler = DeploymentScheduler(agent_manager, max_workers=config['dialogflow'].get('max_workers', 1))
+        synchronizer = None
+        if config['dialogflow'].get('deploy_mode', 'create') == 'sync':
+            synchronizer = AgentSynchronizer(agent_manager, prune=config['dialogflow'].get('prune', False))
+
+        with metrics.stage("pipeline"), open_config_writer(enriched_file_path, agent_config_data,
+                                                           enriched_config_is_sharded(config)) as writer:
+            run_enrich_deploy_pipeline(enricher, scheduler, agent_config_data, writer,
+                                       queue_size=config['gemini_enrichment'].get('pipeline_queue_size', 16),
+                                       synchronizer=synchronizer, journal=journal)
+        logging.info(f"Enriched configuration saved to '{enriched_file_path}'")
+        journal.discard()
+        if synchronizer is None:
+            with metrics.stage("list_intents"):
+                record_agent_snapshot(agent_manager, config['dialogflow'].get('snapshot_file'), agent_config_data)
+    except ValueError as e:
+        logging.error(f"Setup error: {e}")
+        exit(1)
+    except Exception as e:
+        logging.error(f"An error occurred during the enrich/deploy pipeline: {e}")
+        exit(1)
+    finally:
+        if journal:
+            journal.close()
+        if generation_cache:
+            generation_cache.log_stats()
+            generation_cache.close()
+
+def run_workflow(args: argparse.Namespace, config: dict, metrics: RunMetrics):
+    """
+    Runs enrichment and deployment (or the plan) as configured. With the 'enrich'
+    command, stops after writing the enriched config.
+    
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        config (dict): The project configuration.
+        metrics (RunMetrics): Run metrics collector.
+    """
+    enrich_only = getattr(args, "command", None) == "enrich"
+    if enrich_only and not config['gemini_enrichment']['enabled']:
+        logging.error("Gemini enrichment is disabled in the configuration (gemini_enrichment.enabled); nothing to enrich.")
+        exit(1)
+    # Determine which agent config file to use
+    use_gemini_enrichment = config['gemini_enrichment']['enabled'] and not (args.plan or args.build_package)
+    deploy_mode = config['dialogflow'].get('deploy_mode', 'create')
+    load_workers = config['agent_config'].get('load_workers')
+    try:
+        targets = resolve_agent_targets(config['dialogflow'])
+        if use_gemini_enrichment:
+            check_enriched_file(config)
+    except ValueError as e:
+        logging.error(f"Configuration error: {e}")
+        exit(1)
+    
+    if use_gemini_enrichment:
+        agent_config_file_path = config['agent_config']['enriched_file']
+        original_config_file_path = config['agent_config']['original_file']
+
+        logging.info(f"Gemini enrichment is ENABLED. Loading original config from '{original_config_file_path}' for enrichment.")
+        with metrics.stage("load_agent_config"):
+            agent_config_data = load_agent_config(original_config_file_path, "original agent", load_workers)
+
+        if config['gemini_enrichment'].get('pipeline', False) and deploy_mode != 'package' and len(targets) == 1 \
+                and not enrich_only:
+            logging.info("Pipelined mode: intents are deployed while enrichment is still running.")
+            run_pipelined({**config, 'dialogflow': targets[0]}, agent_config_data, resume=args.resume, metrics=metrics)
+            return
+
+        # Initialize and run Gemini Enricher
+        generation_cache = None
+        journal = None
+        
+        try:
+            generation_cache = create_generation_cache(config)
+            journal = create_journal(config, args.resume)
+            enricher = create_enricher(config, generation_cache, metrics)
+            if enriched_config_is_sharded(config):
+                # Intents stream from the original shards through Gemini into the enriched shards;
+                # only shards whose content changed are rewritten.
+                with metrics.stage("enrichment"), open_config_writer(agent_config_file_path, agent_config_data,
+                                                                     sharded=True) as writer:
+                    for intent in enricher.iter_enriched_intents(agent_config_data, journal):
+                        writer.write_intent(intent)
+            else:
+                with metrics.stage("enrichment"):
+                    enriched_agent_config_data = enricher.enrich_agent_config(agent_config_data, journal)
+
+                # Save the enriched configuration to a new file; the journal is no longer needed after that
+                with metrics.stage("write_enriched_config"):
+                    dump_config(enriched_agent_config_data, agent_config_file_path)
+            logging.info(f"Enriched configuration saved to '{agent_config_file_path}'")
+            journal.discard()
+
+        except ValueError as e:
+            logging.error(f"Gemini enrichment setup error: {e}")
+            exit(1)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during Gemini enrichment: {e}")
+            exit(1)
+        finally:
+            if journal:
+                journal.close()
+            if generation_cache:
+                generation_cache.log_stats()
+                generation_cache.close()
+        if enrich_only:
+            return
+        if enriched_config_is_sharded(config):
+            agent_config_data = load_agent_config_data(agent_config_file_path, load_workers)
+            
+    elif (args.plan or args.build_package) and config['gemini_enrichment']['enabled']:
+        agent_config_file_path = config['agent_config']['enriched_file']
+        logging.info(f"Using the last enriched config '{agent_config_file_path}'.")
+        with metrics.stage("load_agent_config"):
+            agent_config_data = load_agent_config(agent_config_file_path, "enriched agent", load_workers)
+    else:
+        agent_config_file_path = config['agent_config']['original_file']
+        logging.info(f"Gemini enrichment is DISABLED. Using original config from '{agent_config_file_path}'.")
+        with metrics.stage("load_agent_config"):
+            agent_config_data = load_agent_config(agent_config_file_path, "original agent", load_workers)
+
+    if len(targets) == 1:
+        try:
+            deploy_agent(args, {**config, 'dialogflow': targets[0]}, agent_config_data, metrics)
+        except Exception as e:
+            logging.error(f"An error occurred during Dialogflow agent management: {e}")
+            exit(1)
+        return
+
+    # Several agents: the config was loaded (and enriched) once; only deployment fans out.
+    rate_limiters = create_project_rate_limiters(targets)
+    phrase_compiler = PhraseCompiler()
+
+    def deploy_target(target: dict):
+        return deploy_agent(args, {**config, 'dialogflow': target}, agent_config_data, metrics,
+                            rate_limiter=rate_limiters.get(agent_project(target['agent_path'])),
+                            phrase_compiler=phrase_compiler)
+
+    deployer = FanOutDeployer(targets, deploy_target, max_parallel_agents=config['dialogflow'].get('max_parallel_agents', 4))
+    with metrics.stage("fan_out"):
+        fan_out_summary = deployer.run()
+    if fan_out_summary.failed():
+        exit(1)
+
+def deploy_agent(args: argparse.Namespace, config: dict, agent_config_data: dict, metrics: RunMetrics,
+                 rate_limiter: TokenBucket = None, phrase_compiler: PhraseCompiler = None):
+    """
+    Deploys (or plans) the agent config to the single agent of config['dialogflow'].
+    
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+        config (dict): The project configuration, with a single 'dialogflow.agent_path'.
+        agent_config_data (dict): The agent configuration to deploy.
+        metrics (RunMetrics): Run metrics collector.
+        rate_limiter (TokenBucket): Optional bucket shared with other agents of the same project.
+        phrase_compiler (PhraseCompiler): Optional training phrase compiler shared with other agents' managers.
+        
+    Returns:
+        DeploymentSummary: Outcomes of all items, or None for plans and package deployments.
+    """
+    deploy_mode = config['dialogflow'].get('deploy_mode', 'create')
+    prune = config['dialogflow'].get('prune', False)
+    agent_manager = create_agent_manager(config, metrics, rate_limiter, phrase_compiler)
+    scheduler = DeploymentScheduler(agent_manager, max_workers=config['dialogflow'].get('max_workers', 1))
+
+    if args.build_package or deploy_mode == 'package':
+        deploy_package(config, agent_config_data, agent_manager, metrics, restore=not args.build_package)
+        return None
+    if args.plan or deploy_mode == 'sync':
+        synchronizer = AgentSynchronizer(agent_manager, prune=prune)
+        intents = agent_config_data.get('intents', [])
+        if not args.plan and not isinstance(intents, list):
+            # Sharded intents: each one is planned and deployed as it is read instead of planning them all first.
+            with metrics.stage("deploy"):
+                return scheduler.deploy_stream(agent_config_data.get('entities', []), intents, synchronizer)
+        with metrics.stage("plan"):
+            plan = synchronizer.build_plan(agent_config_data)
+        if args.plan:
+            print(f"# {agent_manager.agent_path}\n{plan.format()}")
+            return None
+        logging.info(f"📋 Sync plan for '{agent_manager.agent_path}':\n{plan.format()}")
+        with metrics.stage("deploy"):
+            return scheduler.deploy_plan(synchronizer, plan)
+    # Entities are created concurrently; each intent waits only on the entities it references
+    with metrics.stage("deploy"):
+        summary = scheduler.deploy(agent_config_data)
+    with metrics.stage("list_intents"):
+        record_agent_snapshot(agent_manager, config['dialogflow'].get('snapshot_file'), agent_config_data)
+    return summary